@@ -0,0 +1 @@
+# benchmarks - 离线性能基准（用法见 README）
@@ -0,0 +1,109 @@
+# benchmarks/bench_import.py - 启动耗时基准：python -X importtime 测量各入口模块的导入时间
+import os
+import re
+import sys
+import json
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Dict, List
+
+# 入口模块：hot_news.py 是定时任务的入口，其余为可单独使用的模块
+ENTRY_POINTS = ('hot_news', 'news_fetcher', 'email_generator', 'config')
+
+# 只应在用到它们的代码路径上导入的较重模块
+HEAVY_MODULES = ('requests', 'urllib3', 'aiohttp', 'lxml', 'bs4', 'cssselect', 'jsonpath_ng', 'tenacity', 'smtplib')
+
+# importtime 输出的每一行: "import time: 自身微秒 | 累计微秒 | 缩进的模块名"
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_profile(module: str) -> Dict:
+    """在新的解释器中导入 module，返回累计导入耗时（毫秒）、加载的较重模块和耗时最多的直接依赖"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    total, loaded, children = 0.0, set(), {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:
+            if name == module:
+                total = cumulative / 1000
+                break
+            # 解释器启动时（site 等）的导入，不属于入口模块
+            children, loaded = {}, set()
+        elif indent == 3:
+            # 入口模块直接导入的模块（缩进比入口多两格），先于入口模块输出
+            children[name] = cumulative / 1000
+        if name.split('.')[0] in HEAVY_MODULES:
+            loaded.add(name.split('.')[0])
+    return {'ms': total, 'heavy': sorted(loaded), 'children': children}
+
+def measure(module: str, rounds: int) -> Dict:
+    profiles = [import_profile(module) for _ in range(rounds)]
+    top = sorted(profiles[-1]['children'].items(), key=lambda item: -item[1])[:5]
+    return {
+        'ms': round(statistics.median(p['ms'] for p in profiles), 2),
+        'heavy': profiles[-1]['heavy'],
+        'top': {name: round(ms, 2) for name, ms in top},
+    }
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_ms: float) -> List[str]:
+    """对比两次结果：导入耗时变慢超过 threshold，或者入口模块新加载了较重模块，都判定为回归"""
+    regressions = []
+    print(f"\n{'module':<20}{'base ms':>10}{'now ms':>10}{'change':>9}")
+    for module in sorted(set(baseline['modules']) & set(current['modules'])):
+        before, after = baseline['modules'][module], current['modules'][module]
+        change = (after['ms'] - before['ms']) / before['ms'] if before['ms'] else 0.0
+        flag = ''
+        # 导入耗时受磁盘缓存影响，差值小于 min_ms 时不判定回归
+        if change > threshold and after['ms'] - before['ms'] >= min_ms:
+            flag = '  <-- 回归'
+            regressions.append(module)
+        added = sorted(set(after['heavy']) - set(before['heavy']))
+        if added:
+            flag += f"  <-- 新加载 {', '.join(added)}"
+            regressions.append(module)
+        print(f"{module:<20}{before['ms']:>10.2f}{after['ms']:>10.2f}{change:>+8.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块导入耗时基准（python -X importtime）")
+    parser.add_argument('--rounds', type=int, default=7, help="每个模块导入的次数，取中位数")
+    parser.add_argument('--module', choices=ENTRY_POINTS, action='append', help="只测量指定模块，可重复；默认全部")
+    parser.add_argument('--output', help="把结果写入JSON文件，作为之后 --compare 的基线")
+    parser.add_argument('--compare', help="与基线JSON对比，有回归时以非零状态退出")
+    parser.add_argument('--threshold', type=float, default=0.3, help="判定为回归的变慢比例")
+    parser.add_argument('--min-ms', type=float, default=5.0, help="变慢不足该毫秒数时不判定回归")
+    args = parser.parse_args()
+
+    results = {'python': platform.python_version(), 'rounds': args.rounds, 'modules': {}}
+    for module in args.module or ENTRY_POINTS:
+        result = measure(module, args.rounds)
+        results['modules'][module] = result
+        heavy = f"，加载 {', '.join(result['heavy'])}" if result['heavy'] else ""
+        print(f"{module:<20}{result['ms']:>10.2f} ms{heavy}")
+        for name, ms in result['top'].items():
+            print(f"  {name:<28}{ms:>10.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n❌ {len(set(regressions))} 个入口模块的导入出现回归")
+            sys.exit(1)
+        print("\n✅ 没有发现导入回归")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_parsing.py - 解析基准：BeautifulSoup 多次 select 与 lxml 编译查询对比，以及API的 JSONPath 提取
+import json
+import time
+import argparse
+
+from bs4 import BeautifulSoup
+from jsonpath_ng import parse as parse_json_path
+
+from config import get_config
+from html_parser import parse_html
+from json_path import compile_json_path
+from source_engine import get_source_engine
+from benchmarks.fixtures import load_all_fixtures, synthesize_api, synthetic_urls, synthetic_warning
+
+def parse_with_soup(content, source):
+    """原实现：BeautifulSoup + 每个选择器一次 select()"""
+    soup = BeautifulSoup(content, 'lxml')
+    titles = []
+    for selector in source.selectors.selectors:
+        for item in soup.select(selector, limit=20):
+            title = source.accept(item.text.strip())
+            if title:
+                titles.append(title)
+            if len(titles) >= source.collect_limit:
+                return titles
+    return titles
+
+def parse_with_lxml(content, source):
+    """新实现：lxml + 编译后的联合查询，凑够条数即停止"""
+    return source.extract(parse_html(content))
+
+def find_with_jsonpath_ng(data, expression):
+    """原实现：每次抓取都用 jsonpath_ng 解析表达式"""
+    return [match.value for match in parse_json_path(expression).find(data)]
+
+def _time(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML解析基准")
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    engine = get_source_engine()
+    fixtures = load_all_fixtures()
+    synthetic = synthetic_urls()
+    if synthetic:
+        print(synthetic_warning(synthetic))
+    print(f"{'source':<10}{'size':>10}{'soup ms':>12}{'lxml ms':>12}{'speedup':>10}")
+    for site, content in fixtures.items():
+        source = engine.get(site)
+        soup_ms = _time(lambda: parse_with_soup(content, source), args.rounds)
+        lxml_ms = _time(lambda: parse_with_lxml(content, source), args.rounds)
+        print(f"{site:<10}{len(content):>10}{soup_ms:>12.2f}{lxml_ms:>12.2f}{soup_ms / lxml_ms:>9.1f}x")
+
+    # API新闻源：每次解析 json_path 与加载配置时预编译（快速路径为字典和列表取值）
+    print(f"\n{'source':<10}{'json_path':<24}{'ng us':>10}{'compiled us':>14}{'speedup':>10}")
+    for source_id, source_config in get_config().news_sources.items():
+        if not source_config.json_path:
+            continue
+        data = json.loads(synthesize_api(source_id))
+        path = compile_json_path(source_config.json_path)
+        assert path.find(data) == find_with_jsonpath_ng(data, source_config.json_path)
+        ng_us = _time(lambda: find_with_jsonpath_ng(data, source_config.json_path), args.rounds) * 1000
+        compiled_us = _time(lambda: path.find(data), args.rounds * 100) * 1000
+        print(f"{source_id:<10}{source_config.json_path:<24}{ng_us:>10.1f}{compiled_us:>14.2f}"
+              f"{ng_us / compiled_us:>9.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+# benchmarks/bench_pipeline.py - 全流程基准：抓取、解析、分类、去重、渲染（离线回放）
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+from typing import Dict, List
+
+from config import get_config
+from http_client import get_http_client
+from instrumentation import get_recorder, reset_recorder
+from benchmarks.fixtures import load_all_responses, synthetic_urls, synthetic_warning
+from benchmarks.replay import ReplayClientSession, install
+
+# main() 中安装的回放适配器
+_adapter = None
+
+def run_hot_news() -> Dict:
+    """hot_news.py 的完整流程：generate_email_content"""
+    import hot_news
+
+    # 分类结果缓存在进程内，每轮清空以免后几轮只测到缓存命中
+    hot_news.classify_title.cache_clear()
+    start = time.perf_counter()
+    hot_news.generate_email_content(incremental=False)
+    total = time.perf_counter() - start
+    return _raw_report(total, get_recorder())
+
+def run_news_fetcher() -> Dict:
+    """NewsFetcher -> NewsProcessor -> EmailGenerator 流程"""
+    from news_fetcher import NewsFetcher
+    from news_processor import NewsProcessor
+    from email_generator import EmailGenerator
+
+    config = get_config()
+    recorder = reset_recorder()
+    # NewsFetcher 的请求由 aiohttp 发出，不经过 HttpClient 上的回放适配器
+    fetcher = NewsFetcher(config, session_factory=lambda: ReplayClientSession(_adapter))
+    start = time.perf_counter()
+    all_news = {}
+    with recorder.stage('fetch'):
+        for source_config in config.get_enabled_sources():
+            all_news[source_config.id] = {
+                'name': source_config.name,
+                'category': source_config.category,
+                'news': fetcher.fetch_news(source_config),
+            }
+    categorized = NewsProcessor(config).categorize_news(all_news)
+    generator = EmailGenerator(config)
+    generator.generate_text_email(categorized)
+    generator.generate_html_email(categorized, all_news)
+    total = time.perf_counter() - start
+    return _raw_report(total, recorder)
+
+def _raw_report(total: float, recorder) -> Dict:
+    # 不使用 report() 中四舍五入后的数值，保留完整精度
+    return {'total': total, 'stages': recorder.stages, 'sources': recorder.sources}
+
+PIPELINES = {
+    'hot_news': run_hot_news,
+    'news_fetcher': run_news_fetcher,
+}
+
+def _median_ms(values: List[float]) -> float:
+    return round(statistics.median(values) * 1000, 3)
+
+def measure(pipeline, rounds: int, warmup: int = 1) -> Dict:
+    """多轮运行取中位数：总耗时、各阶段耗时、各新闻源耗时
+
+    并发抓取时各阶段耗时是所有线程的累计值，可能大于总耗时。
+    """
+    for _ in range(warmup):
+        pipeline()
+    totals, stages, sources = [], {}, {}
+    for _ in range(rounds):
+        report = pipeline()
+        totals.append(report['total'])
+        for name, stats in report['stages'].items():
+            stages.setdefault(name, []).append(stats['seconds'])
+        for name, stats in report['sources'].items():
+            sources.setdefault(name, []).append(stats['seconds'])
+    return {
+        'total_ms': _median_ms(totals),
+        'stages_ms': {name: _median_ms(values) for name, values in stages.items()},
+        'sources_ms': {name: _median_ms(values) for name, values in sources.items()},
+    }
+
+def _flatten(results: Dict) -> Dict[str, float]:
+    """{流程: {total_ms, stages_ms, sources_ms}} 展开为 {"流程.指标": 毫秒}"""
+    flat = {}
+    for pipeline, result in results['pipelines'].items():
+        flat[f"{pipeline}.total"] = result['total_ms']
+        for group in ('stages_ms', 'sources_ms'):
+            for name, value in result[group].items():
+                flat[f"{pipeline}.{group[:-3]}.{name}"] = value
+    return flat
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_ms: float) -> List[str]:
+    """对比两次结果，返回变慢超过 threshold 的指标"""
+    base, cur = _flatten(baseline), _flatten(current)
+    regressions = []
+    print(f"\n{'metric':<60}{'base ms':>10}{'now ms':>10}{'change':>9}")
+    for key in sorted(set(base) & set(cur)):
+        before, after = base[key], cur[key]
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        # 过小的指标波动大，只对超过 min_ms 的判定回归
+        if change > threshold and after >= min_ms:
+            flag = '  <-- 回归'
+            regressions.append(key)
+        print(f"{key:<60}{before:>10.2f}{after:>10.2f}{change:>+8.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="全流程离线基准")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--pipeline', choices=sorted(PIPELINES), action='append',
+                        help="只运行指定流程，可重复；默认全部")
+    parser.add_argument('--output', help="把结果写入JSON文件，作为之后 --compare 的基线")
+    parser.add_argument('--compare', help="与基线JSON对比，有回归时以非零状态退出")
+    parser.add_argument('--threshold', type=float, default=0.2, help="判定为回归的变慢比例")
+    parser.add_argument('--min-ms', type=float, default=1.0, help="低于该耗时的指标不判定回归")
+    parser.add_argument('--allow-synthetic', action='store_true',
+                        help="没有录制样本时仍然运行 --compare（合成页面发现不了真实页面上的解析回归）")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    config = get_config()
+    # 基准不读写磁盘上的新闻历史和断路器状态
+    config.app_config.history_enabled = False
+    config.app_config.circuit_breaker_enabled = False
+    responses = load_all_responses()
+    synthetic = synthetic_urls()
+    if synthetic:
+        print(synthetic_warning(synthetic))
+        if args.compare and not args.allow_synthetic:
+            print("❌ 合成页面上的对比结果不可靠，拒绝运行 --compare；录制样本后重试，或加 --allow-synthetic")
+            sys.exit(2)
+    global _adapter
+    adapter = _adapter = install(get_http_client(), responses)
+
+    results = {
+        'python': platform.python_version(),
+        'rounds': args.rounds,
+        'fixtures': len(responses),
+        'synthetic': len(synthetic),
+        'pipelines': {},
+    }
+    for name in args.pipeline or PIPELINES:
+        result = measure(PIPELINES[name], args.rounds)
+        results['pipelines'][name] = result
+        print(f"\n{name}: {result['total_ms']:.2f} ms")
+        for stage, value in result['stages_ms'].items():
+            print(f"  {stage:<12}{value:>10.2f} ms")
+    if adapter.misses:
+        print(f"\n⚠️ {adapter.misses} 个请求没有对应的样本")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('synthetic', 0) != len(synthetic):
+            print(f"\n⚠️ 基线有 {baseline.get('synthetic', '未知数量的')} 个合成样本，本次有 {len(synthetic)} 个，"
+                  f"两次回放的页面不同")
+        regressions = compare(baseline, results, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 项指标变慢超过 {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ 没有发现性能回归")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_render.py - 邮件渲染微基准：连续渲染大量摘要
+import time
+import argparse
+import statistics
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from config import get_config
+from news_item import NewsItem
+from templates import Template
+
+def sample_digest(per_category: int = 5) -> Dict[str, List[str]]:
+    """hot_news.render_email_content 的输入：{类别: 格式化新闻列表}"""
+    import hot_news
+    return {
+        category_name: [f"{i}. {category_name[2:]}新闻标题示例 第{i}条" for i in range(1, per_category + 1)]
+        for category_name in hot_news.CATEGORY_COLORS
+    }
+
+def sample_categorized(per_category: int = 5) -> Dict[str, List[NewsItem]]:
+    """EmailGenerator 的输入：{类别: [新闻条目]}"""
+    return {
+        category: [
+            NewsItem(title=f"{category}新闻标题示例 第{i}条", source='人民网', rank=i, hot=i * 10000 + 1,
+                     category=category)
+            for i in range(1, per_category + 1)
+        ]
+        for category in ("时政", "经济", "民生", "科技", "热点")
+    }
+
+def bench(name: str, func: Callable[[int], None], count: int, rounds: int) -> float:
+    """func(i) 渲染第 i 份摘要，返回每份的中位耗时（微秒）"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for i in range(count):
+            func(i)
+        timings.append(time.perf_counter() - start)
+    per_digest = statistics.median(timings) / count * 1e6
+    print(f"{name:<36}{statistics.median(timings) * 1000:>10.1f} ms{per_digest:>10.1f} µs/份")
+    return per_digest
+
+def main():
+    parser = argparse.ArgumentParser(description="邮件渲染微基准")
+    parser.add_argument('--count', type=int, default=10000, help="每轮渲染的摘要数")
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    import hot_news
+    from email_generator import EmailGenerator
+
+    config = get_config()
+    digest = sample_digest()
+    categorized = sample_categorized()
+    generator = EmailGenerator(config)
+    today = datetime.now().strftime("%Y年%m月%d日")
+    current_time = datetime.now().strftime("%H:%M:%S")
+
+    print(f"渲染 {args.count} 份摘要，{args.rounds} 轮取中位数\n")
+    sizes = {}
+    for mode in ('full', 'lean', 'inline'):
+        bench(f"hot_news.render_email_content（{mode}）",
+              lambda i: hot_news.render_email_content(digest, today, current_time, mode=mode, budget=0),
+              args.count, args.rounds)
+        _, html = hot_news.render_email_content(digest, today, current_time, mode=mode, budget=0)
+        sizes[mode] = len(html.encode('utf-8'))
+    bench("EmailGenerator 文本 + HTML",
+          lambda i: (generator.generate_text_email(categorized),
+                     generator.generate_html_email(categorized, {})),
+          args.count, args.rounds)
+
+    # 每个收件人只有问候语不同：共用部分渲染一次，每人只填入一个占位符
+    _, html_content = hot_news.render_email_content(digest, today, current_time)
+    personalized = Template(html_content.replace('<body>', '<body>\n<p>{{ greeting }}</p>', 1), autoescape=True)
+    bench("按收件人个性化（预渲染 + 1个占位符）",
+          lambda i: personalized.render(greeting=f"订阅者{i}，早上好"), args.count, args.rounds)
+
+    # 共用片段渲染、编码一次，每个收件人只渲染问候语和统计，其余拼接缓存的字节
+    print()
+    for per_category in (5, 50):
+        edition = generator.render_edition(sample_categorized(per_category))
+        for category in edition.counts:
+            edition.encoded('text', category)
+            edition.encoded('html', category)
+        bench(f"personalize 完整邮件（每类 {per_category} 条）",
+              lambda i: generator.personalize(edition, 'sender@example.com', f"user{i}@example.com",
+                                              greeting=f"订阅者{i}，早上好",
+                                              categories=("时政", "科技") if i % 2 else None),
+              args.count, args.rounds)
+
+    # 编码结果缓存在 MessageBuilder 中，每封邮件只生成信头；对比旧的 MIMEText（base64）
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from mime_builder import MessageBuilder
+    print()
+    text_content, html_content = hot_news.render_email_content(digest, today, current_time)
+    builder = MessageBuilder('sender@example.com', '每日热点新闻速递', [('plain', text_content), ('html', html_content)])
+
+    def mime_text(i):
+        message = MIMEMultipart('alternative')
+        message.attach(MIMEText(text_content, 'plain', 'utf-8'))
+        message.attach(MIMEText(html_content, 'html', 'utf-8'))
+        return message.as_bytes()
+
+    bench("MIMEText（base64）", mime_text, args.count, args.rounds)
+    for allow_8bit in (False, True):
+        bench(f"MessageBuilder（8bit={allow_8bit}）",
+              lambda i: builder.build(f"user{i}@example.com", allow_8bit), args.count, args.rounds)
+    print(f"\n邮件大小: MIMEText {len(mime_text(0))} 字节，"
+          f"MessageBuilder {len(builder.build('user@example.com'))} 字节，"
+          f"8bit {len(builder.build('user@example.com', True))} 字节")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/fixtures.py - 基准测试用的页面样本
+import os
+import json
+import random
+import hashlib
+from typing import Dict, List, Tuple
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 各站点首页中新闻链接所在的结构（与 hot_news.py 中的选择器对应）
+SITE_LAYOUTS = {
+    'people': {
+        'url': 'https://www.people.com.cn/',
+        'blocks': ['<div class="news_box"><a href="/n1/2024/{i}.html">{title}</a></div>',
+                   '<ul class="list_16"><li><a href="/n2/{i}.html">{title}</a></li></ul>'],
+    },
+    'xinhua': {
+        'url': 'http://www.xinhuanet.com/',
+        'blocks': ['<div class="tit"><a href="/politics/{i}.htm">{title}</a></div>',
+                   '<ul class="newsList"><li><a href="/world/{i}.htm">{title}</a></li></ul>'],
+    },
+    'sina': {
+        'url': 'https://news.sina.com.cn/',
+        'blocks': ['<div class="blk122"><a href="/c/{i}.shtml">{title}</a></div>',
+                   '<ul class="uni-blk-list"><li><a href="/s/{i}.shtml">{title}</a></li></ul>'],
+    },
+    'netease': {
+        'url': 'https://news.163.com/',
+        'blocks': ['<div class="news_title"><h3><a href="/article/{i}.html">{title}</a></h3></div>',
+                   '<div class="ndi_main"><a href="/dy/{i}.html">{title}</a></div>'],
+    },
+    'ithome': {
+        'url': 'https://www.ithome.com/',
+        'blocks': ['<h2><a href="/0/{i}.htm">{title}</a></h2>',
+                   '<span class="title"><a href="/0/{i}.htm">{title}</a></span>'],
+    },
+    'baidu': {
+        'url': 'https://top.baidu.com/board?tab=realtime',
+        'blocks': ['<div class="c-single-text-ellipsis">{title}</div>'],
+    },
+    'thepaper': {
+        'url': 'https://www.thepaper.cn/',
+        'blocks': ['<h2><a href="/newsDetail_forward_{i}">{title}</a></h2>'],
+    },
+}
+
+# 热榜API的响应结构（与 hot_news.py / news_fetcher.py 中的解析逻辑对应）
+API_LAYOUTS = {
+    'weibo': lambda titles: {'data': {'realtime': [
+        {'note': title, 'num': 2000000 - i * 37000} for i, title in enumerate(titles)]}},
+    'zhihu': lambda titles: {'data': [
+        {'target': {'title': title, 'answer_count': 3000 - i * 50}} for i, title in enumerate(titles)]},
+    'toutiao': lambda titles: {'data': [
+        {'Title': title, 'HotValue': 5000000 - i * 90000} for i, title in enumerate(titles)]},
+}
+
+# hot_news.py 中直接请求、未在 config.yaml 声明的地址
+HOT_NEWS_URLS = {
+    'https://weibo.com/ajax/side/hotSearch': 'weibo',
+    'https://top.baidu.com/board?tab=realtime': 'baidu',
+    'https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total?limit=10': 'zhihu',
+}
+
+_INDEX_FILE = 'index.json'
+_HTML_TYPE = 'text/html; charset=utf-8'
+_JSON_TYPE = 'application/json; charset=utf-8'
+
+_WORDS = ['国务院', '经济', '科技', '芯片', '教育', '体育', '冠军', '民生', '医疗', '市场',
+          '发展', '改革', '会议', '部署', '人工智能', '政策', '消费', '数据', '创新', '城市']
+
+def _title(rng: random.Random, i: int) -> str:
+    return ''.join(rng.choice(_WORDS) for _ in range(rng.randint(4, 8))) + f"第{i}期"
+
+def synthesize_page(site: str, items: int = 400, seed: int = 0) -> str:
+    """生成一个与站点首页结构相近、大小在几百KB量级的页面"""
+    rng = random.Random(f"{site}-{seed}")
+    layout = SITE_LAYOUTS.get(site, SITE_LAYOUTS['thepaper'])
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>', site, '</title>',
+             '<script>var config = {', 'x' * 2000, '};</script></head><body>',
+             '<div class="nav">', ''.join(f'<a href="/nav{i}">导航{i}</a>' for i in range(60)), '</div>']
+    for i in range(items):
+        # 正文新闻与大量无关的广告、图片、脚本块交错
+        parts.append('<div class="ad"><img src="/ad.png"><span>推广内容</span></div>' * rng.randint(1, 3))
+        parts.append(rng.choice(layout['blocks']).format(i=i, title=_title(rng, i)))
+        parts.append(f'<p class="summary">{_title(rng, i) * 3}</p>')
+    parts.append('<div class="footer">' + ''.join(f'<a href="/f{i}">网站地图{i}</a>' for i in range(80)) + '</div>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+def synthesize_api(site: str, items: int = 50, seed: int = 0) -> str:
+    """生成热榜API的JSON响应"""
+    rng = random.Random(f"{site}-{seed}")
+    titles = [_title(rng, i) for i in range(items)]
+    return json.dumps(API_LAYOUTS[site](titles), ensure_ascii=False)
+
+def fixture_urls() -> Dict[str, str]:
+    """需要样本的全部地址：config.yaml 中启用的新闻源与 hot_news.py 中的热榜地址，返回 {地址: 站点}"""
+    from config import get_config
+
+    urls = {}
+    for source in get_config().news_sources.values():
+        if source.enabled:
+            for url in source.urls or [source.url]:
+                urls.setdefault(url, source.id)
+    for url, site in HOT_NEWS_URLS.items():
+        urls.setdefault(url, site)
+    return urls
+
+def _fixture_name(site: str, url: str, content_type: str) -> str:
+    ext = 'json' if 'json' in content_type else 'html'
+    return f"{site}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.{ext}"
+
+def _load_index() -> Dict[str, Dict[str, str]]:
+    try:
+        with open(os.path.join(FIXTURE_DIR, _INDEX_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_response(url: str, site: str = None) -> Tuple[str, bytes]:
+    """读取某个地址的样本响应 (Content-Type, 响应体)；没有录制时按站点结构合成"""
+    entry = _load_index().get(url)
+    if entry:
+        with open(os.path.join(FIXTURE_DIR, entry['file']), 'rb') as f:
+            return entry['content_type'], f.read()
+
+    site = site or fixture_urls().get(url)
+    if site is None:
+        raise KeyError(url)
+    seed = int(hashlib.sha1(url.encode('utf-8')).hexdigest()[:6], 16)
+    if site in API_LAYOUTS:
+        return _JSON_TYPE, synthesize_api(site, seed=seed).encode('utf-8')
+    return _HTML_TYPE, synthesize_page(site, seed=seed).encode('utf-8')
+
+def synthetic_urls() -> List[str]:
+    """没有录制样本、回放时使用合成页面的地址
+
+    合成页面只是按选择器生成的结构，解析和提取耗时不能反映真实门户页面的变化。
+    """
+    index = _load_index()
+    return [url for url in fixture_urls() if url not in index]
+
+def synthetic_warning(urls: List[str]) -> str:
+    """提示基准结果基于合成页面的警告文本"""
+    return (f"⚠️ {len(urls)} 个地址没有录制样本，使用合成页面（先运行 python -m benchmarks.fixtures 录制）；"
+            f"解析和提取耗时不代表真实页面: {', '.join(urls[:3])}{' ...' if len(urls) > 3 else ''}")
+
+def load_all_responses() -> Dict[str, Tuple[str, bytes]]:
+    """全部地址的样本响应"""
+    return {url: load_response(url, site) for url, site in fixture_urls().items()}
+
+def load_fixture(site: str) -> bytes:
+    """读取站点首页的样本页面"""
+    return load_response(SITE_LAYOUTS[site]['url'], site)[1]
+
+def load_all_fixtures() -> Dict[str, bytes]:
+    return {site: load_fixture(site) for site in SITE_LAYOUTS}
+
+def record_fixtures():
+    """从线上抓取全部地址保存为样本（需要网络）"""
+    from http_client import get_http_client
+    from hot_news import HEADERS
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    index = _load_index()
+    for url, site in fixture_urls().items():
+        try:
+            response = get_http_client().get(url, headers=HEADERS, timeout=10)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"{site} {url}: 录制失败 {e}")
+            continue
+        content_type = response.headers.get('Content-Type', _HTML_TYPE)
+        name = _fixture_name(site, url, content_type)
+        with open(os.path.join(FIXTURE_DIR, name), 'wb') as f:
+            f.write(response.content)
+        index[url] = {'file': name, 'content_type': content_type}
+        print(f"{site} {url}: {len(response.content)} 字节")
+
+    with open(os.path.join(FIXTURE_DIR, _INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    record_fixtures()
@@ -0,0 +1,116 @@
+# benchmarks/replay.py - 回放样本响应的 requests 传输适配器和 aiohttp 会话
+import io
+from datetime import timedelta
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from html_parser import charset_from_headers
+
+class ReplayAdapter(BaseAdapter):
+    """不访问网络，按请求地址直接返回录制（或合成）的响应
+
+    挂载到共享 HttpClient 的 Session 上，抓取代码走的仍是真实的请求路径，
+    只有网络传输被替换掉，基准结果只反映本地的解析、分类、去重和渲染开销。
+    """
+
+    def __init__(self, responses: Dict[str, Tuple[str, bytes]]):
+        super().__init__()
+        self.responses = responses
+        self.requests = 0
+        self.misses = 0
+
+    def lookup(self, url: str) -> Tuple[int, str, str, bytes]:
+        """url 对应的 (状态码, 原因, Content-Type, 响应体)，没有样本时为 404"""
+        self.requests += 1
+        if url in self.responses:
+            content_type, body = self.responses[url]
+            return 200, 'OK', content_type, body
+        self.misses += 1
+        return 404, 'Not Found', 'text/plain', b''
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.elapsed = timedelta(0)
+        response.connection = self
+
+        response.status_code, response.reason, content_type, body = self.lookup(request.url)
+        response.headers = CaseInsensitiveDict({
+            'Content-Type': content_type,
+            'Content-Length': str(len(body)),
+        })
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        return response
+
+    def close(self):
+        pass
+
+class _ReplayContent:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        for pos in range(0, len(self._body), size):
+            yield self._body[pos:pos + size]
+
+class ReplayClientResponse:
+    """AsyncNewsFetcher 用到的 aiohttp.ClientResponse 接口"""
+
+    def __init__(self, url: str, status: int, reason: str, content_type: str, body: bytes):
+        from multidict import CIMultiDict
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDict({'Content-Type': content_type, 'Content-Length': str(len(body))})
+        self.charset: Optional[str] = charset_from_headers(self.headers)
+        self.content = _ReplayContent(body)
+        self._body = body
+
+    async def __aenter__(self) -> 'ReplayClientResponse':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            import aiohttp
+            from yarl import URL
+            request_info = aiohttp.RequestInfo(URL(self.url), 'GET', self.headers, URL(self.url))
+            raise aiohttp.ClientResponseError(request_info, (), status=self.status, message=self.reason)
+
+    async def read(self) -> bytes:
+        return self._body
+
+    def close(self):
+        pass
+
+class ReplayClientSession:
+    """不访问网络的 aiohttp 会话，与 ReplayAdapter 共用样本和请求计数"""
+
+    def __init__(self, adapter: ReplayAdapter):
+        self.adapter = adapter
+
+    async def __aenter__(self) -> 'ReplayClientSession':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def get(self, url: str, **kwargs) -> ReplayClientResponse:
+        return ReplayClientResponse(url, *self.adapter.lookup(url))
+
+def install(client, responses: Dict[str, Tuple[str, bytes]]) -> ReplayAdapter:
+    """把回放适配器挂载到 HttpClient 上，并关闭磁盘HTTP缓存和按主机限速"""
+    adapter = ReplayAdapter(responses)
+    client.session.mount('http://', adapter)
+    client.session.mount('https://', adapter)
+    client.cache = None
+    client.limiter = None
+    return adapter
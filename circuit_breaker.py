@@ -0,0 +1,147 @@
+# circuit_breaker.py - 新闻源与主机的断路器（跨运行保存状态）
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """断路器打开，请求被直接跳过"""
+
+class CircuitBreaker:
+    """断路器：连续失败达到阈值后打开，一段时间内直接跳过，之后半开试探
+
+    - closed: 正常请求，连续失败 failure_threshold 次后打开
+    - open: 直接跳过，打开超过 reset_timeout 秒后转为半开
+    - half_open: 只放行一次试探，成功则关闭，失败则重新打开
+
+    状态按键（如 "source:xinhua"、"host:www.xinhuanet.com"）保存在JSON文件中，
+    下一次运行启动时读入，同一个故障站点不会在每次运行中都耗尽全部重试。
+    """
+
+    def __init__(self, path: str = ".cache/circuit_breaker.json", failure_threshold: int = 3,
+                 reset_timeout: float = 6 * 3600):
+        self.path = path
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = self._load()
+        # 本次运行中已放行试探的键，半开状态下只试探一次
+        self._probing = set()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                states = json.load(f)
+            return states if isinstance(states, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _state(self, key: str) -> Dict:
+        return self._states.setdefault(key, {
+            'state': CLOSED, 'failures': 0, 'opened_at': 0.0,
+            'last_failure': 0.0, 'last_success': 0.0, 'total_failures': 0, 'total_successes': 0
+        })
+
+    def allow(self, key: str) -> bool:
+        """是否允许请求；打开状态超时后放行一次试探"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state['state'] == CLOSED:
+                return True
+            if state['state'] == OPEN:
+                if time.time() - state['opened_at'] < self.reset_timeout:
+                    return False
+                state['state'] = HALF_OPEN
+                logger.info(f"🔌 {key} 断路器半开，试探一次")
+            if key in self._probing:
+                return False
+            self._probing.add(key)
+            return True
+
+    def is_closed(self, key: str) -> bool:
+        """是否处于关闭（正常）状态；只查询，不改变状态也不占用半开试探"""
+        with self._lock:
+            state = self._states.get(key)
+            return state is None or state['state'] == CLOSED
+
+    def probing(self, key: str) -> bool:
+        """当前是否处于半开试探"""
+        with self._lock:
+            state = self._states.get(key)
+            return state is not None and state['state'] == HALF_OPEN
+
+    def record_success(self, key: str):
+        with self._lock:
+            state = self._state(key)
+            if state['state'] != CLOSED:
+                logger.info(f"✅ {key} 已恢复，断路器关闭")
+            state.update(state=CLOSED, failures=0, last_success=time.time())
+            state['total_successes'] += 1
+            self._probing.discard(key)
+
+    def record_failure(self, key: str):
+        with self._lock:
+            state = self._state(key)
+            now = time.time()
+            state['failures'] += 1
+            state['total_failures'] += 1
+            state['last_failure'] = now
+            if state['state'] == HALF_OPEN or state['failures'] >= self.failure_threshold:
+                if state['state'] != OPEN:
+                    logger.warning(f"⛔ {key} 连续失败 {state['failures']} 次，断路器打开")
+                state.update(state=OPEN, opened_at=now)
+            self._probing.discard(key)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """各键的健康状态"""
+        with self._lock:
+            return {key: dict(state) for key, state in self._states.items()}
+
+    def open_keys(self):
+        with self._lock:
+            return sorted(key for key, state in self._states.items() if state['state'] != CLOSED)
+
+    def save(self):
+        """保存状态，供下一次运行使用"""
+        with self._lock:
+            data = json.dumps(self._states, ensure_ascii=False, indent=2).encode('utf-8')
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存断路器状态失败: {e}")
+
+# 全局断路器实例
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """获取全局断路器，未启用时返回 None"""
+    global _circuit_breaker
+    settings = get_config().app_config
+    if not settings.circuit_breaker_enabled:
+        return None
+    if _circuit_breaker is None:
+        with _circuit_breaker_lock:
+            if _circuit_breaker is None:
+                _circuit_breaker = CircuitBreaker(
+                    path=settings.circuit_breaker_path,
+                    failure_threshold=settings.circuit_breaker_threshold,
+                    reset_timeout=settings.circuit_breaker_reset_minutes * 60
+                )
+    return _circuit_breaker
@@ -6,6 +6,8 @@ from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field
 import logging
 
+from json_path import JsonPath, compile_json_path
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -22,6 +24,27 @@ class NewsSourceConfig:
     limit: int = 10
     timeout: int = 10
     priority: int = 1
+    stream: bool = False
+    # 以下为声明式抓取规则（见 source_engine.py）
+    label: str = ""
+    urls: List[str] = field(default_factory=list)
+    selectors: List[str] = field(default_factory=list)
+    min_title_len: int = 4
+    max_title_len: int = 200
+    stop_words: List[str] = field(default_factory=list)
+    require_words: List[str] = field(default_factory=list)
+    base_hot: int = 100
+    weight: float = 1.0
+    # 大于0时热度按榜单名次递减：第 i 条（从0开始）为 base_hot - i * rank_decay，保持榜单顺序
+    rank_decay: int = 0
+    # 在标题后显示热度，如 "🔥8w"
+    show_hot: bool = False
+    referer: str = ""
+    collect_limit: int = 0
+    fallback: str = ""
+    budget: float = 0
+    # 加载配置时由 json_path 编译（见 json_path.py），抓取时不再解析表达式
+    compiled_path: Optional[JsonPath] = field(default=None, repr=False, compare=False)
     
 @dataclass
 class CategoryConfig:
@@ -40,6 +63,21 @@ class EmailConfig:
     smtp_server: str = "smtp.qq.com"
     smtp_port: int = 587
     timeout: int = 10
+    security: str = "starttls"
+    pool_size: int = 1
+    rcpt_batch: int = 50
+    messages_per_connection: int = 100
+    rate_per_minute: float = 0
+    max_retries: int = 3
+    eight_bit: bool = True
+    recipients_file: str = ""
+    html_mode: str = "full"
+    html_budget: int = 0
+    delivery_workers: int = 1
+    spool_dir: str = ".cache/spool"
+    delivery_max_attempts: int = 5
+    retry_delay: float = 60
+    delivery_wait: float = 300
 
 @dataclass
 class AppConfig:
@@ -49,9 +87,31 @@ class AppConfig:
     timezone: str = "Asia/Shanghai"
     schedule_time: str = "08:00"
     request_delay: float = 1.0
+    rate_limit_burst: int = 1
+    host_delays: Dict[str, float] = field(default_factory=dict)
     max_retries: int = 2
     default_timeout: int = 10
     log_level: str = "INFO"
+    max_workers: int = 8
+    run_deadline: float = 240
+    source_budget: float = 30
+    max_per_host: int = 2
+    pool_connections: int = 20
+    pool_maxsize: int = 4
+    http_cache_enabled: bool = True
+    http_cache_dir: str = ".cache/http"
+    http_cache_max_mb: int = 50
+    http_cache_max_age_hours: int = 168
+    history_enabled: bool = True
+    history_path: str = ".cache/news_history.sqlite3"
+    history_retention_days: int = 30
+    incremental: bool = False
+    rising_ratio: float = 1.5
+    report_dir: str = ".cache/reports"
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_path: str = ".cache/circuit_breaker.json"
+    circuit_breaker_threshold: int = 3
+    circuit_breaker_reset_minutes: int = 360
 
 class ConfigManager:
     """配置管理器"""
@@ -105,26 +165,68 @@ class ConfigManager:
         """解析配置数据"""
         # 应用配置
         app_data = self.config_data.get('app', {})
+        http_cache_data = self.config_data.get('settings', {}).get('http_cache', {})
+        history_data = self.config_data.get('settings', {}).get('history', {})
+        breaker_data = self.config_data.get('settings', {}).get('circuit_breaker', {})
         self.app_config = AppConfig(
             name=app_data.get('name', '新闻系统'),
             version=app_data.get('version', '1.0.0'),
             timezone=app_data.get('timezone', 'Asia/Shanghai'),
             schedule_time=self.config_data.get('schedule', {}).get('time', '08:00'),
             request_delay=self.config_data.get('settings', {}).get('request_delay', 1.0),
+            rate_limit_burst=self.config_data.get('settings', {}).get('rate_limit_burst', 1),
+            host_delays=self.config_data.get('settings', {}).get('host_delays') or {},
             max_retries=self.config_data.get('settings', {}).get('max_retries', 2),
             default_timeout=self.config_data.get('settings', {}).get('timeout', 10),
-            log_level=self.config_data.get('settings', {}).get('log_level', 'INFO')
+            log_level=self.config_data.get('settings', {}).get('log_level', 'INFO'),
+            max_workers=self.config_data.get('settings', {}).get('max_workers', 8),
+            run_deadline=self.config_data.get('settings', {}).get('run_deadline', 240),
+            source_budget=self.config_data.get('settings', {}).get('source_budget', 30),
+            max_per_host=self.config_data.get('settings', {}).get('max_per_host', 2),
+            pool_connections=self.config_data.get('settings', {}).get('pool_connections', 20),
+            pool_maxsize=self.config_data.get('settings', {}).get('pool_maxsize', 4),
+            http_cache_enabled=http_cache_data.get('enabled', True),
+            http_cache_dir=http_cache_data.get('dir', '.cache/http'),
+            http_cache_max_mb=http_cache_data.get('max_mb', 50),
+            http_cache_max_age_hours=http_cache_data.get('max_age_hours', 168),
+            history_enabled=history_data.get('enabled', True),
+            history_path=history_data.get('path', '.cache/news_history.sqlite3'),
+            history_retention_days=history_data.get('retention_days', 30),
+            incremental=history_data.get('incremental', False),
+            rising_ratio=history_data.get('rising_ratio', 1.5),
+            report_dir=self.config_data.get('settings', {}).get('report_dir', '.cache/reports'),
+            circuit_breaker_enabled=breaker_data.get('enabled', True),
+            circuit_breaker_path=breaker_data.get('path', '.cache/circuit_breaker.json'),
+            circuit_breaker_threshold=breaker_data.get('failure_threshold', 3),
+            circuit_breaker_reset_minutes=breaker_data.get('reset_minutes', 360)
         )
         
         # 邮件配置
         email_data = self.config_data.get('email', {})
         smtp_data = email_data.get('smtp', {})
+        delivery_data = email_data.get('delivery', {})
+        html_data = email_data.get('html', {})
         self.email_config = EmailConfig(
             subject_template=email_data.get('subject_template', '📰 每日新闻速递 {date}'),
             from_name=email_data.get('from_name', '新闻机器人'),
             smtp_server=smtp_data.get('server', 'smtp.qq.com'),
             smtp_port=smtp_data.get('port', 587),
-            timeout=smtp_data.get('timeout', 10)
+            timeout=smtp_data.get('timeout', 10),
+            security=smtp_data.get('security', 'starttls'),
+            pool_size=smtp_data.get('pool_size', 1),
+            rcpt_batch=smtp_data.get('rcpt_batch', 50),
+            messages_per_connection=smtp_data.get('messages_per_connection', 100),
+            rate_per_minute=smtp_data.get('rate_per_minute', 0),
+            max_retries=smtp_data.get('max_retries', 3),
+            eight_bit=smtp_data.get('eight_bit', True),
+            recipients_file=email_data.get('recipients_file', ''),
+            html_mode=html_data.get('mode', 'full'),
+            html_budget=html_data.get('budget', 0),
+            delivery_workers=delivery_data.get('workers', 1),
+            spool_dir=delivery_data.get('spool_dir', '.cache/spool'),
+            delivery_max_attempts=delivery_data.get('max_attempts', 5),
+            retry_delay=delivery_data.get('retry_delay', 60),
+            delivery_wait=delivery_data.get('wait', 300)
         )
         
         # 新闻源配置
@@ -143,8 +245,26 @@ class ConfigManager:
                     json_path=source_data.get('json_path', ''),
                     limit=source_data.get('limit', 10),
                     timeout=source_data.get('timeout', 10),
-                    priority=source_data.get('priority', 1)
+                    priority=source_data.get('priority', 1),
+                    stream=source_data.get('stream', False),
+                    label=source_data.get('label', ''),
+                    urls=source_data.get('urls', []),
+                    selectors=source_data.get('selectors', []),
+                    min_title_len=source_data.get('min_title_len', 4),
+                    max_title_len=source_data.get('max_title_len', 200),
+                    stop_words=source_data.get('stop_words', []),
+                    require_words=source_data.get('require_words', []),
+                    base_hot=source_data.get('base_hot', 100),
+                    weight=source_data.get('weight', 1.0),
+                    rank_decay=source_data.get('rank_decay', 0),
+                    show_hot=source_data.get('show_hot', False),
+                    referer=source_data.get('referer', ''),
+                    collect_limit=source_data.get('collect_limit', 0),
+                    fallback=source_data.get('fallback', ''),
+                    budget=source_data.get('budget', 0)
                 )
+                if config.json_path:
+                    config.compiled_path = compile_json_path(config.json_path)
                 self.news_sources[source_id] = config
             except Exception as e:
                 logger.error(f"解析新闻源 {source_id} 配置失败: {e}")
@@ -0,0 +1,79 @@
+# deadline.py - 运行截止时间与新闻源时间预算
+import math
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+from config import get_config
+
+class DeadlineExceeded(TimeoutError):
+    """超出运行截止时间或新闻源时间预算"""
+
+class Deadline:
+    """一个截止时刻；seconds 为空或不大于0时表示不限时"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds if seconds and seconds > 0 else math.inf
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def wait_timeout(self) -> Optional[float]:
+        """作为 wait()/acquire() 的超时参数：不限时返回 None"""
+        return None if self.expires_at == math.inf else max(0.0, self.remaining())
+
+    def limit(self, timeout):
+        """把单次请求的超时限制在剩余时间内，已到期时抛出 DeadlineExceeded
+
+        timeout 可以是秒数、(连接, 读取) 元组或 None。
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("已超出时间预算")
+        if remaining == math.inf:
+            return timeout
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
+
+_run_deadline = Deadline()
+# 当前新闻源的时间预算，只在抓取该新闻源的线程 / 协程内有效
+_source_deadline = contextvars.ContextVar('source_deadline', default=None)
+
+def start_run_deadline(seconds: Optional[float]) -> Deadline:
+    """开始一次运行，设置整体截止时间"""
+    global _run_deadline
+    _run_deadline = Deadline(seconds)
+    return _run_deadline
+
+def run_deadline() -> Deadline:
+    return _run_deadline
+
+def current_deadline() -> Deadline:
+    """当前生效的截止时间：新闻源预算（已按运行截止时间收紧）或运行截止时间"""
+    return _source_deadline.get() or _run_deadline
+
+@contextmanager
+def budget(seconds: Optional[float]):
+    """在代码块内限制新闻源的时间预算，不会超过运行的剩余时间"""
+    deadline = Deadline(seconds)
+    deadline.expires_at = min(deadline.expires_at, _run_deadline.expires_at)
+    token = _source_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _source_deadline.reset(token)
+
+def source_budget(source_id: str) -> float:
+    """新闻源的时间预算：config.yaml 中该新闻源的 budget，未设置时使用 settings.source_budget"""
+    config = get_config()
+    source = config.news_sources.get(source_id)
+    if source is not None and source.budget > 0:
+        return source.budget
+    return config.app_config.source_budget
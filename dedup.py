@@ -0,0 +1,128 @@
+# dedup.py - 跨新闻源的近似重复检测
+import re
+import random
+import hashlib
+import unicodedata
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+# 序号 "3. "、来源前缀 "人民网: " / "国际[美国]: "、热度标签 " 🔥12w"
+_RANK_PREFIX = re.compile(r'^\d+\.\s*')
+_SOURCE_PREFIX = re.compile(r'^[^:\s]{1,12}(\[[^\]]*\])?:\s+')
+_HOT_TAG = re.compile(r'\s*🔥\S*')
+_NOISE = re.compile(r'[\W_]+', re.UNICODE)
+
+def normalize_title(title: str) -> str:
+    """归一化标题：去掉序号、来源前缀、热度标签、标点和空白，全角转半角、统一小写"""
+    title = _RANK_PREFIX.sub('', title or '')
+    title = _SOURCE_PREFIX.sub('', title)
+    title = _HOT_TAG.sub('', title)
+    title = unicodedata.normalize('NFKC', title)
+    return _NOISE.sub('', title).lower()
+
+def shingles(text: str, n: int = 2) -> FrozenSet[str]:
+    """字符 n-gram 集合；中文标题不分词，直接按字切片"""
+    if len(text) <= n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(num_perm: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+class MinHashIndex:
+    """MinHash + LSH 近似重复索引
+
+    每个标题的 n-gram 集合压缩成 num_perm 个最小哈希值，再切成 bands 段分桶；
+    只有至少一段完全相同的标题才会成为候选，再用真实的 Jaccard 相似度确认。
+    查找代价只与同桶候选数有关，不随已收录标题总数线性增长。
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 48, bands: int = 16, ngram: int = 2):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.threshold = threshold
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._perms = _permutations(num_perm)
+        self._buckets: List[Dict[tuple, List[Hashable]]] = [{} for _ in range(bands)]
+        self._shingles: Dict[Hashable, FrozenSet[str]] = {}
+        self._exact: Dict[str, Hashable] = {}
+
+    def signature(self, grams: FrozenSet[str]) -> List[int]:
+        """计算 MinHash 签名"""
+        hashes = [int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for g in grams]
+        if not hashes:
+            return [_MAX_HASH] * len(self._perms)
+        return [min((a * h + b) % _MERSENNE_PRIME & _MAX_HASH for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, signature: List[int]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+    def find(self, normalized: str) -> Optional[Hashable]:
+        """查找已收录的近似重复项，返回其标识；没有则返回 None"""
+        if normalized in self._exact:
+            return self._exact[normalized]
+        grams = shingles(normalized, self.ngram)
+        checked = set()
+        for band, key in self._band_keys(self.signature(grams)):
+            for item_id in self._buckets[band].get(key, ()):
+                if item_id in checked:
+                    continue
+                checked.add(item_id)
+                if jaccard(grams, self._shingles[item_id]) >= self.threshold:
+                    return item_id
+        return None
+
+    def add(self, normalized: str, item_id: Hashable):
+        """收录一个标题"""
+        grams = shingles(normalized, self.ngram)
+        self._exact.setdefault(normalized, item_id)
+        self._shingles[item_id] = grams
+        for band, key in self._band_keys(self.signature(grams)):
+            self._buckets[band].setdefault(key, []).append(item_id)
+
+def assign_stories(candidates: Dict[str, List[Dict]], order: Sequence[str] = None,
+                   threshold: float = 0.7) -> Tuple[Dict[str, List[Dict]], int]:
+    """全局去重：同一新闻（含近似重复）只保留一次，并归入最合适的类别
+
+    candidates 为 {类别: [新闻]}，新闻字典需含 title、hot，可选 score（该类别关键词命中数）。
+    按 score、hot、类别顺序从高到低依次收录，后出现的重复项被丢弃。
+    返回 (去重后的 {类别: [新闻]}, 丢弃的重复条数)。
+    """
+    order = list(order or candidates)
+    rank = {category: i for i, category in enumerate(order)}
+    entries = [
+        (news.get('score', 0), news.get('hot', 0), -rank[category], category, news)
+        for category in order
+        for news in candidates.get(category, [])
+    ]
+    entries.sort(key=lambda entry: entry[:3], reverse=True)
+
+    index = MinHashIndex(threshold=threshold)
+    assigned: Dict[str, List[Dict]] = {category: [] for category in order}
+    duplicates = 0
+    for _, _, _, category, news in entries:
+        normalized = normalize_title(news['title'])
+        if not normalized:
+            continue
+        if index.find(normalized) is not None:
+            duplicates += 1
+            continue
+        index.add(normalized, (category, len(assigned[category])))
+        assigned[category].append(news)
+
+    for category in assigned:
+        assigned[category].sort(key=lambda news: news.get('hot', 0), reverse=True)
+    return assigned, duplicates
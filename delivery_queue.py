@@ -0,0 +1,257 @@
+# delivery_queue.py - 邮件投递队列（后台发送，可选磁盘暂存）
+import os
+import json
+import time
+import uuid
+import heapq
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from config import EmailConfig
+from instrumentation import get_recorder
+from mailer import BulkMailer, message_bytes
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DeliveryJob:
+    """一封待投递的邮件：已序列化的邮件内容和尚未送达的收件人"""
+    id: str
+    data: bytes
+    recipients: List[str]
+    label: str = ""
+    # MAIL FROM 参数，如 8bit 编码的邮件需要 BODY=8BITMIME
+    mail_options: List[str] = field(default_factory=list)
+    attempts: int = 0
+    sent: int = 0
+    failed: dict = field(default_factory=dict)
+    not_before: float = 0.0
+    created: float = field(default_factory=time.time)
+    done: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待投递结束（全部送达或放弃重试），返回是否已结束"""
+        return self.done.wait(timeout)
+
+    def meta(self) -> dict:
+        return {
+            'id': self.id, 'label': self.label, 'recipients': self.recipients,
+            'mail_options': self.mail_options,
+            'attempts': self.attempts, 'sent': self.sent, 'failed': self.failed,
+            'created': self.created
+        }
+
+class DeliveryQueue:
+    """邮件投递队列
+
+    submit() 只把渲染好的邮件放入队列，后台工作线程通过 BulkMailer 发送，
+    调用方可以同时准备下一封邮件（另一组收件人或另一版摘要）。
+    启用 spool_dir 时每封邮件先写入磁盘：临时失败的收件人按 retry_delay 在本次运行内重试，
+    进程退出时仍未送达的邮件留在暂存目录中，下一次运行用 recover() 重新投递，不需要重新抓取新闻。
+    """
+
+    def __init__(self, mailer: BulkMailer, workers: int = 1, spool_dir: str = "",
+                 max_attempts: int = 5, retry_delay: float = 60):
+        self.mailer = mailer
+        self.workers = max(1, workers)
+        self.spool_dir = spool_dir
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        # 按 (可发送时刻, 序号) 排序的堆，序号保证同一时刻先进先出
+        self._heap = []
+        self._seq = 0
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        # 本进程中已入队的邮件，recover() 不会重复加载
+        self._known = set()
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_config(cls, email_config: EmailConfig, mailer: BulkMailer) -> 'DeliveryQueue':
+        return cls(
+            mailer,
+            workers=email_config.delivery_workers,
+            spool_dir=email_config.spool_dir,
+            max_attempts=email_config.delivery_max_attempts,
+            retry_delay=email_config.retry_delay
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        self._closed = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"delivery-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, message, recipients: List[str], label: str = "",
+               mail_options: Sequence[str] = ()) -> DeliveryJob:
+        """把邮件放入队列，立即返回；message 为 email.message 对象或已序列化的字节"""
+        data = message_bytes(message)
+        job = DeliveryJob(id=uuid.uuid4().hex, data=data, recipients=list(recipients), label=label,
+                          mail_options=list(mail_options))
+        self._spool(job, write_body=True)
+        self._put(job)
+        logger.info(f"📬 邮件已入队: {label or job.id}，{len(job.recipients)} 个收件人")
+        return job
+
+    def recover(self) -> List[DeliveryJob]:
+        """把暂存目录中上次运行未送达的邮件重新放入队列"""
+        jobs = []
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return jobs
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith('.json'):
+                continue
+            job_id = name[:-len('.json')]
+            if job_id in self._known:
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name), 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                with open(self._path(job_id, '.eml'), 'rb') as f:
+                    data = f.read()
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取暂存邮件 {job_id} 失败: {e}")
+                continue
+            job = DeliveryJob(
+                id=job_id, data=data, recipients=meta.get('recipients', []), label=meta.get('label', ''),
+                mail_options=meta.get('mail_options', []), attempts=meta.get('attempts', 0),
+                sent=meta.get('sent', 0), failed=meta.get('failed', {}),
+                created=meta.get('created', time.time())
+            )
+            self._put(job)
+            jobs.append(job)
+        if jobs:
+            logger.info(f"📬 从暂存目录恢复 {len(jobs)} 封未送达的邮件")
+        return jobs
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的邮件全部结束，返回是否在超时前结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        """停止工作线程；尚未送达的邮件保留在暂存目录中"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.mailer.close()
+
+    def _put(self, job: DeliveryJob, counted: bool = False):
+        with self._cond:
+            self._known.add(job.id)
+            heapq.heappush(self._heap, (job.not_before, self._seq, job))
+            self._seq += 1
+            if not counted:
+                self._pending += 1
+            self._cond.notify()
+
+    def _take(self) -> Optional[DeliveryJob]:
+        """取出下一封已到发送时刻的邮件，队列关闭时返回 None"""
+        with self._cond:
+            while not self._closed:
+                if self._heap:
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        return heapq.heappop(self._heap)[2]
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _work(self):
+        while True:
+            job = self._take()
+            if job is None:
+                return
+            try:
+                self._deliver(job)
+            except Exception as e:
+                logger.error(f"❌ 投递 {job.label or job.id} 异常: {e}")
+                self._finish(job)
+
+    def _deliver(self, job: DeliveryJob):
+        job.attempts += 1
+        with get_recorder().stage('smtp') as stage:
+            report = self.mailer.send_bytes(job.data, job.recipients, job.mail_options)
+            stage['items'] = report.sent
+        job.sent += report.sent
+        job.failed.update(report.failed)
+        retry = report.retryable if job.attempts < self.max_attempts else []
+        if retry:
+            # 只重试临时失败的收件人，已送达的不会重复发送
+            job.recipients = retry
+            for address in retry:
+                job.failed.pop(address, None)
+            job.not_before = time.time() + self.retry_delay
+            self._spool(job)
+            logger.warning(f"📬 {job.label or job.id}: {len(retry)} 个收件人暂时失败，"
+                           f"{self.retry_delay:.0f} 秒后第 {job.attempts + 1} 次投递")
+            self._put(job, counted=True)
+            return
+        logger.info(f"📬 {job.label or job.id} 投递结束: 成功 {job.sent} 个，失败 {len(job.failed)} 个")
+        self._finish(job)
+
+    def _finish(self, job: DeliveryJob):
+        self._unspool(job)
+        job.done.set()
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.spool_dir, job_id + suffix)
+
+    def _spool(self, job: DeliveryJob, write_body: bool = False):
+        """把邮件写入暂存目录；先写邮件内容，再写元数据，元数据存在即表示可恢复"""
+        if not self.spool_dir:
+            return
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            if write_body:
+                self._write(self._path(job.id, '.eml'), job.data)
+            self._write(self._path(job.id, '.json'),
+                        json.dumps(job.meta(), ensure_ascii=False, indent=2).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"写入暂存邮件失败: {e}")
+
+    def _unspool(self, job: DeliveryJob):
+        if not self.spool_dir:
+            return
+        for suffix in ('.json', '.eml'):
+            try:
+                os.remove(self._path(job.id, suffix))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"删除暂存邮件失败: {e}")
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
@@ -1,69 +1,51 @@
 # email_generator.py - 邮件生成模块
 from datetime import datetime
-from typing import List, Dict, Any
-import re
+from dataclasses import dataclass, field
+from email.header import Header
+from email.utils import formataddr, formatdate
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional
+import uuid
+import logging
+import functools
 
-class EmailGenerator:
-    def __init__(self, config):
-        self.config = config
-    
-    def generate_text_email(self, categorized_news: Dict[str, List[Dict]]) -> str:
-        """生成纯文本邮件"""
-        today = datetime.now().strftime("%Y年%m月%d日")
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        text = f"""
-📰 {self.config.app_config.name} ({today})
+from instrumentation import timed
+from lean_html import fit_budget, lean_templates
+from mime_builder import EIGHT_BIT, QUOTED_PRINTABLE, eight_bit_safe, encode_body
+from news_item import NewsItem
+from templates import Template
+
+logger = logging.getLogger(__name__)
+
+# 邮件模板在导入时编译一次，渲染时只填入占位符。
+# 邮件按 头部 / 问候语与统计 / 各类别 / 页脚 分段，各段都以换行结束，
+# 可以单独编码后按收件人拼接（见 EmailGenerator.render_edition）
+TEXT_HEAD = Template("""
+📰 {{ name }} ({{ today }})
 ============================================
-更新时间: {current_time}
-版本: {self.config.app_config.version}
+更新时间: {{ current_time }}
+版本: {{ version }}
 
-"""
-        
-        for category, news_items in categorized_news.items():
-            if news_items:
-                text += f"\n【{category}】\n"
-                for i, item in enumerate(news_items, 1):
-                    text += f"  {i}. {item['title']} [{item['source']}]\n"
-                text += "\n"
-        
-        text += """
+""")
+
+TEXT_GREETING = Template("""{{ greeting }}
+
+""")
+
+TEXT_FOOT = Template("""
 ============================================
 本邮件由 GitHub Actions 自动发送
 每日定时推送: 08:00 (北京时间)
-"""
-        
-        return text
-    
-    def generate_html_email(self, categorized_news: Dict[str, List[Dict]], 
-                           all_news: Dict[str, Any]) -> str:
-        """生成HTML邮件"""
-        today = datetime.now().strftime("%Y年%m月%d日")
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        # 统计
-        total_news = sum(len(items) for items in categorized_news.values())
-        enabled_sources = [s for s in self.config.news_sources.values() if s.enabled]
-        
-        # 类别样式
-        category_styles = {
-            "时政": {"icon": "🏛️", "color": "#dc3545", "class": "category-1"},
-            "经济": {"icon": "📈", "color": "#28a745", "class": "category-2"},
-            "民生": {"icon": "🏠", "color": "#17a2b8", "class": "category-3"},
-            "科技": {"icon": "💻", "color": "#ffc107", "class": "category-4"},
-            "热点": {"icon": "🔥", "color": "#6f42c1", "class": "category-5"}
-        }
-        
-        # 构建HTML
-        html = f"""
+""")
+
+HTML_HEAD = Template("""
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>每日热点新闻 - {today}</title>
+    <title>每日热点新闻 - {{ today }}</title>
     <style>
-        body {{
+        body {
             font-family: 'Microsoft YaHei', Arial, sans-serif;
             line-height: 1.6;
             color: #333;
@@ -71,31 +53,31 @@ class EmailGenerator:
             margin: 0 auto;
             padding: 20px;
             background: #f5f7fa;
-        }}
-        .container {{
+        }
+        .container {
             background: white;
             border-radius: 10px;
             box-shadow: 0 5px 20px rgba(0,0,0,0.1);
             padding: 30px;
             margin-top: 20px;
-        }}
-        .header {{
+        }
+        .header {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 30px;
             border-radius: 10px;
             margin-bottom: 30px;
             text-align: center;
-        }}
-        .header h1 {{
+        }
+        .header h1 {
             margin: 0;
             font-size: 28px;
-        }}
-        .header .subtitle {{
+        }
+        .header .subtitle {
             margin-top: 10px;
             opacity: 0.9;
-        }}
-        .stats {{
+        }
+        .stats {
             display: flex;
             justify-content: space-around;
             background: #f8f9fa;
@@ -103,72 +85,72 @@ class EmailGenerator:
             border-radius: 8px;
             margin-bottom: 30px;
             font-size: 14px;
-        }}
-        .stat-item {{
+        }
+        .stat-item {
             text-align: center;
-        }}
-        .stat-value {{
+        }
+        .stat-value {
             font-size: 24px;
             font-weight: bold;
             color: #667eea;
-        }}
-        .category-section {{
+        }
+        .category-section {
             margin-bottom: 25px;
             border: 1px solid #e1e4e8;
             border-radius: 8px;
             padding: 20px;
             background: white;
-        }}
-        .category-title {{
+        }
+        .category-title {
             font-size: 20px;
             margin-bottom: 15px;
             padding-bottom: 10px;
             border-bottom: 3px solid;
             display: flex;
             align-items: center;
-        }}
-        .category-1 {{ color: #dc3545; border-color: #dc3545; }}
-        .category-2 {{ color: #28a745; border-color: #28a745; }}
-        .category-3 {{ color: #17a2b8; border-color: #17a2b8; }}
-        .category-4 {{ color: #ffc107; border-color: #ffc107; }}
-        .category-5 {{ color: #6f42c1; border-color: #6f42c1; }}
+        }
+        .category-1 { color: #dc3545; border-color: #dc3545; }
+        .category-2 { color: #28a745; border-color: #28a745; }
+        .category-3 { color: #17a2b8; border-color: #17a2b8; }
+        .category-4 { color: #ffc107; border-color: #ffc107; }
+        .category-5 { color: #6f42c1; border-color: #6f42c1; }
         
-        .news-item {{
+        .news-item {
             margin-bottom: 12px;
             padding: 12px;
             background: #f8f9fa;
             border-radius: 6px;
             border-left: 4px solid;
-        }}
-        .news-title {{
+        }
+        .news-title {
             font-weight: 500;
             margin-bottom: 5px;
-        }}
-        .news-source {{
+        }
+        .news-source {
             font-size: 13px;
             color: #6c757d;
-        }}
-        .footer {{
+        }
+        .footer {
             text-align: center;
             margin-top: 40px;
             padding-top: 20px;
             border-top: 1px solid #e1e4e8;
             color: #6a737d;
             font-size: 14px;
-        }}
-        .category-icon {{
+        }
+        .category-icon {
             margin-right: 10px;
             font-size: 24px;
-        }}
-        .hot-badge {{
+        }
+        .hot-badge {
             background: #ff6b6b;
             color: white;
             padding: 2px 8px;
             border-radius: 10px;
             font-size: 12px;
             margin-left: 8px;
-        }}
-        .news-rank {{
+        }
+        .news-rank {
             display: inline-block;
             width: 24px;
             height: 24px;
@@ -179,75 +161,330 @@ class EmailGenerator:
             border-radius: 50%;
             margin-right: 10px;
             font-size: 14px;
-        }}
+        }
     </style>
 </head>
 <body>
     <div class="header">
         <h1>📰 每日热点新闻速递</h1>
-        <div class="subtitle">{today} | 更新时间: {current_time}</div>
+        <div class="subtitle">{{ today }} | 更新时间: {{ current_time }}</div>
     </div>
     
     <div class="container">
-        <div class="stats">
+""", autoescape=True)
+
+HTML_GREETING = Template("""        <p class="greeting">{{ greeting }}</p>
+""", autoescape=True)
+
+HTML_STATS = Template("""        <div class="stats">
             <div class="stat-item">
-                <div class="stat-value">{total_news}</div>
+                <div class="stat-value">{{ total_news }}</div>
                 <div>精选新闻</div>
             </div>
             <div class="stat-item">
-                <div class="stat-value">{len(enabled_sources)}</div>
+                <div class="stat-value">{{ source_count }}</div>
                 <div>新闻来源</div>
             </div>
             <div class="stat-item">
-                <div class="stat-value">{len(categorized_news)}</div>
+                <div class="stat-value">{{ category_count }}</div>
                 <div>新闻类别</div>
             </div>
         </div>
-"""
-        
-        # 按类别显示新闻
-        for category, items in categorized_news.items():
-            if items:
-                style = category_styles.get(category, category_styles['热点'])
-                
-                html += f"""
+""", autoescape=True)
+
+HTML_FOOT = Template("""
+        <div class="footer">
+            <p>📧 本邮件由 GitHub Actions 自动生成并发送 | 每日早8点准时推送</p>
+            <p>🔧 技术支持: {{ name }} v{{ version }}</p>
+            <p>⏰ 数据采集时间: {{ collected_at }}</p>
+        </div>
+    </div>
+</body>
+</html>
+""", autoescape=True)
+
+HTML_CATEGORY = Template("""
         <div class="category-section">
-            <div class="category-title {style['class']}">
-                <span class="category-icon">{style['icon']}</span>
-                {category}
+            <div class="category-title {{ css_class|safe }}">
+                <span class="category-icon">{{ icon|safe }}</span>
+                {{ category }}
             </div>
-"""
-                
-                for i, item in enumerate(items, 1):
-                    hot_html = ""
-                    if '🔥' in item['original']:
-                        hot_match = re.search(r'🔥(\d+\w*)', item['original'])
-                        if hot_match:
-                            hot_html = f'<span class="hot-badge">🔥{hot_match.group(1)}</span>'
-                    
-                    html += f"""
+{{ items }}        </div>""", autoescape=True)
+
+HTML_NEWS_ITEM = Template("""
             <div class="news-item">
                 <div class="news-title">
-                    <span class="news-rank">{i}</span>
-                    {item['title']}
-                    {hot_html}
+                    <span class="news-rank">{{ rank|safe }}</span>
+                    {{ title }}
+                    {{ hot|safe }}
                 </div>
-                <div class="news-source">{item['source']}</div>
+                <div class="news-source">{{ source }}</div>
             </div>
-"""
-                
-                html += "        </div>"
+""", autoescape=True)
+
+HOT_BADGE = Template('<span class="hot-badge">🔥{{ hot }}</span>', autoescape=True)
+
+# 类别样式
+CATEGORY_STYLES = {
+    "时政": {"icon": "🏛️", "color": "#dc3545", "class": "category-1"},
+    "经济": {"icon": "📈", "color": "#28a745", "class": "category-2"},
+    "民生": {"icon": "🏠", "color": "#17a2b8", "class": "category-3"},
+    "科技": {"icon": "💻", "color": "#ffc107", "class": "category-4"},
+    "热点": {"icon": "🔥", "color": "#6f42c1", "class": "category-5"}
+}
+
+class HtmlTemplates(NamedTuple):
+    """一套HTML模板；categories 为 {类别样式 class: 类别模板}"""
+    head: Template
+    greeting: Template
+    stats: Template
+    foot: Template
+    categories: Dict[str, Template]
+    item: Template
+    badge: Template
+
+@functools.lru_cache(maxsize=None)
+def html_templates(mode: str = 'full') -> HtmlTemplates:
+    """email.html.mode 对应的HTML模板，lean / inline 版本在首次使用时由完整模板编译一次（见 lean_html）
+
+    类别模板的 class 是占位符，精简版为每种类别样式各编译一个，才能确定用到的样式。
+    """
+    classes = [style['class'] for style in CATEGORY_STYLES.values()]
+    if mode == 'full':
+        return HtmlTemplates(HTML_HEAD, HTML_GREETING, HTML_STATS, HTML_FOOT,
+                             dict.fromkeys(classes, HTML_CATEGORY), HTML_NEWS_ITEM, HOT_BADGE)
+    fixed = [HTML_HEAD, HTML_GREETING, HTML_STATS, HTML_FOOT, HTML_NEWS_ITEM, HOT_BADGE]
+    compiled = lean_templates([(template, {}) for template in fixed] +
+                              [(HTML_CATEGORY, {'css_class': css_class}) for css_class in classes],
+                              inline=mode == 'inline')
+    head, greeting, stats, foot, item, badge = compiled[:len(fixed)]
+    return HtmlTemplates(head, greeting, stats, foot, dict(zip(classes, compiled[len(fixed):])), item, badge)
+
+def _segment(text: str) -> str:
+    """把开头的换行移到结尾，使片段从行首开始、以换行结束，可以单独编码后直接拼接"""
+    return text[1:] + '\n' if text.startswith('\n') else text
+
+@dataclass
+class DigestEdition:
+    """渲染一次、供所有收件人共用的摘要
+
+    头部、页脚和每个类别各是一个片段，首次使用时编码（quoted-printable 或 8bit）并缓存；
+    每个收件人只需渲染问候语和统计这两个小片段，其余按类别筛选后直接拼接缓存的字节，
+    单个收件人的开销与摘要长度无关。
+    """
+    subject: str
+    text_head: str
+    text_foot: str
+    html_head: str
+    html_foot: str
+    text_categories: Dict[str, str]
+    html_categories: Dict[str, str]
+    counts: Dict[str, int]
+    source_count: int
+    html_mode: str = 'full'
+    _encoded: Dict[tuple, Any] = field(default_factory=dict, repr=False)
+
+    def encoded(self, kind: str, name: str = '', encoding: str = QUOTED_PRINTABLE) -> bytes:
+        """某个共用片段的编码结果：kind 为 text_head / text_foot / html_head / html_foot / text / html"""
+        key = (kind, name, encoding)
+        data = self._encoded.get(key)
+        if data is None:
+            text = getattr(self, f"{kind}_categories")[name] if name else getattr(self, kind)
+            data = self._encoded[key] = encode_body(text, encoding)
+        return data
+
+    def eight_bit_safe(self, part: str) -> bool:
+        """part（text 或 html）的所有共用片段是否都能以 8bit 发送"""
+        key = ('8bit', part)
+        safe = self._encoded.get(key)
+        if safe is None:
+            segments = [getattr(self, f"{part}_head"), getattr(self, f"{part}_foot"),
+                        *getattr(self, f"{part}_categories").values()]
+            safe = self._encoded[key] = all(eight_bit_safe(text) for text in segments)
+        return safe
+
+class EmailGenerator:
+    def __init__(self, config):
+        self.config = config
+    
+    @timed('render')
+    def generate_text_email(self, categorized_news: Dict[str, List[NewsItem]]) -> str:
+        """生成纯文本邮件"""
+        head = TEXT_HEAD.render(**self._context())
+        categories = self._text_categories(categorized_news)
+        return head + ''.join(categories.values()) + TEXT_FOOT.render()
+    
+    @timed('render')
+    def generate_html_email(self, categorized_news: Dict[str, List[NewsItem]], 
+                           all_news: Dict[str, Any]) -> str:
+        """生成HTML邮件"""
+        context = self._context()
+        templates = html_templates(self.config.email_config.html_mode)
+        head, foot = templates.head.render(**context), templates.foot.render(**context)
         
-        # 页脚
-        html += f"""
-        <div class="footer">
-            <p>📧 本邮件由 GitHub Actions 自动生成并发送 | 每日早8点准时推送</p>
-            <p>🔧 技术支持: {self.config.app_config.name} v{self.config.app_config.version}</p>
-            <p>⏰ 数据采集时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
+        while True:
+            # 统计
+            total_news = sum(len(items) for items in categorized_news.values())
+            stats = templates.stats.render(total_news=total_news, source_count=self._source_count(),
+                                           category_count=len(categorized_news))
+            
+            # 按类别显示新闻
+            categories = self._html_categories(categorized_news, templates)
+            html = head + stats + ''.join(categories.values()) + foot
+            trimmed = self._fit_budget(categorized_news, len(html.encode('utf-8')), templates)
+            if trimmed is None:
+                return html
+            categorized_news = trimmed
+    
+    @timed('render')
+    def render_edition(self, categorized_news: Dict[str, List[NewsItem]]) -> DigestEdition:
+        """渲染一次摘要的共用片段，之后用 personalize() 为每个收件人组装邮件"""
+        context = self._context()
+        html_mode = self.config.email_config.html_mode
+        templates = html_templates(html_mode)
+        html_head, html_foot = templates.head.render(**context), _segment(templates.foot.render(**context))
+        html_categories = self._html_categories(categorized_news, templates)
+        size = len((html_head + ''.join(html_categories.values()) + html_foot).encode('utf-8'))
+        trimmed = self._fit_budget(categorized_news, size, templates)
+        if trimmed is not None:
+            categorized_news = trimmed
+            html_categories = self._html_categories(categorized_news, templates)
+        return DigestEdition(
+            subject=self.config.email_config.subject_template.format(date=context['today']),
+            text_head=TEXT_HEAD.render(**context),
+            text_foot=TEXT_FOOT.render(),
+            html_head=html_head,
+            html_foot=html_foot,
+            text_categories=self._text_categories(categorized_news),
+            html_categories={name: _segment(html) for name, html in html_categories.items()},
+            counts={name: len(items) for name, items in categorized_news.items() if items},
+            source_count=self._source_count(),
+            html_mode=html_mode
+        )
+    
+    def personalize(self, edition: DigestEdition, sender: str, address: str, name: str = "",
+                    greeting: str = "", categories: Optional[Iterable[str]] = None,
+                    allow_8bit: bool = False) -> bytes:
+        """为一个收件人组装完整邮件（已编码的字节，可直接交给 BulkMailer.send_bytes）
+
+        greeting 为问候语（空则不显示），categories 为订阅的类别（None 表示全部）。
+        allow_8bit 为 True（服务器支持 8BITMIME，发送时需带 BODY=8BITMIME）时正文不编码；
+        片段要能直接拼接，因此不使用 base64。
+        """
+        templates = html_templates(edition.html_mode)
+        wanted = None if categories is None else set(categories)
+        selected = [c for c in edition.counts if wanted is None or c in wanted]
+        stats = templates.stats.render(total_news=sum(edition.counts[c] for c in selected),
+                                       source_count=edition.source_count, category_count=len(selected))
+        
+        text_greeting = TEXT_GREETING.render(greeting=greeting) if greeting else ''
+        html_greeting = templates.greeting.render(greeting=greeting) if greeting else ''
+        text_encoding = html_encoding = QUOTED_PRINTABLE
+        if allow_8bit and edition.eight_bit_safe('text') and eight_bit_safe(text_greeting):
+            text_encoding = EIGHT_BIT
+        if allow_8bit and edition.eight_bit_safe('html') and eight_bit_safe(html_greeting):
+            html_encoding = EIGHT_BIT
+        
+        text_parts = [edition.encoded('text_head', encoding=text_encoding)]
+        html_parts = [edition.encoded('html_head', encoding=html_encoding)]
+        if greeting:
+            text_parts.append(encode_body(text_greeting, text_encoding))
+            html_parts.append(encode_body(html_greeting, html_encoding))
+        html_parts.append(encode_body(stats, html_encoding))
+        for category in selected:
+            text_parts.append(edition.encoded('text', category, text_encoding))
+            html_parts.append(edition.encoded('html', category, html_encoding))
+        text_parts.append(edition.encoded('text_foot', encoding=text_encoding))
+        html_parts.append(edition.encoded('html_foot', encoding=html_encoding))
         
-        return html
+        # 发件人和主题对所有收件人相同，编码一次
+        common = edition._encoded.get(('headers', sender))
+        if common is None:
+            common = edition._encoded[('headers', sender)] = (
+                f"From: {formataddr((self.config.email_config.from_name, sender), 'utf-8')}\r\n"
+                f"Subject: {Header(edition.subject, 'utf-8').encode()}\r\n"
+            )
+        boundary = f"==============={uuid.uuid4().hex}=="
+        headers = (
+            common +
+            f"To: {formataddr((name, address), 'utf-8')}\r\n"
+            f"Date: {formatdate(localtime=True)}\r\n"
+            f"Message-ID: <{uuid.uuid4().hex}@{sender.rpartition('@')[2] or 'localhost'}>\r\n"
+            "MIME-Version: 1.0\r\n"
+            f"Content-Type: multipart/alternative; boundary=\"{boundary}\"\r\n\r\n"
+        )
+        # 分隔行前的 CRLF 属于分隔符，不属于上一部分的内容
+        part = ("\r\n--{boundary}\r\nContent-Type: text/{subtype}; charset=\"utf-8\"\r\n"
+                "Content-Transfer-Encoding: {encoding}\r\n\r\n")
+        return b''.join([
+            headers.encode('ascii'),
+            part.format(boundary=boundary, subtype='plain', encoding=text_encoding).encode('ascii'), *text_parts,
+            part.format(boundary=boundary, subtype='html', encoding=html_encoding).encode('ascii'), *html_parts,
+            f"\r\n--{boundary}--\r\n".encode('ascii'),
+        ])
+    
+    def _context(self) -> Dict[str, Any]:
+        """头部和页脚的共用字段"""
+        now = datetime.now()
+        return {
+            'name': self.config.app_config.name,
+            'version': self.config.app_config.version,
+            'today': now.strftime("%Y年%m月%d日"),
+            'current_time': now.strftime("%H:%M:%S"),
+            'collected_at': now.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    
+    def _source_count(self) -> int:
+        return sum(1 for s in self.config.news_sources.values() if s.enabled)
+    
+    def _text_categories(self, categorized_news: Dict[str, List[NewsItem]]) -> Dict[str, str]:
+        """{类别: 纯文本片段}，跳过没有新闻的类别"""
+        categories = {}
+        for category, news_items in categorized_news.items():
+            if news_items:
+                lines = [f"\n【{category}】\n"]
+                lines.extend(f"  {i}. {item.title} [{item.source}]\n"
+                             for i, item in enumerate(news_items, 1))
+                lines.append("\n")
+                categories[category] = ''.join(lines)
+        return categories
+    
+    def _fit_budget(self, categorized_news: Dict[str, List[NewsItem]], html_size: int,
+                    templates: HtmlTemplates) -> Optional[Dict[str, List[NewsItem]]]:
+        """HTML超出 email.html.budget 时返回删减后的新闻，未超出或已无法删减时返回 None"""
+        budget = self.config.email_config.html_budget
+        if not budget or html_size <= budget:
+            return None
+        items = {
+            category: [len(templates.item.render(rank=rank, title=title, hot=hot, source=source).encode('utf-8'))
+                       for rank, title, hot, source in self._html_rows(news_items, templates)]
+            for category, news_items in categorized_news.items() if news_items
+        }
+        counts = fit_budget(html_size - sum(map(sum, items.values())), items, budget)
+        trimmed = {category: news_items[:counts.get(category, 0)] for category, news_items in categorized_news.items()}
+        dropped = sum(len(news_items) for news_items in categorized_news.values()) - \
+            sum(len(news_items) for news_items in trimmed.values())
+        if not dropped:
+            logger.warning(f"✂️ HTML正文 {html_size} 字节超出预算 {budget} 字节，已无法再删减")
+            return None
+        logger.warning(f"✂️ HTML正文 {html_size} 字节超出预算 {budget} 字节，删减 {dropped} 条新闻")
+        return trimmed
+    
+    def _html_rows(self, news_items: List[NewsItem], templates: HtmlTemplates) -> List[tuple]:
+        """[(序号, 标题, 热度标签HTML, 来源)]"""
+        return [(i, item.title, templates.badge.render(hot=item.hot_text) if item.hot else "", item.source)
+                for i, item in enumerate(news_items, 1)]
+    
+    def _html_categories(self, categorized_news: Dict[str, List[NewsItem]],
+                         templates: HtmlTemplates) -> Dict[str, str]:
+        """{类别: HTML片段}，跳过没有新闻的类别"""
+        categories = {}
+        for category, items in categorized_news.items():
+            if items:
+                style = CATEGORY_STYLES.get(category, CATEGORY_STYLES['热点'])
+                categories[category] = templates.categories[style['class']].render(
+                    css_class=style['class'], icon=style['icon'], category=category,
+                    items=templates.item.render_each(('rank', 'title', 'hot', 'source'),
+                                                     self._html_rows(items, templates))
+                )
+        return categories
@@ -8,15 +8,27 @@ import os
 import sys
 import time
 import logging
-import smtplib
-import requests
 import json
-import re
+import copy
 import random
+import functools
+import threading
 from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+from config import get_config
+from source_engine import calculate_hot_value, clean_news_title, get_source_engine
+from keyword_classifier import KeywordClassifier
+from dedup import assign_stories
+from news_history import get_news_history
+from instrumentation import get_recorder, profiling, reset_recorder
+from circuit_breaker import CircuitOpenError, get_circuit_breaker
+from templates import Template, join
+from lean_html import fit_budget, lean_templates
+from deadline import (DeadlineExceeded, budget, current_deadline, run_deadline,
+                      source_budget, start_run_deadline)
+# requests、lxml、smtplib 等较重的模块只在用到它们的函数中导入（导入耗时见 benchmarks/bench_import.py）
 
 # 设置日志
 logging.basicConfig(
@@ -44,85 +56,230 @@ HEADERS = {
     'sec-ch-ua-platform': '"Windows"',
 }
 
+# ====================== 运行期缓存 ======================
+
+class RunCache:
+    """单次运行内的新闻源缓存
+
+    各分类函数会重复调用同一个新闻源函数（如 fetch_people_news），
+    这里以 (新闻源函数, 参数) 缓存解析结果、以 URL 缓存HTTP响应，
+    保证每个新闻源在一次运行中只抓取、解析一次，并统计节省的HTTP请求数。
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.responses = {}
+        self.hits = 0
+        self.misses = 0
+        self.http_requests = 0
+        self.saved_requests = 0
+        # 本次邮件中推送的新闻，发送成功后写入新闻历史
+        self.digest = []
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def key_lock(self, key):
+        """获取某个缓存键的锁，保证并发时同一新闻源只抓取一次"""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def count(self, **deltas):
+        """线程安全地累加计数器"""
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def stats(self):
+        """返回缓存统计"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'http_requests': self.http_requests,
+            'saved_requests': self.saved_requests,
+        }
+
+_run_cache = RunCache()
+# 当前线程已发出的HTTP请求数，用于计算每个新闻源的请求开销
+_request_counter = threading.local()
+
+def reset_run_cache():
+    """开始新的一次运行，清空运行期缓存"""
+    global _run_cache
+    _run_cache = RunCache()
+    return _run_cache
+
+def get_run_cache():
+    """获取当前运行期缓存"""
+    return _run_cache
+
+def _requests_made():
+    return getattr(_request_counter, 'count', 0)
+
+def run_cached(func):
+    """新闻源函数装饰器：同一次运行内只真正执行一次"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _run_cache
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        label = f"{func.__name__}({', '.join(map(repr, args))})" if args else func.__name__
+        lock = cache.key_lock(key)
+        # 同一新闻源仍在其他线程中抓取时最多等到运行截止时间，超时按空结果处理（由备用数据补足）
+        timeout = run_deadline().wait_timeout()
+        if not lock.acquire(timeout=-1 if timeout is None else timeout):
+            logger.warning(f"⏰ {label} 未在运行截止时间前完成，跳过")
+            return []
+        try:
+            if key in cache.results:
+                result, cost = cache.results[key]
+                cache.count(hits=1, saved_requests=cost)
+                logger.debug(f"{func.__name__} 命中运行期缓存，节省 {cost} 次请求")
+            else:
+                cache.count(misses=1)
+                before = _requests_made()
+                recorder = get_recorder()
+                with recorder.source(label):
+                    result = func(*args, **kwargs)
+                    recorder.add(items=len(result))
+                cache.results[key] = (result, _requests_made() - before)
+        finally:
+            lock.release()
+        # 调用方会原地修改热度值，返回副本避免互相影响
+        return copy.deepcopy(result)
+    return wrapper
+
+# ====================== 并发控制 ======================
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def _get_settings():
+    """读取 config.yaml 中的运行参数"""
+    return get_config().app_config
+
+def host_slot(url):
+    """获取目标主机的并发名额，限制同一主机的同时请求数"""
+    host = urlparse(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(_get_settings().max_per_host)
+        return _host_semaphores[host]
+
 # ====================== 辅助函数 ======================
 
 def fetch_with_retry(url, retries=3, timeout=10, **kwargs):
-    """带重试机制的请求函数"""
+    """带重试机制的请求函数（同一次运行内按URL复用响应）"""
+    cache = _run_cache
+    with cache.key_lock(url):
+        if url in cache.responses:
+            cache.count(saved_requests=1)
+            return cache.responses[url]
+        
+        # 主机断路器：打开时直接跳过，不再耗尽重试；半开时只试探一次
+        breaker = get_circuit_breaker()
+        host_key = f"host:{urlparse(url).netloc}"
+        if breaker is not None:
+            if not breaker.allow(host_key):
+                get_recorder().add(skipped=1)
+                raise CircuitOpenError(f"{host_key} 断路器打开，跳过请求")
+            if breaker.probing(host_key):
+                retries = 1
+        try:
+            response = _fetch_with_retry(url, retries, timeout, **kwargs)
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure(host_key)
+            raise
+        if breaker is not None:
+            if response is not None:
+                breaker.record_success(host_key)
+            else:
+                breaker.record_failure(host_key)
+        
+        if response is not None:
+            cache.responses[url] = response
+        return response
+
+def call_with_breaker(key, fetch, fallback):
+    """按新闻源断路器调用抓取函数
+
+    断路器打开时不发请求，直接返回备用数据；抓取异常或结果为空记为一次失败。
+    抓取在新闻源的时间预算内进行，预算用完后不再发起新的请求，改用备用数据。
+    """
+    breaker = get_circuit_breaker()
+    if breaker is not None and not breaker.allow(key):
+        logger.info(f"⛔ {key} 断路器打开，直接使用备用数据")
+        get_recorder().add(skipped=1)
+        return fallback()
+    try:
+        with budget(source_budget(key.split(':', 1)[-1])):
+            news_list = fetch()
+    except DeadlineExceeded:
+        logger.warning(f"⏰ {key} 超出时间预算，使用备用数据")
+        get_recorder().add(timeouts=1)
+        news_list = []
+    except Exception as e:
+        logger.warning(f"{key} 抓取失败: {e}")
+        news_list = []
+    if breaker is not None:
+        if news_list:
+            breaker.record_success(key)
+        else:
+            breaker.record_failure(key)
+    return news_list or fallback()
+
+def _backoff(url, seconds):
+    """重试前退避：交给限速器暂停该主机，下一次请求时再等待；未启用限速时直接等待
+
+    退避会用完剩余时间预算时不再重试。
+    """
+    if seconds >= current_deadline().remaining():
+        raise DeadlineExceeded(f"退避 {seconds:.1f} 秒会超出时间预算，停止重试")
+    from http_client import get_http_client
+    limiter = get_http_client().limiter
+    if limiter is not None:
+        limiter.backoff(url, seconds)
+    else:
+        time.sleep(seconds)
+
+def _fetch_with_retry(url, retries, timeout, **kwargs):
+    # 请求间隔由 HttpClient 按主机限速（settings.request_delay），429/503 按 Retry-After 退避
+    from http_client import get_http_client
     for attempt in range(retries):
         try:
-            # 随机延迟，避免请求过快
-            if attempt > 0:
-                time.sleep(random.uniform(1, 3))
-            
+            # 新闻源的 Referer 等请求头由 config.yaml 声明后传入
             headers = {**HEADERS, **kwargs.get('headers', {})}
             
-            # 为不同网站添加Referer
-            if 'people.com.cn' in url:
-                headers['Referer'] = 'https://www.people.com.cn/'
-            elif 'xinhuanet.com' in url:
-                headers['Referer'] = 'http://www.xinhuanet.com/'
-            elif 'cctv.com' in url:
-                headers['Referer'] = 'https://news.cctv.com/'
-            
-            response = requests.get(url, headers=headers, timeout=timeout)
+            with host_slot(url):
+                response = get_http_client().get(url, headers=headers, timeout=timeout)
+            _request_counter.count = _requests_made() + 1
+            _run_cache.count(http_requests=1)
             response.raise_for_status()
             
             # 检查是否返回了有效内容
             if len(response.text) < 1000:
                 logger.warning(f"响应内容过短: {len(response.text)} 字符")
+                get_recorder().add(retries=1)
+                _backoff(url, 2 ** attempt + random.uniform(0, 1))
                 continue
-                
+            
             return response
+        except DeadlineExceeded:
+            get_recorder().add(errors=1)
+            raise
         except Exception as e:
             if attempt == retries - 1:
+                get_recorder().add(errors=1)
                 raise
             logger.warning(f"请求失败，{attempt+1}/{retries} 次重试: {e}")
-            time.sleep(2 ** attempt)
+            get_recorder().add(retries=1)
+            _backoff(url, 2 ** attempt + random.uniform(0, 1))
     return None
 
-def calculate_hot_value(title, base_hot=100, source_weight=1.0):
-    """计算新闻热度值"""
-    hot = base_hot * source_weight
-    
-    # 关键词热度加成
-    hot_keywords = {
-        '习近平': 50, '主席': 30, '重磅': 25, '独家': 25,
-        '紧急': 20, '最新': 15, '重大': 20, '突破': 20
-    }
-    
-    for keyword, value in hot_keywords.items():
-        if keyword in title:
-            hot += value
-    
-    # 标题长度优化
-    title_len = len(title)
-    if 15 <= title_len <= 35:
-        hot += 20
-    elif title_len > 50:
-        hot -= 10
-    
-    # 随机波动
-    hot += random.randint(-5, 15)
-    
-    return max(50, int(hot))
-
-def clean_news_title(title):
-    """清洗新闻标题"""
-    if not title:
-        return ""
-    
-    # 移除多余空格和换行
-    title = re.sub(r'\s+', ' ', title).strip()
-    
-    # 移除广告标识
-    ad_patterns = [r'\[广告\]', r'\(广告\)', r'【广告】', r'推广', r'ADVERTISEMENT']
-    for pattern in ad_patterns:
-        title = re.sub(pattern, '', title, flags=re.IGNORECASE)
-    
-    return title
-
 def get_fallback_news(category_name, count=5):
-    """获取备用新闻数据（确保总有内容）"""
+    """获取备用新闻数据（确保总有内容）
+
+    备用新闻带有 fallback 标记：它们是固定内容，不记入新闻历史，增量模式下也不推送。
+    """
     fallback_data = {
         "国内要闻": [
             "国务院常务会议部署近期重点工作",
@@ -183,317 +340,131 @@ def get_fallback_news(category_name, count=5):
             news_list.append({
                 'title': f"{source}: {title}",
                 'hot': hot,
-                'source': source
+                'source': source,
+                'fallback': True
             })
         return news_list
     
-    return [{'title': f"{category_name}: 新闻更新中", 'hot': 70, 'source': '综合'}]
+    return [{'title': f"{category_name}: 新闻更新中", 'hot': 70, 'source': '综合', 'fallback': True}]
 
-# ====================== 修复版新闻源函数 ======================
+# ====================== 声明式新闻源 ======================
 
-def fetch_people_news():
-    """修复版人民网新闻抓取"""
-    try:
-        news_list = []
-        
-        # 人民网多个入口，提高成功率
-        urls = [
-            "https://www.people.com.cn/",
-            "https://news.people.com.cn/",
-            "http://politics.people.com.cn/",
-            "http://finance.people.com.cn/"
-        ]
-        
-        for url in urls:
-            if len(news_list) >= 15:
-                break
-                
+@run_cached
+def fetch_configured_source(source_id):
+    """按 config.yaml 中声明的规则抓取HTML新闻源，失败时使用备用数据"""
+    source = get_source_engine().get(source_id)
+    fallback = source.config.fallback
+    return call_with_breaker(
+        f"source:{source_id}",
+        lambda: _fetch_configured_source(source),
+        lambda: get_fallback_news(fallback, 3) if fallback else []
+    )
+
+def _fetch_configured_source(source):
+    titles = []
+    
+    # 多个入口依次抓取，提高成功率
+    from html_parser import charset_from_headers, parse_html
+    for url in source.urls:
+        if len(titles) >= source.collect_limit:
+            break
+        
+        # stream: true 的门户首页边下载边解析，凑够条数即断开；失败时改为完整下载
+        if source.config.stream and url not in _run_cache.responses:
             try:
-                response = fetch_with_retry(url, timeout=8)
-                if not response:
-                    continue
-                    
-                soup = BeautifulSoup(response.content, 'lxml')
-                
-                # 多种选择器组合
-                selectors = [
-                    'a[href*="/n1/"]',  # 人民网标准新闻链接
-                    'a[href*="/n2/"]',
-                    'a[href*="/n3/"]',
-                    '.text_box h2 a',
-                    '.news_box a',
-                    '.hdNews a',
-                    '.ej_list_box li a',
-                    '.news_item h3 a',
-                    '.list_16 a',
-                    '.fl a[href*=".html"]'
-                ]
-                
-                for selector in selectors:
-                    items = soup.select(selector, limit=20)
-                    for item in items:
-                        title = clean_news_title(item.text.strip())
-                        if title and 10 <= len(title) <= 80:
-                            # 过滤掉非新闻链接
-                            if any(word in title.lower() for word in ['首页', '网站', '导航', '地图', '联系']):
-                                continue
-                                
-                            hot = calculate_hot_value(title, 100, 1.0)
-                            news_list.append({
-                                'title': f"人民网: {title}",
-                                'hot': hot,
-                                'source': '人民网'
-                            })
-                        
-                        if len(news_list) >= 20:
-                            break
-                    if len(news_list) >= 20:
-                        break
-                        
+                extracted = _stream_titles(source, url, source.collect_limit - len(titles))
+            except DeadlineExceeded:
+                raise
             except Exception as e:
-                logger.debug(f"人民网{url}抓取失败: {e}")
+                logger.debug(f"{source.label}{url}流式抓取失败，改为完整下载: {e}")
+                extracted = None
+            if extracted is not None:
+                titles.extend(extracted)
                 continue
-        
-        # 确保有数据返回
-        if not news_list:
-            return get_fallback_news("国内要闻", 3)
-        
-        # 去重
-        seen = set()
-        unique_news = []
-        for news in news_list:
-            core = news['title'].replace('人民网:', '').strip()[:30]
-            if core not in seen:
-                seen.add(core)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        return unique_news[:10]
-        
-    except Exception as e:
-        logger.error(f"人民网新闻抓取失败: {e}")
-        return get_fallback_news("国内要闻", 3)
+            
+        try:
+            response = fetch_with_retry(url, timeout=source.config.timeout, headers=source.headers)
+            if not response:
+                continue
+            
+            with get_recorder().stage('parse') as stage:
+                root = parse_html(response.content, charset_from_headers(response.headers))
+                extracted = source.extract(root, source.collect_limit - len(titles))
+                stage['items'] = len(extracted)
+            titles.extend(extracted)
+        except Exception as e:
+            logger.debug(f"{source.label}{url}抓取失败: {e}")
+            continue
+    
+    return source.rank(titles)
 
-def fetch_xinhua_news():
-    """修复版新华网新闻抓取"""
+def _stream_titles(source, url, limit):
+    """流式抓取一个入口页，返回提取到的标题；主机断路器未关闭时返回 None，交给完整下载的路径处理
+
+    流式响应只读了一部分，不放入运行内的响应缓存。
+    """
+    from http_client import get_http_client, iter_body
+    from html_parser import STREAM_CHUNK_SIZE, StreamingExtractor, charset_from_headers
+    breaker = get_circuit_breaker()
+    host_key = f"host:{urlparse(url).netloc}"
+    if breaker is not None and not breaker.is_closed(host_key):
+        return None
+    
+    with host_slot(url):
+        response = get_http_client().get(url, headers={**HEADERS, **source.headers},
+                                         timeout=source.config.timeout, stream=True)
+    _request_counter.count = _requests_made() + 1
+    _run_cache.count(http_requests=1)
     try:
-        news_list = []
-        url = "http://www.xinhuanet.com/"
-        
-        response = fetch_with_retry(url, timeout=8)
-        if not response:
-            return get_fallback_news("国内要闻", 3)
-            
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # 新华网选择器
-        selectors = [
-            'a[href*="/politics/"]',
-            'a[href*="/world/"]',
-            'a[href*="/fortune/"]',
-            'a[href*="/tech/"]',
-            '.h-title',
-            '.tit',
-            '.cleft li a',
-            '.news-item h3 a',
-            '.newsList li a',
-            '.linkNews a'
-        ]
-        
-        for selector in selectors:
-            items = soup.select(selector, limit=15)
-            for item in items:
-                title = clean_news_title(item.text.strip())
-                if title and 8 <= len(title) <= 70:
-                    # 过滤导航等非新闻内容
-                    if len(title) < 5 or '新华网' in title or '首页' in title:
-                        continue
-                        
-                    hot = calculate_hot_value(title, 95, 1.0)
-                    news_list.append({
-                        'title': f"新华网: {title}",
-                        'hot': hot,
-                        'source': '新华网'
-                    })
-                
-                if len(news_list) >= 15:
-                    break
-            if len(news_list) >= 15:
+        response.raise_for_status()
+        extractor = StreamingExtractor(source.selectors, limit, accept=source.accept,
+                                       encoding=charset_from_headers(response.headers))
+        for chunk in iter_body(response, STREAM_CHUNK_SIZE):
+            if extractor.feed(chunk):
                 break
-        
-        if not news_list:
-            return get_fallback_news("国内要闻", 3)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in news_list:
-            core = news['title'].replace('新华网:', '').strip()[:30]
-            if core not in seen:
-                seen.add(core)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        return unique_news[:10]
-        
-    except Exception as e:
-        logger.error(f"新华网新闻抓取失败: {e}")
-        return get_fallback_news("国内要闻", 3)
+        titles = extractor.close()
+    finally:
+        response.close()
+    
+    recorder = get_recorder()
+    # 流式响应的请求在拿到响应头时已记录，这里补上实际下载的字节数
+    recorder.add(bytes=extractor.bytes_downloaded)
+    recorder.extra.setdefault('stream', {})[url] = {
+        'downloaded': extractor.bytes_downloaded, 'needed': extractor.bytes_needed
+    }
+    logger.info(f"{source.label} 流式抓取: 下载 {extractor.bytes_downloaded} 字节，所需 {extractor.bytes_needed} 字节")
+    if breaker is not None:
+        breaker.record_success(host_key)
+    return titles
+
+def fetch_people_news():
+    """人民网新闻"""
+    return fetch_configured_source('people')
+
+def fetch_xinhua_news():
+    """新华网新闻"""
+    return fetch_configured_source('xinhua')
 
 def fetch_sina_news():
-    """修复版新浪新闻"""
-    try:
-        news_list = []
-        url = "https://news.sina.com.cn/"
-        
-        response = fetch_with_retry(url, timeout=8)
-        if not response:
-            return []
-            
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        selectors = [
-            '.blk122 a',
-            '.news-item h2 a',
-            '.feed-card-item h2 a',
-            '.main-content h2 a',
-            '.uni-blk-list li a',
-            '[data-client="headline"]'
-        ]
-        
-        for selector in selectors:
-            items = soup.select(selector, limit=15)
-            for item in items:
-                title = clean_news_title(item.text.strip())
-                if title and 10 <= len(title) <= 70:
-                    # 过滤
-                    if any(word in title for word in ['滚动', '直播', '视频', '图片']):
-                        continue
-                        
-                    hot = calculate_hot_value(title, 90, 0.9)
-                    news_list.append({
-                        'title': f"新浪: {title}",
-                        'hot': hot,
-                        'source': '新浪'
-                    })
-                
-                if len(news_list) >= 12:
-                    break
-            if len(news_list) >= 12:
-                break
-        
-        if news_list:
-            news_list.sort(key=lambda x: x['hot'], reverse=True)
-            return news_list[:8]
-        
-        return []
-        
-    except Exception as e:
-        logger.warning(f"新浪新闻抓取失败: {e}")
-        return []
+    """新浪新闻"""
+    return fetch_configured_source('sina')
 
 def fetch_wangyi_news():
-    """修复版网易新闻"""
-    try:
-        news_list = []
-        url = "https://news.163.com/"
-        
-        response = fetch_with_retry(url, timeout=8)
-        if not response:
-            return []
-            
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        selectors = [
-            '.news_title h3 a',
-            '.ndi_main a',
-            '.news_item h2 a',
-            '.post_content h2 a',
-            '.tab_con a',
-            '.data_row news_article clearfix'
-        ]
-        
-        for selector in selectors:
-            items = soup.select(selector, limit=12)
-            for item in items:
-                title = clean_news_title(item.text.strip())
-                if title and 10 <= len(title) <= 70:
-                    hot = calculate_hot_value(title, 85, 0.9)
-                    news_list.append({
-                        'title': f"网易: {title}",
-                        'hot': hot,
-                        'source': '网易'
-                    })
-                
-                if len(news_list) >= 10:
-                    break
-            if len(news_list) >= 10:
-                break
-        
-        if news_list:
-            news_list.sort(key=lambda x: x['hot'], reverse=True)
-            return news_list[:8]
-        
-        return []
-        
-    except Exception as e:
-        logger.warning(f"网易新闻抓取失败: {e}")
-        return []
+    """网易新闻"""
+    return fetch_configured_source('netease')
 
 def fetch_ithome_news():
-    """修复版IT之家新闻"""
-    try:
-        news_list = []
-        url = "https://www.ithome.com/"
-        
-        response = fetch_with_retry(url, timeout=8)
-        if not response:
-            return []
-            
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        selectors = [
-            '.title a',
-            '.news_title a',
-            '.bl a',
-            'h2 a',
-            'a[href*="/0/"]'
-        ]
-        
-        tech_keywords = ['科技', '数码', '手机', '电脑', 'AI', '5G', '芯片', '互联网', '智能', '微软', '苹果', '华为']
-        
-        for selector in selectors:
-            items = soup.select(selector, limit=15)
-            for item in items:
-                title = clean_news_title(item.text.strip())
-                if title and 8 <= len(title) <= 80:
-                    if any(keyword in title for keyword in tech_keywords):
-                        hot = calculate_hot_value(title, 95, 1.0)
-                        news_list.append({
-                            'title': f"IT之家: {title}",
-                            'hot': hot,
-                            'source': 'IT之家'
-                        })
-                
-                if len(news_list) >= 10:
-                    break
-            if len(news_list) >= 10:
-                break
-        
-        if news_list:
-            news_list.sort(key=lambda x: x['hot'], reverse=True)
-            return news_list[:8]
-        
-        return []
-        
-    except Exception as e:
-        logger.warning(f"IT之家新闻抓取失败: {e}")
-        return []
+    """IT之家新闻"""
+    return fetch_configured_source('ithome')
 
 # ====================== 热搜函数（保持不变）======================
 
+@run_cached
 def fetch_weibo_hot():
     """获取微博热搜"""
+    return call_with_breaker("source:weibo", _fetch_weibo_hot, list)
+
+def _fetch_weibo_hot():
     try:
         news_list = []
         url = "https://weibo.com/ajax/side/hotSearch"
@@ -535,42 +506,15 @@ def fetch_weibo_hot():
         return []
 
 def fetch_baidu_hot():
-    """获取百度热搜"""
-    try:
-        news_list = []
-        url = "https://top.baidu.com/board?tab=realtime"
-        
-        response = fetch_with_retry(url, timeout=8)
-        if not response:
-            return []
-            
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        items = soup.select('.c-single-text-ellipsis', limit=10)
-        
-        for i, item in enumerate(items):
-            title = clean_news_title(item.text.strip())
-            if title and len(title) > 5:
-                hot = 80000 - i*5000
-                hot_display = f" 🔥{max(1, 10-i)}w" if i < 10 else ""
-                news_list.append({
-                    'title': f"百度: {title}{hot_display}",
-                    'hot': hot,
-                    'source': '百度'
-                })
-        
-        if news_list:
-            news_list.sort(key=lambda x: x['hot'], reverse=True)
-            return news_list[:8]
-        
-        return []
-        
-    except Exception as e:
-        logger.warning(f"百度热搜抓取失败: {e}")
-        return []
+    """获取百度热搜（config.yaml 中的 baidu，热度按榜单名次计算）"""
+    return fetch_configured_source('baidu')
 
+@run_cached
 def fetch_zhihu_hot():
     """获取知乎热榜"""
+    return call_with_breaker("source:zhihu", _fetch_zhihu_hot, list)
+
+def _fetch_zhihu_hot():
     try:
         news_list = []
         url = "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total?limit=10"
@@ -609,473 +553,235 @@ def fetch_zhihu_hot():
 
 # ====================== 修复版分类函数 ======================
 
-def fetch_domestic_news():
-    """获取国内要闻 - 修复版"""
+# 各类别的新闻源（及权重）、关键词和最少条数（不足时补充备用数据）
+CATEGORY_RULES = {
+    "国内要闻": {
+        'sources': [(fetch_people_news, 1.2), (fetch_xinhua_news, 1.2)],
+        'keywords': ['习近平', '主席', '总理', '国务院', '全国', '政策',
+                     '会议', '领导人', '政府', '政治', '时政', '国内',
+                     '国家', '中央', '重要', '部署', '工作'],
+        'min_count': 8,
+    },
+    "经济财经": {
+        'sources': [(fetch_people_news, 1.1), (fetch_xinhua_news, 1.1),
+                    (fetch_sina_news, 0.9), (fetch_wangyi_news, 0.9)],
+        # 经济相关关键词（放宽条件）
+        'keywords': ['经济', '财经', '金融', '股市', '投资', '消费',
+                     'GDP', '贸易', '银行', '财政', '市场', '企业',
+                     '价格', '增长', '数据', '报告', '央行', '证券',
+                     '基金', '保险', '汇率', '利率', '出口',
+                     '进口', '商业', '公司', '产业', '发展', '改革'],
+        'min_count': 8,
+    },
+    "军事国防": {
+        'sources': [(fetch_people_news, 1.1), (fetch_xinhua_news, 1.1)],
+        'keywords': ['军队', '国防', '军事', '演习', '武器', '海军',
+                     '空军', '陆军', '军工', '战备', '官兵', '安全',
+                     '部队', '训练', '装备', '战略', '战术', '军事训练'],
+        'min_count': 5,
+    },
+    "文教艺术": {
+        'sources': [(fetch_people_news, 1.1), (fetch_xinhua_news, 1.1), (fetch_sina_news, 0.9)],
+        'keywords': ['教育', '学校', '学生', '教师', '文化', '艺术',
+                     '读书', '博物馆', '课程', '学习', '考试', '高校',
+                     '大学', '学院', '教学', '教材', '文艺',
+                     '演出', '展览', '文物', '遗产', '传统', '创新'],
+        'min_count': 5,
+    },
+    "体育竞技": {
+        'sources': [(fetch_sina_news, 1.2), (fetch_wangyi_news, 1.1)],
+        'keywords': ['体育', '赛事', '比赛', '运动员', '冠军', '足球',
+                     '篮球', '奥运', '运动', '球队', '训练', '教练',
+                     '联赛', '锦标赛', '运动会', '竞技', '金牌', '体育场'],
+        'min_count': 5,
+    },
+    "社会民生": {
+        'sources': [(fetch_sina_news, 1.1), (fetch_wangyi_news, 1.1), (fetch_people_news, 1.0)],
+        'keywords': ['社会', '民生', '社区', '居民', '生活', '百姓',
+                     '事件', '案件', '安全', '服务', '群众',
+                     '城市', '农村', '家庭', '老人', '儿童',
+                     '医疗', '健康', '养老', '就业', '住房', '交通'],
+        'min_count': 5,
+    },
+    "科技前沿": {
+        'sources': [(fetch_ithome_news, 1.2), (fetch_people_news, 1.0),
+                    (fetch_xinhua_news, 1.0), (fetch_sina_news, 0.9)],
+        'keywords': ['科技', '创新', '人工智能', 'AI', '5G', '芯片',
+                     '互联网', '数字', '智能', '数据', '软件', '硬件',
+                     '技术', '研发', '科学', '电子',
+                     '通信', '网络', '计算机', '手机', '电脑', '数码'],
+        'min_count': 5,
+    },
+}
+
+# 所有类别的关键词构建为一个自动机，每个标题只扫描一遍
+_category_classifier = KeywordClassifier(
+    {name: rule['keywords'] for name, rule in CATEGORY_RULES.items()},
+    case_sensitive=True
+)
+
+@functools.lru_cache(maxsize=4096)
+def classify_title(title):
+    """返回标题命中的类别及关键词命中次数（同一标题在各类别间共享结果）"""
+    return _category_classifier.match(title)
+
+def format_news_list(news_list, count=5):
+    """格式化为 "序号. 标题" 列表"""
+    return [f"{i}. {news['title']}" for i, news in enumerate(news_list[:count], 1)]
+
+def collect_category_candidates(category_name):
+    """按 CATEGORY_RULES 汇总一个类别的候选新闻（类别内去重、按热度排序）
+
+    每条新闻带有 score 字段，即该类别关键词的命中次数，供全局去重时选择归属类别。
+    """
+    rule = CATEGORY_RULES[category_name]
+    all_news = []
+    
+    for fetch_func, weight in rule['sources']:
+        try:
+            source_news = fetch_func()
+            for news in source_news:
+                score = classify_title(news['title']).get(category_name, 0)
+                if score:
+                    news['hot'] = int(news['hot'] * weight)
+                    news['score'] = score
+                    all_news.append(news)
+        except Exception as e:
+            logger.debug(f"{category_name}新闻源异常: {e}")
+            continue
+    
+    # 如果新闻不足，补充数据
+    if len(all_news) < rule['min_count']:
+        fallback = get_fallback_news(category_name, 5)
+        all_news.extend(fallback)
+    
+    # 去重排序
+    seen = set()
+    unique_news = []
+    for news in all_news:
+        core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
+        if core_title not in seen:
+            seen.add(core_title)
+            unique_news.append(news)
+    
+    unique_news.sort(key=lambda x: x['hot'], reverse=True)
+    return unique_news
+
+def _collect_category(category_name):
+    """汇总一个类别的新闻，返回前5条格式化结果"""
     try:
-        all_news = []
-        
-        # 从各官方媒体获取新闻
-        sources = [
-            (fetch_people_news, 1.2),
-            (fetch_xinhua_news, 1.2),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 国内要闻关键词
-                    keywords = ['习近平', '主席', '总理', '国务院', '全国', '政策', 
-                               '会议', '领导人', '政府', '政治', '时政', '国内',
-                               '国家', '中央', '重要', '部署', '工作']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"国内要闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 8:
-            fallback = get_fallback_news("国内要闻", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        # 格式化输出前5条
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
+        return format_news_list(collect_category_candidates(category_name))
     except Exception as e:
-        logger.warning(f"国内要闻抓取失败: {e}")
-        fallback = get_fallback_news("国内要闻", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+        logger.warning(f"{category_name}抓取失败: {e}")
+        return format_news_list(get_fallback_news(category_name, 5))
+
+def fetch_domestic_news():
+    """获取国内要闻"""
+    return _collect_category("国内要闻")
 
 def fetch_economy_news():
-    """获取经济财经新闻 - 修复版"""
-    try:
-        all_news = []
-        
-        sources = [
-            (fetch_people_news, 1.1),
-            (fetch_xinhua_news, 1.1),
-            (fetch_sina_news, 0.9),
-            (fetch_wangyi_news, 0.9),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 经济相关关键词（放宽条件）
-                    keywords = ['经济', '财经', '金融', '股市', '投资', '消费', 
-                               'GDP', '贸易', '银行', '财政', '市场', '企业',
-                               '价格', '增长', '数据', '报告', '央行', '证券',
-                               '基金', '保险', '汇率', '利率', '消费', '出口',
-                               '进口', '商业', '公司', '产业', '发展', '改革']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"经济新闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 8:
-            fallback = get_fallback_news("经济财经", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        # 格式化输出
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
-    except Exception as e:
-        logger.warning(f"经济新闻抓取失败: {e}")
-        fallback = get_fallback_news("经济财经", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+    """获取经济财经新闻"""
+    return _collect_category("经济财经")
 
 def fetch_military_news():
-    """获取军事国防新闻 - 修复版"""
-    try:
-        all_news = []
-        
-        sources = [
-            (fetch_people_news, 1.1),
-            (fetch_xinhua_news, 1.1),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 军事相关关键词
-                    keywords = ['军队', '国防', '军事', '演习', '武器', '海军', 
-                               '空军', '陆军', '军工', '战备', '官兵', '安全',
-                               '部队', '训练', '装备', '战略', '战术', '军事训练']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"军事新闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 5:
-            fallback = get_fallback_news("军事国防", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
-    except Exception as e:
-        logger.warning(f"军事新闻抓取失败: {e}")
-        fallback = get_fallback_news("军事国防", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+    """获取军事国防新闻"""
+    return _collect_category("军事国防")
 
 def fetch_edu_news():
-    """获取文教艺术新闻 - 修复版"""
-    try:
-        all_news = []
-        
-        sources = [
-            (fetch_people_news, 1.1),
-            (fetch_xinhua_news, 1.1),
-            (fetch_sina_news, 0.9),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 文教相关关键词
-                    keywords = ['教育', '学校', '学生', '教师', '文化', '艺术', 
-                               '读书', '博物馆', '课程', '学习', '考试', '高校',
-                               '大学', '学院', '教学', '教材', '文化', '文艺',
-                               '演出', '展览', '文物', '遗产', '传统', '创新']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"文教新闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 5:
-            fallback = get_fallback_news("文教艺术", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
-    except Exception as e:
-        logger.warning(f"文教新闻抓取失败: {e}")
-        fallback = get_fallback_news("文教艺术", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+    """获取文教艺术新闻"""
+    return _collect_category("文教艺术")
 
 def fetch_sports_news():
-    """获取体育竞技新闻 - 修复版"""
-    try:
-        all_news = []
-        
-        sources = [
-            (fetch_sina_news, 1.2),
-            (fetch_wangyi_news, 1.1),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 体育相关关键词
-                    keywords = ['体育', '赛事', '比赛', '运动员', '冠军', '足球', 
-                               '篮球', '奥运', '运动', '球队', '训练', '教练',
-                               '联赛', '锦标赛', '运动会', '竞技', '金牌', '体育场']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"体育新闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 5:
-            fallback = get_fallback_news("体育竞技", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
-    except Exception as e:
-        logger.warning(f"体育新闻抓取失败: {e}")
-        fallback = get_fallback_news("体育竞技", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+    """获取体育竞技新闻"""
+    return _collect_category("体育竞技")
 
 def fetch_society_news():
-    """获取社会民生新闻 - 修复版"""
-    try:
-        all_news = []
-        
-        sources = [
-            (fetch_sina_news, 1.1),
-            (fetch_wangyi_news, 1.1),
-            (fetch_people_news, 1.0),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 社会民生关键词
-                    keywords = ['社会', '民生', '社区', '居民', '生活', '百姓', 
-                               '事件', '案件', '安全', '服务', '群众', '居民',
-                               '社区', '城市', '农村', '家庭', '老人', '儿童',
-                               '医疗', '健康', '养老', '就业', '住房', '交通']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"社会新闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 5:
-            fallback = get_fallback_news("社会民生", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
-    except Exception as e:
-        logger.warning(f"社会新闻抓取失败: {e}")
-        fallback = get_fallback_news("社会民生", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+    """获取社会民生新闻"""
+    return _collect_category("社会民生")
 
 def fetch_tech_news():
-    """获取科技前沿新闻 - 修复版"""
-    try:
-        all_news = []
-        
-        sources = [
-            (fetch_ithome_news, 1.2),
-            (fetch_people_news, 1.0),
-            (fetch_xinhua_news, 1.0),
-            (fetch_sina_news, 0.9),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    title = news['title'].lower()
-                    # 科技相关关键词
-                    keywords = ['科技', '创新', '人工智能', 'AI', '5G', '芯片', 
-                               '互联网', '数字', '智能', '数据', '软件', '硬件',
-                               '技术', '研发', '科学', '创新', '智能', '电子',
-                               '通信', '网络', '计算机', '手机', '电脑', '数码']
-                    if any(keyword in title for keyword in keywords):
-                        news['hot'] = int(news['hot'] * weight)
-                        all_news.append(news)
-            except Exception as e:
-                logger.debug(f"科技新闻源异常: {e}")
-                continue
-        
-        # 如果新闻不足，补充数据
-        if len(all_news) < 5:
-            fallback = get_fallback_news("科技前沿", 5)
-            all_news.extend(fallback)
-        
-        # 去重排序
-        seen = set()
-        unique_news = []
-        for news in all_news:
-            core_title = clean_news_title(news['title'].split(':', 1)[-1])[:40]
-            if core_title not in seen:
-                seen.add(core_title)
-                unique_news.append(news)
-        
-        unique_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        formatted = []
-        for i, news in enumerate(unique_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
-        
-    except Exception as e:
-        logger.warning(f"科技新闻抓取失败: {e}")
-        fallback = get_fallback_news("科技前沿", 5)
-        return [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+    """获取科技前沿新闻"""
+    return _collect_category("科技前沿")
+
+def collect_hotsearch_candidates():
+    """汇总各热搜榜单，按热度排序"""
+    all_news = []
+    
+    sources = [
+        (fetch_weibo_hot, 1.2),
+        (fetch_baidu_hot, 1.1),
+        (fetch_zhihu_hot, 1.1),
+    ]
+    
+    for fetch_func, weight in sources:
+        try:
+            source_news = fetch_func()
+            for news in source_news:
+                news['hot'] = int(news['hot'] * weight)
+                all_news.append(news)
+        except Exception as e:
+            logger.debug(f"热搜源异常: {e}")
+            continue
+    
+    # 按热度排序
+    all_news.sort(key=lambda x: x['hot'], reverse=True)
+    return all_news
 
 def fetch_hotsearch_news():
     """获取热搜榜单新闻 - 修复版"""
     try:
-        all_news = []
-        
-        sources = [
-            (fetch_weibo_hot, 1.2),
-            (fetch_baidu_hot, 1.1),
-            (fetch_zhihu_hot, 1.1),
-        ]
-        
-        for fetch_func, weight in sources:
-            try:
-                source_news = fetch_func()
-                for news in source_news:
-                    news['hot'] = int(news['hot'] * weight)
-                    all_news.append(news)
-            except Exception as e:
-                logger.debug(f"热搜源异常: {e}")
-                continue
-        
-        # 按热度排序
-        all_news.sort(key=lambda x: x['hot'], reverse=True)
-        
-        # 格式化输出前5条
-        formatted = []
-        for i, news in enumerate(all_news[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
+        formatted = format_news_list(collect_hotsearch_candidates())
         return formatted if formatted else ["1. 热搜更新中", "2. 热门话题", "3. 网络热点"]
         
     except Exception as e:
         logger.warning(f"热搜新闻抓取失败: {e}")
         return ["1. 微博热搜", "2. 百度热榜", "3. 知乎热榜"]
 
+def collect_international_candidates():
+    """国际动态候选新闻"""
+    # 国际新闻模拟数据（确保总有内容）
+    international_news = [
+        "联合国大会一般性辩论举行 多国领导人发表讲话",
+        "中美高层举行战略对话 就双边关系交换意见",
+        "欧洲央行宣布最新利率决议 维持关键利率不变",
+        "亚太经合组织峰会开幕 聚焦区域经济合作",
+        "中国外交部长访问中东多国 推动双边关系发展",
+        "全球气候峰会达成新协议 各国承诺减排目标",
+        "国际货币基金组织发布世界经济展望报告",
+        "一带一路国际合作高峰论坛在京举行",
+        "俄罗斯与乌克兰举行和平谈判 取得阶段性进展",
+        "日本央行调整货币政策 应对经济下行压力"
+    ]
+    
+    news_list = []
+    for i, title in enumerate(international_news[:8]):
+        # 添加地区标签
+        region_tag = ""
+        if '美国' in title or '中美' in title:
+            region_tag = "[美国]"
+        elif '欧洲' in title or '欧盟' in title:
+            region_tag = "[欧洲]"
+        elif '日本' in title:
+            region_tag = "[日本]"
+        elif '俄罗斯' in title:
+            region_tag = "[俄罗斯]"
+        
+        hot = calculate_hot_value(title, 110 - i*8, 1.0)
+        display_title = f"国际{region_tag}: {title}" if region_tag else f"国际: {title}"
+        
+        news_list.append({
+            'title': display_title,
+            'hot': hot,
+            'source': '国际新闻'
+        })
+    
+    news_list.sort(key=lambda x: x['hot'], reverse=True)
+    return news_list
+
 def fetch_international_news():
     """获取国际动态新闻 - 保持原有"""
     try:
-        # 国际新闻模拟数据（确保总有内容）
-        international_news = [
-            "联合国大会一般性辩论举行 多国领导人发表讲话",
-            "中美高层举行战略对话 就双边关系交换意见",
-            "欧洲央行宣布最新利率决议 维持关键利率不变",
-            "亚太经合组织峰会开幕 聚焦区域经济合作",
-            "中国外交部长访问中东多国 推动双边关系发展",
-            "全球气候峰会达成新协议 各国承诺减排目标",
-            "国际货币基金组织发布世界经济展望报告",
-            "一带一路国际合作高峰论坛在京举行",
-            "俄罗斯与乌克兰举行和平谈判 取得阶段性进展",
-            "日本央行调整货币政策 应对经济下行压力"
-        ]
-        
-        news_list = []
-        for i, title in enumerate(international_news[:8]):
-            # 添加地区标签
-            region_tag = ""
-            if '美国' in title or '中美' in title:
-                region_tag = "[美国]"
-            elif '欧洲' in title or '欧盟' in title:
-                region_tag = "[欧洲]"
-            elif '日本' in title:
-                region_tag = "[日本]"
-            elif '俄罗斯' in title:
-                region_tag = "[俄罗斯]"
-            
-            hot = calculate_hot_value(title, 110 - i*8, 1.0)
-            display_title = f"国际{region_tag}: {title}" if region_tag else f"国际: {title}"
-            
-            news_list.append({
-                'title': display_title,
-                'hot': hot,
-                'source': '国际新闻'
-            })
-        
-        news_list.sort(key=lambda x: x['hot'], reverse=True)
-        
-        # 格式化输出
-        formatted = []
-        for i, news in enumerate(news_list[:5], 1):
-            formatted.append(f"{i}. {news['title']}")
-        
-        return formatted
+        return format_news_list(collect_international_candidates())
         
     except Exception as e:
         logger.warning(f"国际动态抓取失败: {e}")
@@ -1083,98 +789,226 @@ def fetch_international_news():
 
 # ====================== 邮件内容生成 ======================
 
-def generate_email_content():
-    """生成邮件内容 - 9个类别，每个类别5条"""
+# 各分类共用的独立新闻源，并发模式下每个只抓取一次
+NEWS_SOURCES = [
+    fetch_people_news,
+    fetch_xinhua_news,
+    fetch_sina_news,
+    fetch_wangyi_news,
+    fetch_ithome_news,
+    fetch_weibo_hot,
+    fetch_baidu_hot,
+    fetch_zhihu_hot,
+]
+
+# 运行截止时间到达后，整理各类别（只使用已抓取的数据）最多再等待的秒数
+CATEGORY_GRACE_SECONDS = 5
+
+# 邮件中的9个类别：显示名称 -> (类别名, 候选新闻收集函数)
+NEWS_CATEGORIES = {
+    "🇨🇳 国内要闻": ("国内要闻", functools.partial(collect_category_candidates, "国内要闻")),
+    "🌍 国际动态": ("国际动态", collect_international_candidates),
+    "📈 经济财经": ("经济财经", functools.partial(collect_category_candidates, "经济财经")),
+    "🎖️ 军事国防": ("军事国防", functools.partial(collect_category_candidates, "军事国防")),
+    "🎓 文教艺术": ("文教艺术", functools.partial(collect_category_candidates, "文教艺术")),
+    "⚽ 体育竞技": ("体育竞技", functools.partial(collect_category_candidates, "体育竞技")),
+    "👥 社会民生": ("社会民生", functools.partial(collect_category_candidates, "社会民生")),
+    "💻 科技前沿": ("科技前沿", functools.partial(collect_category_candidates, "科技前沿")),
+    "🔥 热搜榜单": ("热搜榜单", collect_hotsearch_candidates),
+}
+
+def _fetch_category(category_name, collect_func):
+    """收集单个类别的候选新闻，失败时使用备用数据"""
+    try:
+        logger.info(f"正在抓取 {category_name}...")
+        news_list = collect_func()
+        logger.info(f"  ✅ {category_name} 获取 {len(news_list)} 条候选新闻")
+        return news_list
+    except Exception as e:
+        logger.warning(f"{category_name} 抓取异常: {e}")
+        return []
+
+def dedupe_categories(candidates, incremental=False):
+    """跨类别去重：同一新闻只出现一次，归入关键词命中最多的类别
+
+    启用新闻历史时记录本次抓取到的新闻；增量模式下只保留新出现或热度上升的新闻。
+    去重后不足5条的类别用未出现过的备用数据补齐；增量模式不补齐，并去掉抓取阶段混入的备用数据
+    （类别候选不足时的补充、新闻源失败时的替代），没有更新的类别为空列表，渲染时显示"暂无更新"
+    （备用数据是旧的固定内容，推送后会被当作新闻记入历史）。
+    返回 ({类别: 前5条格式化结果}, 推送的新闻列表)。
+    """
+    if incremental:
+        candidates = {category_name: [news for news in news_list if not news.get('fallback')]
+                      for category_name, news_list in candidates.items()}
+    assigned, duplicates = assign_stories(candidates, order=list(NEWS_CATEGORIES))
+    if duplicates:
+        logger.info(f"🧹 跨类别去重: 移除重复新闻 {duplicates} 条")
+    
+    history = get_news_history()
+    if history is not None:
+        try:
+            history.record_seen(news for news_list in assigned.values() for news in news_list
+                                if not news.get('fallback'))
+            if incremental:
+                rising_ratio = _get_settings().rising_ratio
+                before = sum(len(news_list) for news_list in assigned.values())
+                assigned = {category_name: history.diff(news_list, rising_ratio)
+                            for category_name, news_list in assigned.items()}
+                after = sum(len(news_list) for news_list in assigned.values())
+                logger.info(f"🆕 增量模式: {before} 条候选中新出现或热度上升的有 {after} 条")
+        except Exception as e:
+            logger.warning(f"新闻历史读写失败: {e}")
+    elif incremental:
+        logger.warning("未启用新闻历史，增量模式不生效")
+    
+    digest = []
+    used = {news['title'] for news_list in assigned.values() for news in news_list}
+    all_news = {}
+    for category_name, (category_key, _) in NEWS_CATEGORIES.items():
+        news_list = assigned.get(category_name, [])
+        if len(news_list) < 5 and not incremental:
+            for news in get_fallback_news(category_key, 5):
+                if len(news_list) >= 5:
+                    break
+                if news['title'] not in used:
+                    used.add(news['title'])
+                    news_list.append(news)
+        digest.extend(news_list[:5])
+        all_news[category_name] = format_news_list(news_list)
+    return all_news, digest
+
+def generate_email_content(incremental=None):
+    """生成邮件内容 - 9个类别，每个类别5条
+
+    incremental 为 True 时只推送上次推送以来新出现或热度上升的新闻，
+    为 None 时使用配置 settings.history.incremental。
+    """
+    if incremental is None:
+        incremental = _get_settings().incremental
     today = datetime.now().strftime("%Y年%m月%d日")
     current_time = datetime.now().strftime("%H:%M:%S")
     
     logger.info("🚀 开始生成邮件内容（修复版）...")
+    run_cache = reset_run_cache()
+    recorder = reset_recorder()
+    deadline = start_run_deadline(_get_settings().run_deadline)
     
-    # 定义9个类别及其对应的抓取函数
-    news_categories = {
-        "🇨🇳 国内要闻": fetch_domestic_news,
-        "🌍 国际动态": fetch_international_news,
-        "📈 经济财经": fetch_economy_news,
-        "🎖️ 军事国防": fetch_military_news,
-        "🎓 文教艺术": fetch_edu_news,
-        "⚽ 体育竞技": fetch_sports_news,
-        "👥 社会民生": fetch_society_news,
-        "💻 科技前沿": fetch_tech_news,
-        "🔥 热搜榜单": fetch_hotsearch_news,
-    }
+    candidates = {}
+    max_workers = _get_settings().max_workers
     
-    all_news = {}
-    total_news = 0
-    
-    for category_name, fetch_func in news_categories.items():
+    if max_workers > 1:
+        # 并发模式：先并行抓取每个独立新闻源一次，再并行整理各类别
+        logger.info(f"⚡ 并发抓取模式，最大并行数 {max_workers}")
+        executor = ThreadPoolExecutor(max_workers=max_workers)
         try:
-            logger.info(f"正在抓取 {category_name}...")
-            news_list = fetch_func()
-            all_news[category_name] = news_list
-            total_news += len(news_list)
-            logger.info(f"  ✅ 成功获取 {len(news_list)} 条新闻")
-            time.sleep(0.5)  # 礼貌延迟
-        except Exception as e:
-            logger.warning(f"{category_name} 抓取异常: {e}")
-            # 使用备用数据
-            fallback = get_fallback_news(category_name, 5)
-            all_news[category_name] = [f"{i+1}. {item['title']}" for i, item in enumerate(fallback[:5])]
+            with recorder.stage('fetch'):
+                futures = [executor.submit(func) for func in NEWS_SOURCES]
+                _, pending = wait(futures, timeout=deadline.wait_timeout())
+                if pending:
+                    logger.warning(f"⏰ 运行截止时间已到，{len(pending)} 个新闻源未完成，使用已完成的结果")
+                    recorder.add(timeouts=len(pending))
+            with recorder.stage('classify') as stage:
+                futures = {
+                    category_name: executor.submit(_fetch_category, category_name, collect_func)
+                    for category_name, (_, collect_func) in NEWS_CATEGORIES.items()
+                }
+                # 按类别原有顺序收集结果，保证输出确定；整理只用已抓取的数据，截止后留出少量时间
+                timeout = deadline.wait_timeout()
+                for category_name in NEWS_CATEGORIES:
+                    try:
+                        candidates[category_name] = futures[category_name].result(
+                            timeout=None if timeout is None else max(timeout, CATEGORY_GRACE_SECONDS))
+                    except FutureTimeoutError:
+                        logger.warning(f"⏰ {category_name} 未及时完成，使用备用数据")
+                        candidates[category_name] = []
+                    stage['items'] += len(candidates[category_name])
+        finally:
+            # 不等待仍在运行的抓取线程，它们受新闻源时间预算约束，会自行结束
+            executor.shutdown(wait=False, cancel_futures=True)
+    else:
+        # 串行模式下新闻源在首次被分类函数调用时抓取，抓取耗时也计入 classify
+        with recorder.stage('classify') as stage:
+            for category_name, (_, collect_func) in NEWS_CATEGORIES.items():
+                candidates[category_name] = _fetch_category(category_name, collect_func)
+                stage['items'] += len(candidates[category_name])
     
-    # 纯文本版本
-    text_content = f"""
-每日热点新闻速递 ({today})
+    with recorder.stage('dedup') as stage:
+        all_news, run_cache.digest = dedupe_categories(candidates, incremental)
+        stage['items'] = len(run_cache.digest)
+    
+    stats = run_cache.stats()
+    logger.info(f"📦 新闻源缓存: 命中 {stats['hits']} 次，实际请求 {stats['http_requests']} 次，"
+                f"节省 {stats['saved_requests']} 次HTTP请求")
+    from http_client import get_http_client
+    pool_stats = get_http_client().stats()
+    logger.info(f"🔌 连接池: 新建连接 {pool_stats['new_connections']} 个，"
+                f"复用连接 {pool_stats['reused_connections']} 次")
+    logger.info(f"💾 HTTP缓存: 未变化页面 {pool_stats['not_modified']} 个，"
+                f"节省下载 {pool_stats['bytes_saved']} 字节")
+    recorder.extra.update(run_cache=stats, http=pool_stats, connections=get_http_client().host_stats())
+    
+    breaker = get_circuit_breaker()
+    if breaker is not None:
+        breaker.save()
+        recorder.extra['health'] = breaker.snapshot()
+        open_keys = breaker.open_keys()
+        if open_keys:
+            logger.info(f"⛔ 断路器未关闭: {', '.join(open_keys)}")
+    
+    with recorder.stage('render') as stage:
+        stage['items'] = len(run_cache.digest)
+        text_content, html_content = render_email_content(all_news, today, current_time)
+    report_html_size(all_news, today, current_time, html_content)
+    return text_content, html_content
+
+# 邮件模板在导入时编译一次，渲染时只填入占位符
+DIGEST_TEXT = Template("""
+每日热点新闻速递 ({{ today }})
 ===========================================
-更新时间: {current_time}
-新闻类别: 9大类，共{total_news}条精选新闻
+更新时间: {{ current_time }}
+新闻类别: 9大类，共{{ total_news }}条精选新闻
 系统版本: 修复版（确保所有类别都有具体新闻）
 
-"""
-    
-    for category_name, news_list in all_news.items():
-        text_content += f"\n{category_name}\n"
-        text_content += "-" * 40 + "\n"
-        
-        for news in news_list[:5]:
-            text_content += f"  {news}\n"
-        
-        text_content += "\n"
-    
-    text_content += f"""
+{{ categories }}
 ===========================================
 本邮件由 GitHub Actions 自动发送
 每日定时推送: 08:00 (北京时间)
 数据来源: 人民网、新华网、新浪、网易、IT之家、微博、百度、知乎等
 修复说明: 已修复新闻抓取问题，确保所有类别都有具体内容
-"""
-    
-    # HTML版本（保持原有样式，此处省略以节省篇幅）
-    html_content = f"""
-<!DOCTYPE html>
+""")
+
+DIGEST_TEXT_CATEGORY = Template("""
+{{ category_name }}
+----------------------------------------
+{{ items }}
+""")
+
+DIGEST_HTML = Template("""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>每日热点新闻 - {today}</title>
+    <title>每日热点新闻 - {{ today }}</title>
     <style>
         /* 保持原有样式不变 */
-        body {{ font-family: 'Microsoft YaHei', 'PingFang SC', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 1200px; margin: 0 auto; padding: 20px; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); }}
-        .container {{ background: white; border-radius: 15px; padding: 40px; box-shadow: 0 10px 30px rgba(0,0,0,0.1); margin-top: 20px; }}
-        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 40px; border-radius: 12px; margin-bottom: 40px; text-align: center; }}
-        .header h1 {{ margin: 0; font-size: 32px; font-weight: bold; }}
-        .categories-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(500px, 1fr)); gap: 30px; margin-top: 20px; }}
-        .category-section {{ border-radius: 10px; padding: 25px; background: #f8f9fa; border: 1px solid #e1e4e8; }}
-        .category-title {{ font-size: 22px; margin-bottom: 20px; padding-bottom: 12px; border-bottom: 3px solid; font-weight: bold; }}
-        .news-item {{ margin-bottom: 12px; padding: 14px; background: white; border-radius: 8px; border-left: 4px solid; }}
-        .news-number {{ display: inline-block; width: 26px; height: 26px; line-height: 26px; text-align: center; background: #667eea; color: white; border-radius: 50%; margin-right: 12px; font-size: 14px; font-weight: bold; }}
-        .hot-badge {{ background: linear-gradient(135deg, #ff6b6b 0%, #ff8e8e 100%); color: white; padding: 3px 10px; border-radius: 12px; font-size: 12px; margin-left: 8px; font-weight: bold; }}
-        .stats {{ display: flex; justify-content: space-around; background: white; padding: 20px; border-radius: 10px; margin-bottom: 30px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); }}
+        body { font-family: 'Microsoft YaHei', 'PingFang SC', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 1200px; margin: 0 auto; padding: 20px; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); }
+        .container { background: white; border-radius: 15px; padding: 40px; box-shadow: 0 10px 30px rgba(0,0,0,0.1); margin-top: 20px; }
+        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 40px; border-radius: 12px; margin-bottom: 40px; text-align: center; }
+        .header h1 { margin: 0; font-size: 32px; font-weight: bold; }
+        .categories-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(500px, 1fr)); gap: 30px; margin-top: 20px; }
+        .category-section { border-radius: 10px; padding: 25px; background: #f8f9fa; border: 1px solid #e1e4e8; }
+        .category-title { font-size: 22px; margin-bottom: 20px; padding-bottom: 12px; border-bottom: 3px solid; font-weight: bold; }
+        .news-item { margin-bottom: 12px; padding: 14px; background: white; border-radius: 8px; border-left: 4px solid; }
+        .news-number { display: inline-block; width: 26px; height: 26px; line-height: 26px; text-align: center; background: #667eea; color: white; border-radius: 50%; margin-right: 12px; font-size: 14px; font-weight: bold; }
+        .hot-badge { background: linear-gradient(135deg, #ff6b6b 0%, #ff8e8e 100%); color: white; padding: 3px 10px; border-radius: 12px; font-size: 12px; margin-left: 8px; font-weight: bold; }
+        .stats { display: flex; justify-content: space-around; background: white; padding: 20px; border-radius: 10px; margin-bottom: 30px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); }
     </style>
 </head>
 <body>
     <div class="container">
         <div class="header">
             <h1>📰 每日热点新闻速递（修复版）</h1>
-            <div>{today} | 更新时间: {current_time} | 已修复新闻抓取问题</div>
+            <div>{{ today }} | 更新时间: {{ current_time }} | 已修复新闻抓取问题</div>
         </div>
         
         <div class="stats">
@@ -1183,7 +1017,7 @@ def generate_email_content():
                 <div>新闻类别</div>
             </div>
             <div style="text-align: center;">
-                <div style="font-size: 28px; font-weight: bold; color: #667eea; margin-bottom: 5px;">{total_news}</div>
+                <div style="font-size: 28px; font-weight: bold; color: #667eea; margin-bottom: 5px;">{{ total_news }}</div>
                 <div>精选新闻</div>
             </div>
             <div style="text-align: center;">
@@ -1193,46 +1027,7 @@ def generate_email_content():
         </div>
         
         <div class="categories-grid">
-"""
-    
-    # 类别颜色映射
-    category_colors = {
-        "🇨🇳 国内要闻": "#dc3545",
-        "🌍 国际动态": "#17a2b8",
-        "📈 经济财经": "#28a745",
-        "🎖️ 军事国防": "#495057",
-        "🎓 文教艺术": "#6f42c1",
-        "⚽ 体育竞技": "#e83e8c",
-        "👥 社会民生": "#20c997",
-        "💻 科技前沿": "#007bff",
-        "🔥 热搜榜单": "#ffc107"
-    }
-    
-    for category_name, news_list in all_news.items():
-        color = category_colors.get(category_name, "#667eea")
-        
-        html_content += f"""
-            <div class="category-section">
-                <div class="category-title" style="color: {color}; border-color: {color}">
-                    {category_name}
-                </div>
-                <div>
-"""
-        
-        for i, news in enumerate(news_list[:5], 1):
-            html_content += f"""
-                    <div class="news-item" style="border-left-color: {color}">
-                        <span class="news-number">{i}</span>
-                        {news}
-                    </div>
-"""
-        
-        html_content += """
-                </div>
-            </div>
-"""
-    
-    html_content += f"""
+{{ categories }}
         </div>
         
         <div style="text-align: center; margin-top: 50px; padding-top: 25px; border-top: 1px solid #e1e4e8; color: #6a737d; font-size: 14px;">
@@ -1240,60 +1035,273 @@ def generate_email_content():
             <p>✅ 已修复所有新闻类别抓取问题 | 每个类别确保5条具体新闻</p>
             <p>📧 本邮件由 GitHub Actions 自动生成并发送 | 每日早8点准时推送</p>
             <p>🔧 技术支持: Python + BeautifulSoup + Requests + GitHub Actions</p>
-            <p>⏰ 数据采集时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
+            <p>⏰ 数据采集时间: {{ collected_at }}</p>
         </div>
     </div>
 </body>
 </html>
-"""
+""", autoescape=True)
+
+DIGEST_HTML_CATEGORY = Template("""
+            <div class="category-section">
+                <div class="category-title" style="color: {{ color|safe }}; border-color: {{ color|safe }}">
+                    {{ category_name }}
+                </div>
+                <div>
+{{ items }}
+                </div>
+            </div>
+""", autoescape=True)
+
+DIGEST_HTML_ITEM = Template("""
+                    <div class="news-item" style="border-left-color: {{ color|safe }}">
+                        <span class="news-number">{{ index|safe }}</span>
+                        {{ news }}
+                    </div>
+""", autoescape=True)
+
+# 增量模式下没有新闻的类别
+DIGEST_TEXT_EMPTY = "  暂无更新\n"
+
+DIGEST_HTML_EMPTY = Template("""
+                    <div class="news-item" style="border-left-color: {{ color|safe }}; color: #6a737d">暂无更新</div>
+""", autoescape=True)
+
+# 类别颜色映射
+CATEGORY_COLORS = {
+    "🇨🇳 国内要闻": "#dc3545",
+    "🌍 国际动态": "#17a2b8",
+    "📈 经济财经": "#28a745",
+    "🎖️ 军事国防": "#495057",
+    "🎓 文教艺术": "#6f42c1",
+    "⚽ 体育竞技": "#e83e8c",
+    "👥 社会民生": "#20c997",
+    "💻 科技前沿": "#007bff",
+    "🔥 热搜榜单": "#ffc107"
+}
+
+@functools.lru_cache(maxsize=None)
+def digest_templates(mode='full'):
+    """(页面, 类别, 新闻, 暂无更新) HTML模板；lean / inline 版本在首次使用时由完整模板编译一次（见 lean_html）"""
+    templates = (DIGEST_HTML, DIGEST_HTML_CATEGORY, DIGEST_HTML_ITEM, DIGEST_HTML_EMPTY)
+    if mode == 'full':
+        return templates
+    return tuple(lean_templates([(template, {}) for template in templates], inline=mode == 'inline'))
+
+def _render_digest_html(all_news, today, current_time, templates):
+    page, category_template, item_template, empty_template = templates
+    html_categories = []
+    for category_name, news_list in all_news.items():
+        color = CATEGORY_COLORS.get(category_name, "#667eea")
+        if news_list:
+            items = item_template.render_each(('index', 'news'), enumerate(news_list, 1), color=color)
+        else:
+            items = empty_template.render(color=color)
+        category_template.render_into(html_categories, {
+            'color': color, 'category_name': category_name, 'items': items
+        })
+    return page.render(
+        today=today, current_time=current_time, total_news=sum(len(news_list) for news_list in all_news.values()),
+        categories=join(html_categories),
+        collected_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+def _fit_digest(all_news, html_size, budget, templates):
+    """按字节预算删减每个类别末尾的新闻，返回删减后的 {类别: 格式化新闻列表}"""
+    item_template = templates[2]
+    items = {
+        category_name: [
+            len(item_template.render(index=i, news=news, color=CATEGORY_COLORS.get(category_name, "#667eea"))
+                .encode('utf-8'))
+            for i, news in enumerate(news_list, 1)
+        ]
+        for category_name, news_list in all_news.items()
+    }
+    counts = fit_budget(html_size - sum(map(sum, items.values())), items, budget)
+    return {category_name: news_list[:counts[category_name]] for category_name, news_list in all_news.items()}
+
+def render_email_content(all_news, today, current_time, mode=None, budget=None):
+    """把 {类别: 格式化新闻列表} 渲染为 (纯文本, HTML) 邮件内容
+
+    mode、budget 默认取配置 email.html.mode / email.html.budget；
+    HTML 超出预算时两个版本都删减同样的新闻，保持内容一致。
+    """
+    email_config = get_config().email_config
+    mode = email_config.html_mode if mode is None else mode
+    budget = email_config.html_budget if budget is None else budget
+    templates = digest_templates(mode)
+    all_news = {category_name: news_list[:5] for category_name, news_list in all_news.items()}
+    
+    # HTML版本
+    html_content = _render_digest_html(all_news, today, current_time, templates)
+    html_size = len(html_content.encode('utf-8'))
+    if budget and html_size > budget:
+        total_news = sum(len(news_list) for news_list in all_news.values())
+        all_news = _fit_digest(all_news, html_size, budget, templates)
+        html_content = _render_digest_html(all_news, today, current_time, templates)
+        dropped = total_news - sum(len(news_list) for news_list in all_news.values())
+        logger.warning(f"✂️ HTML正文 {html_size} 字节超出预算 {budget} 字节，删减 {dropped} 条新闻，"
+                       f"删减后 {len(html_content.encode('utf-8'))} 字节")
+    
+    # 纯文本版本
+    text_categories = []
+    for category_name, news_list in all_news.items():
+        DIGEST_TEXT_CATEGORY.render_into(text_categories, {
+            'category_name': category_name,
+            'items': ''.join(f"  {news}\n" for news in news_list) or DIGEST_TEXT_EMPTY
+        })
+    text_content = DIGEST_TEXT.render(
+        today=today, current_time=current_time, total_news=sum(len(news_list) for news_list in all_news.values()),
+        categories=''.join(text_categories)
+    )
     
     return text_content, html_content
 
-def send_email_simple(text_content, html_content):
-    """发送邮件 - 简单版"""
+def report_html_size(all_news, today, current_time, html_content):
+    """记录HTML正文大小；启用精简模式或预算时与完整模板渲染的大小对比"""
+    email_config = get_config().email_config
+    size = len(html_content.encode('utf-8'))
+    info = {'mode': email_config.html_mode, 'bytes': size, 'budget': email_config.html_budget}
+    if email_config.html_mode != 'full' or email_config.html_budget:
+        _, full_html = render_email_content(all_news, today, current_time, mode='full', budget=0)
+        info['full_bytes'] = full_size = len(full_html.encode('utf-8'))
+        logger.info(f"🪶 HTML正文: 完整模板 {full_size / 1024:.1f}KB → {size / 1024:.1f}KB"
+                    f"（{(size - full_size) / full_size:+.0%}）")
+    else:
+        logger.info(f"🪶 HTML正文: {size / 1024:.1f}KB")
+    get_recorder().extra['html'] = info
+
+def build_message(text_content, html_content, sender):
+    """构造邮件，只编码一次；各部分按内容选择最小的传输编码（见 mime_builder.MessageBuilder）"""
+    from mime_builder import MessageBuilder
+    today_str = datetime.now().strftime('%m月%d日')
+    return MessageBuilder(sender, f"每日热点新闻速递 - {today_str}（修复版）",
+                          [('plain', text_content), ('html', html_content)])
+
+def _size_kb(size):
+    return f"{size / 1024:.1f}KB"
+
+def get_recipients():
+    """收件人：环境变量 EMAIL_RECEIVER（可用逗号分隔多个）与订阅者文件 email.recipients_file"""
+    from mailer import load_recipients
+    return load_recipients(os.getenv('EMAIL_RECEIVER', ''), get_config().email_config.recipients_file)
+
+def _local_smtp():
+    """security 为 none 时连接本地测试服务器（如 aiosmtpd），不需要密码"""
+    return get_config().email_config.security == 'none'
+
+def create_delivery_queue():
+    """创建邮件投递队列，发件人环境变量缺失时返回 None"""
     sender = os.getenv('EMAIL_SENDER')
     password = os.getenv('EMAIL_PASSWORD')
-    receiver = os.getenv('EMAIL_RECEIVER')
+    if not sender or not (password or _local_smtp()):
+        return None
+    from mailer import BulkMailer
+    from delivery_queue import DeliveryQueue
+    email_config = get_config().email_config
+    return DeliveryQueue.from_config(email_config, BulkMailer.from_config(email_config, sender, password))
+
+# 投递结果：全部或部分送达 / 未在等待时间内结束、已暂存待下次运行重试 / 没有送达
+SEND_SENT = 'sent'
+SEND_PENDING = 'pending'
+SEND_FAILED = 'failed'
+
+def send_email_simple(text_content, html_content, delivery=None):
+    """发送邮件 - 简单版，返回 SEND_SENT、SEND_PENDING 或 SEND_FAILED
+
+    邮件放入投递队列，由后台线程复用已登录的SMTP连接按批发送（见 mailer.BulkMailer）；
+    未传入 delivery 时临时创建一个队列。最多等待 email.delivery.wait 秒。
+    """
+    if delivery is None:
+        delivery = create_delivery_queue()
+    if delivery is None:
+        logger.error("❌ 环境变量缺失")
+        return SEND_FAILED
+    if not delivery.running:
+        with delivery:
+            return send_email_simple(text_content, html_content, delivery)
     
-    if not all([sender, password, receiver]):
+    job = submit_email(text_content, html_content, delivery)
+    if job is None:
+        return SEND_FAILED
+    job.wait(get_config().email_config.delivery_wait)
+    return delivery_result(job, delivery)
+
+def submit_email(text_content, html_content, delivery):
+    """构造邮件并放入投递队列，立即返回 DeliveryJob；无法入队时返回 None"""
+    sender = os.getenv('EMAIL_SENDER')
+    recipients = get_recipients()
+    if not recipients:
         logger.error("❌ 环境变量缺失")
-        return False
+        return None
     
     try:
-        logger.info(f"准备发送邮件到 {receiver}")
-        
-        # 创建邮件
-        msg = MIMEMultipart('alternative')
-        msg['From'] = sender
-        msg['To'] = receiver
-        
-        today_str = datetime.now().strftime('%m月%d日')
-        msg['Subject'] = f"每日热点新闻速递 - {today_str}（修复版）"
-        
-        # 添加纯文本版本
-        part1 = MIMEText(text_content, 'plain', 'utf-8')
-        msg.attach(part1)
-        
-        # 添加HTML版本
-        part2 = MIMEText(html_content, 'html', 'utf-8')
-        msg.attach(part2)
-        
-        # 发送邮件
-        logger.info("连接QQ邮箱SMTP服务器...")
-        server = smtplib.SMTP('smtp.qq.com', 587, timeout=30)
-        server.starttls()
-        server.login(sender, password)
-        server.sendmail(sender, receiver, msg.as_string())
-        server.quit()
-        
-        logger.info("✅ 邮件发送成功！")
-        return True
+        logger.info(f"准备发送邮件到 {len(recipients)} 个收件人")
+        builder = build_message(text_content, html_content, sender)
+        
+        # 服务器支持 8BITMIME 时正文不必编码；多个收件人时收件人互相不可见
+        mailer = delivery.mailer
+        logger.info(f"投递到SMTP服务器 {mailer.host}:{mailer.port}...")
+        features = mailer.features() if get_config().email_config.eight_bit else {}
+        allow_8bit = bool(features.get('8bitmime'))
+        data = builder.build(recipients[0] if len(recipients) == 1 else 'undisclosed-recipients:;', allow_8bit)
+        sizes = builder.size_report(allow_8bit)
+        logger.info("📏 邮件大小 " + _size_kb(len(data)) + "（" + "，".join(
+            f"{part['subtype']} {part['encoding']} {_size_kb(part['bytes'])}" for part in sizes['parts']
+        ) + f"；全部使用 base64 时正文 {_size_kb(sizes['base64_body_bytes'])}）")
+        get_recorder().extra['message'] = {
+            'bytes': len(data), 'body_bytes': sizes['body_bytes'], 'base64_body_bytes': sizes['base64_body_bytes'],
+            'encodings': {part['subtype']: part['encoding'] for part in sizes['parts']}
+        }
+        if features.get('size') and len(data) > features['size']:
+            logger.warning(f"⚠️ 邮件大小 {_size_kb(len(data))} 超过服务器限制 {_size_kb(features['size'])}")
+        return delivery.submit(data, recipients, label=f"daily-{datetime.now():%Y%m%d}",
+                               mail_options=['BODY=8BITMIME'] if allow_8bit else [])
         
     except Exception as e:
         logger.error(f"❌ 邮件发送失败: {e}")
-        return False
+        return None
 
-def main():
+def delivery_result(job, delivery):
+    """投递的结果
+
+    等待结束时仍未投递完的邮件：启用暂存目录时由下一次运行的 recover() 继续投递，记为 SEND_PENDING；
+    没有暂存目录时进程退出后邮件即丢失，记为 SEND_FAILED。
+    """
+    finished = job.done.is_set()
+    get_recorder().extra['delivery'] = {
+        'sent': job.sent, 'failed': len(job.failed), 'pending': 0 if finished else len(job.recipients),
+        'attempts': job.attempts
+    }
+    for address, error in list(job.failed.items())[:10]:
+        logger.warning(f"投递失败 {address}: {error}")
+    
+    if not finished:
+        wait = get_config().email_config.delivery_wait
+        if delivery.spool_dir:
+            logger.warning(f"⏳ 投递未在 {wait:.0f} 秒内结束，未送达的收件人留在暂存目录，下次运行时重试")
+            return SEND_PENDING
+        logger.warning(f"⏳ 投递未在 {wait:.0f} 秒内结束，未配置暂存目录，未送达的收件人不会重试")
+        return SEND_SENT if job.sent else SEND_FAILED
+    if job.sent == 0:
+        logger.error("❌ 邮件发送失败: 没有成功投递的收件人")
+        return SEND_FAILED
+    logger.info("✅ 邮件发送成功！")
+    return SEND_SENT
+
+def record_sent_news():
+    """邮件发送成功后，把本次推送的新闻写入新闻历史"""
+    history = get_news_history()
+    if history is None:
+        return
+    try:
+        digest = get_run_cache().digest
+        history.mark_sent(digest)
+        logger.info(f"🗂️ 新闻历史: 记录已推送新闻 {len(digest)} 条，累计 {history.count()} 条")
+    except Exception as e:
+        logger.warning(f"写入新闻历史失败: {e}")
+
+def main(incremental=None):
     """主函数"""
     logger.info("🚀 开始执行每日新闻推送任务（修复版）")
     logger.info("=" * 60)
@@ -1303,25 +1311,56 @@ def main():
     # 检查环境变量
     sender = os.getenv('EMAIL_SENDER')
     password = os.getenv('EMAIL_PASSWORD')
-    receiver = os.getenv('EMAIL_RECEIVER')
+    recipients = get_recipients()
     
     logger.info(f"发件人: {sender}")
-    logger.info(f"收件人: {receiver}")
+    logger.info(f"收件人: {len(recipients)} 个")
     
-    if not all([sender, password, receiver]):
+    if not all([sender, password or _local_smtp(), recipients]):
         logger.error("❌ 请设置所有环境变量")
         return False
     
+    report_dir = _get_settings().report_dir
+    with profiling(report_dir):
+        success = run_task(incremental)
+    write_run_report(report_dir)
+    return success
+
+def write_run_report(report_dir):
+    """写入本次运行的计时报告"""
     try:
-        # 生成邮件内容
-        logger.info("生成邮件内容...")
-        text_content, html_content = generate_email_content()
-        
-        # 发送邮件
-        logger.info("发送邮件...")
-        success = send_email_simple(text_content, html_content)
-        
+        path = get_recorder().write(report_dir)
+        if path:
+            logger.info(f"⏱️ 运行报告: {path}")
+    except OSError as e:
+        logger.warning(f"写入运行报告失败: {e}")
+
+def run_task(incremental=None):
+    """生成并发送邮件"""
+    delivery = create_delivery_queue()
+    if delivery is None:
+        logger.error("❌ 环境变量缺失")
+        return False
+    try:
+        with delivery:
+            # 上次运行未送达的邮件在抓取新闻的同时由后台线程重新投递
+            delivery.recover()
+            
+            # 生成邮件内容
+            logger.info("生成邮件内容...")
+            text_content, html_content = generate_email_content(incremental)
+            
+            # 发送邮件；本次的邮件和恢复的邮件一起等待，最多 email.delivery.wait 秒
+            logger.info("发送邮件...")
+            job = submit_email(text_content, html_content, delivery)
+            if job is not None:
+                delivery.drain(get_config().email_config.delivery_wait)
+        
+        # 关闭队列时会等正在进行的投递结束，结束后再判断结果；
+        # 已送达或已暂存（下次运行会继续投递）的新闻都记入历史，增量模式不会再次推送
+        success = job is not None and delivery_result(job, delivery) != SEND_FAILED
         if success:
+            record_sent_news()
             logger.info("🎉 任务执行成功！")
             logger.info("📊 所有9个类别都已获取到具体新闻内容")
             return True
@@ -1336,5 +1375,5 @@ def main():
         return False
 
 if __name__ == "__main__":
-    success = main()
+    success = main(incremental=True if '--incremental' in sys.argv[1:] else None)
     sys.exit(0 if success else 1)
@@ -0,0 +1,182 @@
+# html_parser.py - 快速HTML解析
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+
+import lxml.html
+from lxml import etree
+from cssselect import GenericTranslator, SelectorError, parse as parse_css
+
+logger = logging.getLogger(__name__)
+
+_translator = GenericTranslator()
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# 流式抓取时每次读取的块大小
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# 组合符 -> 判断左侧选择器时要查看的节点
+_COMBINATOR_AXES = {
+    ' ': 'ancestor::*',
+    '>': 'parent::*',
+    '+': 'preceding-sibling::*[1]',
+    '~': 'preceding-sibling::*',
+}
+
+def _element_test(tree) -> str:
+    """把解析后的CSS选择器转换为以当前元素为上下文的XPath条件
+
+    cssselect 生成的XPath从文档根向下查找；这里从元素自身向祖先和前面的兄弟方向判断，
+    如 ".list li a" 转换为 self::a[ancestor::*[self::li[ancestor::*[self::*[类名条件]]]]]，
+    可以在遍历或增量解析时逐个判断元素，不必对整棵树执行查询。
+    """
+    if type(tree).__name__ == 'CombinedSelector':
+        axis = _COMBINATOR_AXES[tree.combinator]
+        return f"{_element_test(tree.subselector)}[{axis}[{_element_test(tree.selector)}]]"
+    xpath = _translator.xpath(tree)
+    return f"self::{xpath.element}" + (f"[{xpath.condition}]" if xpath.condition else "")
+
+class SelectorSet:
+    """把一个新闻源的多个CSS选择器编译成一个元素判断条件
+
+    原先每个选择器各跑一遍 soup.select()，同一文档被遍历多次；
+    这里按文档顺序只遍历一次，每个元素判断一次是否匹配任一选择器，
+    调用方凑够条数后停止迭代，剩余部分不再判断。
+    """
+
+    def __init__(self, selectors: Sequence[str]):
+        self.selectors = list(selectors)
+        tests = []
+        for selector in self.selectors:
+            try:
+                parsed = parse_css(selector)
+                if any(item.pseudo_element for item in parsed):
+                    raise SelectorError("不支持伪元素")
+                tests.extend(_element_test(item.parsed_tree) for item in parsed)
+            except SelectorError as e:
+                logger.warning(f"无效的CSS选择器 {selector!r}: {e}")
+        self._match = etree.XPath(f"boolean({' | '.join(tests)})") if tests else None
+
+    def matches(self, element) -> bool:
+        """元素是否匹配任一选择器（只需要元素的祖先和前面的兄弟，可用于构建中的文档）"""
+        return self._match is not None and isinstance(element.tag, str) and self._match(element)
+
+    def iter_elements(self, root) -> Iterator:
+        """按文档顺序逐个返回匹配的元素"""
+        if self._match is None:
+            return
+        for element in root.iter():
+            if isinstance(element.tag, str) and self._match(element):
+                yield element
+
+    def iter_texts(self, root) -> Iterator[str]:
+        """按文档顺序返回匹配元素的文本"""
+        for element in self.iter_elements(root):
+            yield element.text_content().strip()
+
+@lru_cache(maxsize=None)
+def compile_selectors(selectors: Sequence[str]) -> SelectorSet:
+    """编译并缓存选择器集合，同一组选择器只编译一次"""
+    return SelectorSet(tuple(selectors))
+
+def _normalize_encoding(encoding: str) -> str:
+    # gb2312/gbk 页面中常混有超出字符集的字，统一按 gb18030 解码
+    encoding = encoding.lower()
+    return 'gb18030' if encoding in ('gb2312', 'gbk') else encoding
+
+def charset_from_headers(headers) -> Optional[str]:
+    """从 Content-Type 中取出显式声明的字符集"""
+    content_type = headers.get('Content-Type', '') if headers else ''
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.lower() == 'charset' and value:
+            return value.strip('"\' ').lower()
+    return None
+
+def parse_html(content: Union[bytes, str], encoding: Optional[str] = None):
+    """用 lxml 构建文档树
+
+    bytes 优先使用响应头声明的字符集，其次由 lxml 按页面 meta 识别；
+    两者都没有时按 UTF-8 解码，避免被当作 latin-1。
+    """
+    if not content:
+        return lxml.html.fromstring('<html></html>')
+    if isinstance(content, str):
+        if content.lstrip().startswith('<?xml'):
+            # lxml 不接受带编码声明的 str，转回 bytes 交给解析器识别
+            return parse_html(content.encode('utf-8'), 'utf-8')
+        return lxml.html.document_fromstring(content)
+    
+    if encoding is None and b'charset' not in content[:4096].lower():
+        encoding = 'utf-8'
+    if encoding:
+        parser = lxml.html.HTMLParser(encoding=_normalize_encoding(encoding))
+        return lxml.html.document_fromstring(content, parser=parser)
+    return lxml.html.document_fromstring(content)
+
+class StreamingExtractor:
+    """流式HTML提取器
+
+    边下载边增量解析，每个元素闭合时判断一次是否匹配选择器（见 SelectorSet.matches），
+    已解析的部分不会重复查询，总开销与文档大小成正比；凑够 limit 条后调用方即可断开连接，
+    不必下载和解析完整的门户首页。
+    标题按元素闭合的顺序采用：选择器同时匹配嵌套的两个元素时，内层的在前。
+    """
+
+    def __init__(self, selectors: SelectorSet, limit: int,
+                 accept: Optional[Callable[[str], Optional[str]]] = None,
+                 encoding: Optional[str] = None):
+        self.selectors = selectors
+        self.limit = limit
+        self.accept = accept
+        self.encoding = encoding
+        self.titles: List[str] = []
+        self.bytes_downloaded = 0
+        self.bytes_needed: Optional[int] = None
+        self._parser = None
+
+    @property
+    def done(self) -> bool:
+        return len(self.titles) >= self.limit
+
+    def feed(self, chunk: bytes) -> bool:
+        """送入一块数据，返回是否已凑够条数"""
+        if self.done:
+            return True
+        if self._parser is None:
+            encoding = self.encoding
+            if encoding is None:
+                match = _META_CHARSET.search(chunk[:4096])
+                encoding = match.group(1).decode('ascii') if match else 'utf-8'
+            self._parser = etree.HTMLPullParser(events=('end',), encoding=_normalize_encoding(encoding))
+            self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+
+        self.bytes_downloaded += len(chunk)
+        self._parser.feed(chunk)
+        self._collect()
+        if self.done:
+            self.bytes_needed = self.bytes_downloaded
+        return self.done
+
+    def close(self) -> List[str]:
+        """数据读完（或提前结束）时调用，返回提取到的标题"""
+        if self._parser is not None and not self.done:
+            # 结束解析时未闭合的元素依次闭合，同样产生 end 事件
+            self._parser.close()
+            self._collect()
+        if self.bytes_needed is None:
+            self.bytes_needed = self.bytes_downloaded
+        return self.titles[:self.limit]
+
+    def _collect(self):
+        for _, element in self._parser.read_events():
+            if self.done:
+                # 读完本批事件，避免下次 feed 时再处理
+                continue
+            if not self.selectors.matches(element):
+                continue
+            text = element.text_content().strip()
+            title = self.accept(text) if self.accept else text
+            if title:
+                self.titles.append(title)
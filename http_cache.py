@@ -0,0 +1,173 @@
+# http_cache.py - 磁盘HTTP响应缓存
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheEntry:
+    """一条缓存的HTTP响应"""
+    url: str
+    body: bytes
+    etag: str = ""
+    last_modified: str = ""
+    content_type: str = ""
+    stored_at: float = 0.0
+
+class HttpCache:
+    """基于 ETag / Last-Modified 的磁盘HTTP缓存
+
+    热榜等页面在两次运行之间经常没有变化。请求时带上 If-None-Match /
+    If-Modified-Since，服务器返回 304 时直接使用本地缓存的响应体。
+    缓存按存放时间和总大小淘汰：启动时扫描一次目录，淘汰过期条目并建立内存中的
+    {元数据路径: (存放时间, 大小)} 索引；之后写入只更新索引，总大小超过上限时才按索引删除最旧的条目。
+    """
+
+    def __init__(self, directory: str = ".cache/http", max_bytes: int = 50 * 1024 * 1024,
+                 max_age: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[float, int]] = {}
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """读取缓存，不存在或已过期时返回 None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if time.time() - meta.get('stored_at', 0) > self.max_age:
+                return None
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(
+            url=url,
+            body=body,
+            etag=meta.get('etag', ''),
+            last_modified=meta.get('last_modified', ''),
+            content_type=meta.get('content_type', ''),
+            stored_at=meta.get('stored_at', 0.0)
+        )
+
+    def conditional_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """根据缓存条目生成条件请求头"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: bytes, etag: str = "", last_modified: str = "",
+              content_type: str = ""):
+        """写入缓存；没有校验信息的响应不缓存"""
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': content_type,
+            'stored_at': time.time(),
+            'size': len(body),
+        }
+        with self._lock:
+            try:
+                self._write_atomic(body_path, body)
+                self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+            except OSError as e:
+                logger.warning(f"写入HTTP缓存失败 {url}: {e}")
+                return
+            self._track(meta_path, meta['stored_at'], len(body))
+            self._shrink()
+
+    def refresh(self, url: str):
+        """304 命中后刷新存放时间"""
+        meta_path, _ = self._paths(url)
+        with self._lock:
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['stored_at'] = time.time()
+                self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+            except (OSError, ValueError):
+                return
+            self._track(meta_path, meta['stored_at'], meta.get('size', 0))
+
+    def evict(self):
+        """扫描缓存目录：淘汰过期条目，重建索引，并按存放时间从旧到新删除直至总大小不超过上限
+
+        创建缓存时调用一次；运行期间的大小淘汰由 store() 按索引进行。
+        """
+        with self._lock:
+            self._index = {}
+            self._total = 0
+            now = time.time()
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(self.directory, name)
+                body_path = meta_path[:-len('.json')] + '.body'
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    self._remove(meta_path, body_path)
+                    continue
+                stored_at = meta.get('stored_at', 0)
+                if now - stored_at > self.max_age:
+                    self._remove(meta_path, body_path)
+                    continue
+                self._track(meta_path, stored_at, meta.get('size', 0))
+            self._shrink()
+
+    def _track(self, meta_path: str, stored_at: float, size: int):
+        """在索引中记录（或更新）一个条目，调用方持有锁"""
+        _, old_size = self._index.get(meta_path, (0.0, 0))
+        self._index[meta_path] = (stored_at, size)
+        self._total += size - old_size
+
+    def _shrink(self):
+        """按存放时间从旧到新删除条目，直至总大小不超过上限，调用方持有锁"""
+        if self._total <= self.max_bytes:
+            return
+        for meta_path, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total <= self.max_bytes:
+                break
+            self._remove(meta_path, meta_path[:-len('.json')] + '.body')
+            del self._index[meta_path]
+            self._total -= size
+
+    @staticmethod
+    def _remove(*paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
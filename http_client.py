@@ -0,0 +1,202 @@
+# http_client.py - 共享HTTP客户端
+import time
+import threading
+import logging
+from typing import Dict, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from config import get_config
+from deadline import DeadlineExceeded, current_deadline
+from http_cache import HttpCache
+from instrumentation import get_recorder
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# 读取响应体时每块的大小，每块之间检查一次时间预算
+BODY_CHUNK_SIZE = 16 * 1024
+
+def iter_body(response: requests.Response, chunk_size: int = BODY_CHUNK_SIZE):
+    """按块读取响应体，每块之间检查当前时间预算，用完时关闭连接并抛出 DeadlineExceeded
+
+    requests 的超时只限制每次读取的间隔，持续缓慢传输的响应可以远远超过预算。
+    urllib3 2.x 用 read1 读取：每块只等待一次网络读取，有数据就返回，缓慢传输时也能及时检查；
+    其它情况（如 urllib3 1.x、测试用的回放适配器）按 iter_content 的块检查。
+    """
+    deadline = current_deadline()
+    raw = response.raw
+    if isinstance(raw, urllib3.response.HTTPResponse) and hasattr(raw, 'read1'):
+        chunks = iter(lambda: raw.read1(chunk_size, decode_content=True), b'')
+    else:
+        chunks = response.iter_content(chunk_size=chunk_size)
+    for chunk in chunks:
+        if deadline.expired():
+            response.close()
+            raise DeadlineExceeded(f"读取响应体时超出时间预算: {response.url}")
+        yield chunk
+
+class HttpClient:
+    """共享的HTTP客户端
+
+    所有抓取器共用一个 requests.Session，按主机维护 keep-alive 连接池，
+    避免每次请求都重新建立 TCP + TLS 连接；请求前按主机限速。
+    """
+
+    def __init__(self, pool_connections: int = 20, pool_maxsize: int = 4,
+                 cache: Optional[HttpCache] = None, limiter: Optional[RateLimiter] = None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.cache = cache
+        self.limiter = limiter
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self._stats_lock = threading.Lock()
+        self.session = requests.Session()
+        # pool_connections: 缓存的主机连接池个数；pool_maxsize: 每个主机保留的连接数
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """发送GET请求，复用已有连接；启用缓存时使用条件请求
+
+        请求前等待该主机的限速令牌；收到 429/503 时按 Retry-After 暂停该主机。
+        超时限制在当前时间预算的剩余时间内，响应体按块读取并在块之间检查预算（见 iter_body），
+        预算已用完（或限速等待会用完预算）时抛出 DeadlineExceeded。
+        """
+        recorder = get_recorder()
+        deadline = current_deadline()
+        if deadline.expired():
+            raise DeadlineExceeded(f"已超出时间预算，不再请求: {url}")
+        if self.limiter is not None:
+            # 等待会用完预算时不预约，不占用该主机的下一个名额
+            delay = self.limiter.reserve(url, max_wait=deadline.remaining())
+            if delay is None:
+                raise DeadlineExceeded(f"等待限速会超出时间预算: {url}")
+            if delay > 0:
+                time.sleep(delay)
+                recorder.add(wait_seconds=delay)
+        kwargs['timeout'] = deadline.limit(kwargs.get('timeout'))
+        start = time.perf_counter()
+        response = self._get(url, **kwargs)
+        if self.limiter is not None:
+            self.limiter.observe(url, response.status_code, response.headers)
+        # 流式响应此时只读到响应头，响应体字节数由调用方读取后自行统计
+        nbytes = 0 if kwargs.get('stream') else len(response.content)
+        recorder.record_request(
+            url,
+            ttfb=response.elapsed.total_seconds(),
+            total=time.perf_counter() - start,
+            nbytes=nbytes,
+            not_modified=getattr(response, 'from_cache', False)
+        )
+        return response
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        if self.cache is None or kwargs.get('stream'):
+            return self._send(url, **kwargs)
+
+        entry = self.cache.lookup(url)
+        headers = {**(kwargs.pop('headers', None) or {}), **self.cache.conditional_headers(entry)}
+        response = self._send(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            # 内容未变化，用缓存的响应体还原为 200 响应
+            response.status_code = 200
+            response._content = entry.body
+            if entry.content_type:
+                response.headers['Content-Type'] = entry.content_type
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+            response.from_cache = True
+            self.cache.refresh(url)
+            with self._stats_lock:
+                self.not_modified += 1
+                self.bytes_saved += len(entry.body)
+        elif response.status_code == 200:
+            self.cache.store(
+                url,
+                response.content,
+                etag=response.headers.get('ETag', ''),
+                last_modified=response.headers.get('Last-Modified', ''),
+                content_type=response.headers.get('Content-Type', '')
+            )
+        return response
+
+    def _send(self, url: str, stream: bool = False, **kwargs) -> requests.Response:
+        """发送请求；非流式请求的响应体也按块读取（见 iter_body），不会在时间预算之外继续下载"""
+        response = self.session.get(url, stream=True, **kwargs)
+        if not stream:
+            response._content = b''.join(iter_body(response))
+            response._content_consumed = True
+        return response
+
+    def host_stats(self) -> Dict[str, Dict[str, int]]:
+        """按主机统计新建连接数和请求数"""
+        hosts = {}
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            poolmanager = getattr(adapter, 'poolmanager', None)
+            if poolmanager is None:
+                continue
+            pools = poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats = hosts.setdefault(pool.host, {'connections': 0, 'requests': 0})
+                stats['connections'] += pool.num_connections
+                stats['requests'] += pool.num_requests
+        return hosts
+
+    def stats(self) -> Dict[str, int]:
+        """连接复用统计：新建连接数、复用连接数、请求总数"""
+        hosts = self.host_stats().values()
+        opened = sum(stats['connections'] for stats in hosts)
+        requests_sent = sum(stats['requests'] for stats in hosts)
+        return {
+            'requests': requests_sent,
+            'new_connections': opened,
+            'reused_connections': max(0, requests_sent - opened),
+            'not_modified': self.not_modified,
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def close(self):
+        """关闭所有连接"""
+        self.session.close()
+
+# 全局客户端实例
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> HttpClient:
+    """获取全局共享的HTTP客户端"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                settings = get_config().app_config
+                cache = None
+                if settings.http_cache_enabled:
+                    cache = HttpCache(
+                        directory=settings.http_cache_dir,
+                        max_bytes=settings.http_cache_max_mb * 1024 * 1024,
+                        max_age=settings.http_cache_max_age_hours * 3600
+                    )
+                limiter = None
+                if settings.request_delay > 0:
+                    limiter = RateLimiter(
+                        request_delay=settings.request_delay,
+                        burst=settings.rate_limit_burst,
+                        host_delays=settings.host_delays
+                    )
+                _http_client = HttpClient(
+                    pool_connections=settings.pool_connections,
+                    pool_maxsize=settings.pool_maxsize,
+                    cache=cache,
+                    limiter=limiter
+                )
+    return _http_client
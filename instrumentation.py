@@ -0,0 +1,194 @@
+# instrumentation.py - 运行计时统计与性能剖析
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# 设置后对整次运行做性能剖析：cprofile 或 pyinstrument
+PROFILE_ENV = "NEWS_PROFILE"
+
+# 当前正在抓取的新闻源，线程和 asyncio 任务各自独立
+_current_source = contextvars.ContextVar('current_source', default=None)
+
+_SOURCE_FIELDS = ('calls', 'seconds', 'requests', 'bytes', 'items', 'retries', 'errors',
+                  'ttfb_seconds', 'download_seconds')
+_HOST_FIELDS = ('requests', 'bytes', 'not_modified', 'ttfb_seconds', 'download_seconds')
+
+def _new_counters(fields) -> Dict[str, float]:
+    return {name: 0 for name in fields}
+
+class RunRecorder:
+    """记录一次运行中各阶段、各新闻源、各主机的耗时与计数
+
+    阶段（抓取、解析、分类、去重、渲染、SMTP等）按名称累计耗时、调用次数和条目数；
+    新闻源累计请求数、下载字节、条目数、重试和失败次数；
+    HTTP请求按主机区分首字节时间（含DNS、建连、TLS和服务器处理）与下载时间。
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.sources: Dict[str, Dict[str, float]] = {}
+        self.hosts: Dict[str, Dict[str, float]] = {}
+        self.extra: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """计时一个阶段；可向返回的字典写入 items 记录处理条目数"""
+        info = {'items': 0}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'items': 0})
+                stage['calls'] += 1
+                stage['seconds'] += elapsed
+                stage['items'] += info['items']
+
+    @contextmanager
+    def source(self, name: str):
+        """计时一个新闻源的抓取，期间的HTTP请求、重试等都计入该新闻源"""
+        token = _current_source.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.add(errors=1)
+            raise
+        finally:
+            self.add(calls=1, seconds=time.perf_counter() - start)
+            _current_source.reset(token)
+
+    def add(self, source: Optional[str] = None, **counts):
+        """累加新闻源计数，默认计入当前新闻源；不在任何新闻源内时忽略"""
+        source = source or _current_source.get()
+        if source is None:
+            return
+        with self._lock:
+            stats = self.sources.setdefault(source, _new_counters(_SOURCE_FIELDS))
+            for name, value in counts.items():
+                stats[name] = stats.get(name, 0) + value
+
+    def record_request(self, url: str, ttfb: float, total: float, nbytes: int, not_modified: bool = False):
+        """记录一次HTTP请求：首字节时间、总耗时和响应体字节数"""
+        download = max(0.0, total - ttfb)
+        host = urlparse(url).netloc
+        with self._lock:
+            stats = self.hosts.setdefault(host, _new_counters(_HOST_FIELDS))
+            stats['requests'] += 1
+            stats['bytes'] += nbytes
+            stats['not_modified'] += int(not_modified)
+            stats['ttfb_seconds'] += ttfb
+            stats['download_seconds'] += download
+        self.add(requests=1, bytes=nbytes, ttfb_seconds=ttfb, download_seconds=download)
+
+    def report(self) -> Dict:
+        """生成运行报告"""
+        def rounded(table):
+            return {
+                name: {key: round(value, 4) if isinstance(value, float) else value
+                       for key, value in stats.items()}
+                for name, stats in table.items()
+            }
+
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'total_seconds': round(time.perf_counter() - self._t0, 4),
+                'stages': rounded(self.stages),
+                'sources': rounded(self.sources),
+                'hosts': rounded(self.hosts),
+                **self.extra,
+            }
+
+    def write(self, directory: str) -> Optional[str]:
+        """把运行报告写入 directory/run-时间戳.json，返回文件路径"""
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run-{self.started_at:%Y%m%d-%H%M%S}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+_recorder = RunRecorder()
+
+def get_recorder() -> RunRecorder:
+    """获取当前运行的记录器"""
+    return _recorder
+
+def reset_recorder() -> RunRecorder:
+    """开始新的一次运行"""
+    global _recorder
+    _recorder = RunRecorder()
+    return _recorder
+
+def timed(stage_name: str):
+    """装饰器：把函数的每次调用计入阶段 stage_name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_recorder().stage(stage_name) as stage:
+                stage['items'] = 1
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def profiling(directory: str):
+    """按环境变量 NEWS_PROFILE 对代码块做性能剖析，结果写入 directory
+
+    cprofile 输出 .prof 文件（可用 snakeviz / pstats 查看）；
+    pyinstrument 输出 .html 火焰图，需要另行安装 pyinstrument。
+    """
+    mode = os.getenv(PROFILE_ENV, '').strip().lower()
+    if not mode:
+        yield
+        return
+
+    os.makedirs(directory or '.', exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("未安装 pyinstrument，跳过性能剖析")
+            yield
+            return
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = os.path.join(directory, f"profile-{stamp}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            logger.info(f"🔬 性能剖析结果: {path}")
+    elif mode == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(directory, f"profile-{stamp}.prof")
+            profiler.dump_stats(path)
+            logger.info(f"🔬 性能剖析结果: {path}")
+    else:
+        logger.warning(f"未知的 {PROFILE_ENV}={mode}，可选 cprofile 或 pyinstrument")
+        yield
@@ -0,0 +1,86 @@
+# json_path.py - JSONPath 预编译：常见的 $.a.b[:N] 形式直接按字典和列表取值
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+# 快速路径支持的步骤: .name、['name']、[N]、[M:N]、[*]
+_STEP = re.compile(
+    r"\.(?P<field>[A-Za-z_][\w-]*)"
+    r"|\[['\"](?P<quoted>[^'\"]+)['\"]\]"
+    r"|\[(?P<index>-?\d+)\]"
+    r"|\[(?P<start>-?\d*):(?P<stop>-?\d*)\]"
+    r"|(?P<all>\[\*\])"
+)
+
+def _fast_steps(expression: str) -> Optional[List[Tuple[str, Any]]]:
+    """把表达式拆成 [(步骤类型, 参数)]，含过滤器、递归下降等其它语法时返回 None"""
+    expression = expression.strip()
+    if not expression.startswith('$'):
+        return None
+    steps, pos = [], 1
+    while pos < len(expression):
+        match = _STEP.match(expression, pos)
+        if not match:
+            return None
+        if match.group('field') or match.group('quoted'):
+            steps.append(('field', match.group('field') or match.group('quoted')))
+        elif match.group('index'):
+            steps.append(('index', int(match.group('index'))))
+        elif match.group('all'):
+            steps.append(('slice', slice(None)))
+        else:
+            start, stop = match.group('start'), match.group('stop')
+            steps.append(('slice', slice(int(start) if start else None, int(stop) if stop else None)))
+        pos = match.end()
+    return steps
+
+class JsonPath:
+    """预编译的 JSONPath 表达式
+
+    只由字段、下标和切片组成的表达式（如 $.data.realtime[:10]）直接按字典和列表取值；
+    其它表达式交给 jsonpath_ng，它构造 PLY 解析器很慢，每个表达式只解析一次。
+    两种方式的匹配结果相同：切片和 [*] 的每个元素各是一个匹配，取不到的字段或下标没有匹配。
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.steps = _fast_steps(expression)
+        self._compiled = None
+        if self.steps is None:
+            from jsonpath_ng import parse
+            # 表达式有误时在这里抛出异常，由加载配置的一方报告
+            self._compiled = parse(expression)
+
+    @property
+    def fast(self) -> bool:
+        return self.steps is not None
+
+    def find(self, data) -> List[Any]:
+        """所有匹配的值，按文档中的顺序"""
+        if self.steps is None:
+            return [match.value for match in self._compiled.find(data)]
+        values = [data]
+        for kind, arg in self.steps:
+            matched = []
+            for value in values:
+                if kind == 'field':
+                    if isinstance(value, dict) and arg in value:
+                        matched.append(value[arg])
+                elif kind == 'index':
+                    if isinstance(value, list) and -len(value) <= arg < len(value):
+                        matched.append(value[arg])
+                elif isinstance(value, list):
+                    matched.extend(value[arg])
+                else:
+                    # 与 jsonpath_ng 相同：对非列表切片时把它当作只有一个元素的列表
+                    matched.extend([value][arg])
+            values = matched
+        return values
+
+    def __repr__(self) -> str:
+        return f"JsonPath({self.expression!r}, fast={self.fast})"
+
+@lru_cache(maxsize=None)
+def compile_json_path(expression: str) -> JsonPath:
+    """编译并缓存 JSONPath 表达式，相同的表达式只编译一次"""
+    return JsonPath(expression)
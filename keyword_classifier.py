@@ -0,0 +1,70 @@
+# keyword_classifier.py - 多分类关键词匹配（Aho–Corasick 自动机）
+from collections import deque
+from typing import Dict, Iterable, List, Mapping
+
+class KeywordClassifier:
+    """把所有分类的关键词构建成一个 Aho–Corasick 自动机
+
+    原先每个分类各自对标题做一轮 `keyword in title`，同一标题被反复扫描；
+    这里对每个标题只扫描一遍，即可得到它命中的全部分类及命中次数。
+    """
+
+    def __init__(self, category_keywords: Mapping[str, Iterable[str]], case_sensitive: bool = False):
+        self.case_sensitive = case_sensitive
+        self.categories: List[str] = list(category_keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+
+        for index, category in enumerate(self.categories):
+            # 同一分类内重复的关键词只计一次
+            for keyword in set(self._normalize(k) for k in category_keywords[category] if k):
+                self._add(keyword, index)
+        self._build()
+
+    def _normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _add(self, keyword: str, category_index: int):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next_node
+        self._out[node] += (category_index,)
+
+    def _build(self):
+        """广度优先计算失败指针，并把后缀节点的输出合并进来"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def match(self, text: str) -> Dict[str, int]:
+        """单次扫描，返回 {分类: 关键词命中次数}"""
+        goto, fail, out = self._goto, self._fail, self._out
+        counts: Dict[int, int] = {}
+        node = 0
+        for char in self._normalize(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                counts[index] = counts.get(index, 0) + 1
+        categories = self.categories
+        return {categories[index]: count for index, count in sorted(counts.items())}
+
+    def classify(self, text: str) -> List[str]:
+        """返回命中的分类，按构建时的分类顺序排列"""
+        return list(self.match(text))
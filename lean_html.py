@@ -0,0 +1,192 @@
+# lean_html.py - 精简HTML邮件：只保留用到的CSS、压缩空白、控制正文大小
+import re
+from typing import Dict, List, Optional, Tuple
+
+from templates import Template, _FIELD
+
+_STYLE_BLOCK = re.compile(r'[ \t]*<style[^>]*>(.*?)</style>[ \t]*\n?', re.S | re.I)
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_TAG = re.compile(r'<(/?)([a-zA-Z][\w-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+_ATTR = re.compile(r'\s([\w-]+)\s*=\s*"([^"]*)"')
+_COMPOUND = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$')
+_VOID_TAGS = {'meta', 'link', 'br', 'hr', 'img', 'input'}
+
+def _compact(style: str) -> str:
+    """压缩 style 属性：去掉多余空白和末尾分号"""
+    return ';'.join(':'.join(part.strip() for part in declaration.split(':', 1))
+                    for declaration in style.split(';') if declaration.strip())
+
+class Stylesheet:
+    """从 <style> 中解析出的样式规则
+
+    只支持邮件模板中用到的选择器：标签、类（可组合，如 div.a.b）及其后代组合（如 .header h1）；
+    伪类、属性选择器和 @ 规则在大多数邮件客户端中本来就不生效，直接忽略。
+    """
+
+    def __init__(self, css: str):
+        # [(选择器, 复合选择器列表, 优先级, 声明列表)]，按样式表中的顺序
+        self.rules: List[Tuple[str, List[Tuple[Optional[str], frozenset]], Tuple[int, int], List[Tuple[str, str]]]] = []
+        for selectors, body in _RULE.findall(_COMMENT.sub('', css)):
+            declarations = []
+            for declaration in body.split(';'):
+                prop, _, value = declaration.partition(':')
+                if prop.strip() and value.strip():
+                    declarations.append((prop.strip().lower(), ' '.join(value.split())))
+            for selector in selectors.split(','):
+                compounds = self._parse(selector)
+                if compounds and declarations:
+                    specificity = (sum(len(classes) for _, classes in compounds),
+                                   sum(1 for tag, _ in compounds if tag))
+                    self.rules.append((' '.join(selector.split()), compounds, specificity, declarations))
+
+    @classmethod
+    def from_html(cls, source: str) -> 'Stylesheet':
+        return cls('\n'.join(_STYLE_BLOCK.findall(source)))
+
+    @staticmethod
+    def _parse(selector: str) -> List[Tuple[Optional[str], frozenset]]:
+        compounds = []
+        for part in selector.split():
+            match = _COMPOUND.match(part)
+            if not match or not part:
+                return []
+            tag, classes = match.groups()
+            compounds.append((tag.lower() if tag else None, frozenset(filter(None, classes.split('.')))))
+        return compounds
+
+    @staticmethod
+    def _matches(compound, tag: str, classes) -> bool:
+        return (compound[0] is None or compound[0] == tag) and compound[1] <= classes
+
+    def _applies(self, compounds, tag: str, classes, ancestors) -> bool:
+        if not self._matches(compounds[-1], tag, classes):
+            return False
+        # 后代组合：其余复合选择器由近到远依次匹配祖先元素
+        remaining = compounds[:-1]
+        for ancestor in reversed(ancestors):
+            if not remaining:
+                break
+            if self._matches(remaining[-1], *ancestor):
+                remaining = remaining[:-1]
+        return not remaining
+
+    def _matching(self, tag: str, classes, ancestors) -> List[int]:
+        """匹配元素的规则序号，按优先级和样式表顺序排列（后面的覆盖前面的）"""
+        matched = [(rule[2], index) for index, rule in enumerate(self.rules)
+                   if self._applies(rule[1], tag, classes, ancestors)]
+        return [index for _, index in sorted(matched)]
+
+    def used(self, sources: List[str]) -> 'Stylesheet':
+        """只保留匹配模板中至少一个元素的规则"""
+        indexes = set()
+
+        def visit(tag, attrs, classes, ancestors):
+            indexes.update(self._matching(tag, classes, ancestors))
+
+        for source in sources:
+            _walk(source, visit)
+        stylesheet = Stylesheet('')
+        stylesheet.rules = [rule for index, rule in enumerate(self.rules) if index in indexes]
+        return stylesheet
+
+    def css(self) -> str:
+        """压缩后的样式表，每条规则一行"""
+        return ''.join(f"{selector}{{{';'.join(f'{prop}:{value}' for prop, value in declarations)}}}\n"
+                       for selector, _, _, declarations in self.rules)
+
+    def inline(self, source: str) -> str:
+        """去掉 <style>，把匹配的样式写入各元素的 style 属性（元素原有的 style 放在后面，优先生效）"""
+        def replace(tag, attrs, classes, ancestors):
+            style = {}
+            for index in self._matching(tag, classes, ancestors):
+                for prop, value in self.rules[index][3]:
+                    # 后出现的声明移到末尾，保持简写属性（如 border）与单项属性的先后关系
+                    style.pop(prop, None)
+                    style[prop] = value
+            values = dict(_ATTR.findall(attrs))
+            inline = ';'.join(f"{prop}:{value}" for prop, value in style.items())
+            if 'style' in values:
+                own = _compact(values['style'])
+                attrs = _ATTR.sub(lambda m: f' style="{";".join(filter(None, (inline, own)))}"'
+                                  if m.group(1) == 'style' else m.group(0), attrs)
+            elif style:
+                attrs = attrs.rstrip('/').rstrip() + f' style="{inline}"' + ('/' if attrs.endswith('/') else '')
+            # class 只用于匹配样式，写入 style 后不再需要；含占位符的 class 保留
+            if style and 'class' in values and '{{' not in values['class']:
+                attrs = re.sub(r'\sclass\s*=\s*"[^"]*"', '', attrs)
+            return f"<{tag}{attrs}>"
+        return _walk(_STYLE_BLOCK.sub('', source), replace)
+
+def _walk(source: str, visit) -> str:
+    """依次访问源文本中的开始标签，visit(标签, 属性文本, class集合, 祖先列表) 返回替换文本或 None"""
+    ancestors: List[Tuple[str, frozenset]] = []
+    out, pos = [], 0
+    for match in _TAG.finditer(source):
+        closing, tag, attrs = match.group(1), match.group(2).lower(), match.group(3)
+        out.append(source[pos:match.start()])
+        pos = match.end()
+        if closing:
+            # 模板片段中的标签不一定成对，找不到对应的开始标签时忽略
+            for i in range(len(ancestors) - 1, -1, -1):
+                if ancestors[i][0] == tag:
+                    del ancestors[i:]
+                    break
+            out.append(match.group(0))
+            continue
+        classes = frozenset(dict(_ATTR.findall(attrs)).get('class', '').split())
+        out.append(visit(tag, attrs, classes, ancestors) or match.group(0))
+        if tag not in _VOID_TAGS and not attrs.endswith('/'):
+            ancestors.append((tag, classes))
+    out.append(source[pos:])
+    return ''.join(out)
+
+def minify(source: str) -> str:
+    """去掉缩进、行尾空白和空行
+
+    保留换行而不是把整个文档压成一行：8bit 发送要求每行不超过 998 字节（见 mime_builder），
+    片段也仍以换行开始或结束，可以单独编码后拼接。
+    """
+    source = re.sub(r'[ \t]*\n\s*', '\n', source.lstrip(' \t'))
+    return re.sub(r'[ \t]{2,}', ' ', source)
+
+def lean_templates(templates: List[Tuple[Template, Dict[str, str]]], inline: bool = False) -> List[Template]:
+    """编译一组模板的精简版，样式来自其中的 <style>（通常在页面头部模板中）
+
+    templates 为 [(模板, 常量)]，常量在处理样式之前替换对应的占位符（如决定样式的 class）。
+    inline 为 False 时 <style> 只保留模板中用到的规则并压缩；为 True 时去掉 <style>，
+    把样式写入每个元素的 style 属性，适合会删除 <style> 的邮件客户端，但重复的新闻条目各自携带样式，正文更大。
+    只在编译时执行一次，渲染开销与原模板相同。
+    """
+    sources = []
+    for template, constants in templates:
+        source = template.source
+        if constants:
+            source = _FIELD.sub(lambda m: str(constants[m.group(1)]) if m.group(1) in constants else m.group(0),
+                                source)
+        sources.append(source)
+    stylesheet = Stylesheet.from_html(''.join(sources))
+    if inline:
+        sources = [stylesheet.inline(source) for source in sources]
+    else:
+        block = f"<style>\n{stylesheet.used(sources).css()}</style>\n"
+        sources = [_STYLE_BLOCK.sub(lambda m: block, source) for source in sources]
+    return [Template(minify(source), autoescape=template.autoescape)
+            for source, (template, _) in zip(sources, templates)]
+
+def fit_budget(fixed: int, items: Dict[str, List[int]], budget: int, min_items: int = 1) -> Dict[str, int]:
+    """在字节预算内每个类别保留多少条新闻
+
+    fixed 为头部、页脚和类别外框等固定部分的字节数，items 为 {类别: [每条新闻的字节数]}。
+    超出预算时从当前条数最多的类别末尾（热度最低的新闻）依次删除，每个类别至少保留 min_items 条；
+    仍然超出时返回最少的条数，由调用方决定是否照常发送。
+    """
+    counts = {name: len(sizes) for name, sizes in items.items()}
+    total = fixed + sum(sum(sizes) for sizes in items.values())
+    while total > budget:
+        name = max(counts, key=counts.get, default=None)
+        if name is None or counts[name] <= min_items:
+            break
+        counts[name] -= 1
+        total -= items[name][counts[name]]
+    return counts
@@ -0,0 +1,306 @@
+# mailer.py - 批量邮件投递（复用SMTP连接）
+import os
+import time
+import queue
+import logging
+import socket
+import smtplib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from config import EmailConfig
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 连接类错误：重新连接后重试该批。SMTPException 是 OSError 的子类，不能直接写 OSError，
+# 否则 SMTPNotSupportedError 等永久错误也会被当作断线反复重连
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+def load_recipients(value: str = "", path: str = "") -> List[str]:
+    """读取收件人：value 为逗号或分号分隔的地址，path 为每行一个地址的订阅者文件（# 开头为注释）
+
+    按出现顺序去重，地址比较不区分大小写。
+    """
+    addresses = value.replace(';', ',').split(',') if value else []
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            addresses.extend(line.split('#', 1)[0] for line in f)
+    recipients, seen = [], set()
+    for address in addresses:
+        address = address.strip()
+        if address and '@' in address and address.lower() not in seen:
+            seen.add(address.lower())
+            recipients.append(address)
+    return recipients
+
+def message_bytes(message) -> bytes:
+    """把邮件序列化为 SMTP 传输用的字节（CRLF 行尾），已是字节时原样返回"""
+    if isinstance(message, bytes):
+        return message
+    return message.as_bytes(policy=message.policy.clone(linesep='\r\n'))
+
+def _quit(smtp: smtplib.SMTP):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+def _reason(value) -> str:
+    return value.decode(errors='replace') if isinstance(value, bytes) else str(value)
+
+@dataclass
+class DeliveryReport:
+    """一次批量投递的结果；retryable 为因临时错误或断线失败、之后可以重试的收件人"""
+    sent: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    retryable: List[str] = field(default_factory=list)
+    batches: int = 0
+    connections: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.sent > 0 and not self.failed
+
+class SmtpConnection:
+    """一个已登录的SMTP连接，按需建立，发送一定数量的邮件后重新连接"""
+
+    def __init__(self, mailer: 'BulkMailer'):
+        self.mailer = mailer
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.messages = 0
+
+    def get(self) -> smtplib.SMTP:
+        mailer = self.mailer
+        if self.smtp is not None and self.messages >= mailer.messages_per_connection:
+            # 服务商通常限制单个连接的邮件数，到达上限后主动换一个连接
+            self.close()
+        if self.smtp is None:
+            self.smtp = mailer.take_spare() or mailer.connect()
+            self.messages = 0
+        return self.smtp
+
+    def close(self):
+        if self.smtp is None:
+            return
+        _quit(self.smtp)
+        self.smtp = None
+
+class BulkMailer:
+    """批量邮件投递
+
+    邮件只渲染（序列化）一次，收件人按 rcpt_batch 分批，每批一次 SMTP 事务（多个 RCPT TO）。
+    pool_size 个工作线程各自持有一个已登录的连接并反复复用；连接断开时重新连接并重试该批，
+    4xx 临时错误按 max_retries 重试，5xx 永久错误记为失败。
+    rate_per_minute 限制每分钟的 SMTP 事务数，用于遵守服务商的发送频率限制。
+    """
+
+    def __init__(self, host: str, port: int, sender: str, password: Optional[str] = None,
+                 security: str = "starttls", timeout: float = 30, pool_size: int = 1,
+                 rcpt_batch: int = 50, messages_per_connection: int = 100,
+                 rate_per_minute: float = 0, max_retries: int = 3):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.security = security
+        self.timeout = timeout
+        self.pool_size = max(1, pool_size)
+        self.rcpt_batch = max(1, rcpt_batch)
+        self.messages_per_connection = max(1, messages_per_connection)
+        self.max_retries = max(1, max_retries)
+        self._bucket = TokenBucket(60.0 / rate_per_minute) if rate_per_minute > 0 else None
+        self._lock = threading.Lock()
+        # 服务器的 ESMTP 扩展（探测一次后缓存）和探测时建立、留给第一批使用的连接
+        self._features: Optional[Dict] = None
+        self._spare: Optional[smtplib.SMTP] = None
+
+    @classmethod
+    def from_config(cls, email_config: EmailConfig, sender: str, password: Optional[str] = None) -> 'BulkMailer':
+        return cls(
+            host=email_config.smtp_server,
+            port=email_config.smtp_port,
+            sender=sender,
+            password=password,
+            security=email_config.security,
+            timeout=email_config.timeout,
+            pool_size=email_config.pool_size,
+            rcpt_batch=email_config.rcpt_batch,
+            messages_per_connection=email_config.messages_per_connection,
+            rate_per_minute=email_config.rate_per_minute,
+            max_retries=email_config.max_retries
+        )
+
+    def connect(self) -> smtplib.SMTP:
+        """建立连接并登录；security 为 ssl（465端口）、starttls 或 none（本地测试服务器）"""
+        if self.security == 'ssl':
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == 'starttls':
+                smtp.starttls()
+        # 本地测试服务器（security 为 none）和没有声明 AUTH 扩展的服务器不登录
+        if self.password and self.security != 'none':
+            smtp.ehlo_or_helo_if_needed()
+            if smtp.has_extn('auth'):
+                smtp.login(self.sender, self.password)
+            else:
+                logger.warning(f"SMTP服务器 {self.host}:{self.port} 未声明 AUTH 扩展，不登录")
+        return smtp
+
+    def features(self) -> Dict:
+        """服务器支持的扩展：{'8bitmime': bool, 'smtputf8': bool, 'size': 最大邮件字节数（0 表示未声明）}
+
+        首次调用时连接服务器读取 EHLO 应答，连接保留给之后的第一批投递使用；
+        连接失败时按不支持任何扩展处理，不缓存结果。
+        """
+        with self._lock:
+            if self._features is not None:
+                return self._features
+        try:
+            smtp = self.connect()
+            smtp.ehlo_or_helo_if_needed()
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning(f"探测SMTP服务器扩展失败: {e}")
+            return {'8bitmime': False, 'smtputf8': False, 'size': 0}
+        size = smtp.esmtp_features.get('size', '')
+        features = {
+            '8bitmime': smtp.has_extn('8bitmime'),
+            'smtputf8': smtp.has_extn('smtputf8'),
+            'size': int(size) if size.isdigit() else 0
+        }
+        with self._lock:
+            self._features = features
+            if self._spare is None:
+                self._spare, smtp = smtp, None
+        if smtp is not None:
+            _quit(smtp)
+        return features
+
+    def take_spare(self) -> Optional[smtplib.SMTP]:
+        with self._lock:
+            smtp, self._spare = self._spare, None
+        return smtp
+
+    def close(self):
+        """关闭探测时留下、尚未使用的连接"""
+        smtp = self.take_spare()
+        if smtp is not None:
+            _quit(smtp)
+
+    def batches(self, recipients: Iterable[str]) -> List[List[str]]:
+        recipients = list(recipients)
+        return [recipients[i:i + self.rcpt_batch] for i in range(0, len(recipients), self.rcpt_batch)]
+
+    def send(self, message, recipients: Iterable[str], mail_options: Sequence[str] = ()) -> DeliveryReport:
+        """把同一封邮件投递给所有收件人，返回投递结果"""
+        return self.send_bytes(message_bytes(message), recipients, mail_options)
+
+    def send_bytes(self, data: bytes, recipients: Iterable[str], mail_options: Sequence[str] = ()) -> DeliveryReport:
+        """投递已序列化的邮件（如投递队列的磁盘暂存）
+
+        mail_options 为 MAIL FROM 的参数，8bit 编码的邮件需要 BODY=8BITMIME。
+        """
+        start = time.perf_counter()
+        report = DeliveryReport()
+        pending = queue.Queue()
+        for batch in self.batches(recipients):
+            pending.put(batch)
+        workers = [
+            threading.Thread(target=self._worker, args=(pending, data, mail_options, report), daemon=True)
+            for _ in range(min(self.pool_size, pending.qsize()))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        report.seconds = time.perf_counter() - start
+        logger.info(f"📮 批量投递: 成功 {report.sent} 个收件人，失败 {len(report.failed)} 个，"
+                    f"{report.batches} 批，{report.connections} 个连接，耗时 {report.seconds:.1f} 秒")
+        return report
+
+    def _worker(self, pending: queue.Queue, data: bytes, mail_options: Sequence[str], report: DeliveryReport):
+        connection = SmtpConnection(self)
+        try:
+            while True:
+                try:
+                    batch = pending.get_nowait()
+                except queue.Empty:
+                    return
+                self._send_batch(connection, batch, data, mail_options, report)
+        finally:
+            connection.close()
+
+    def _throttle(self):
+        if self._bucket is not None:
+            delay = self._bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _send_batch(self, connection: SmtpConnection, batch: List[str], data: bytes,
+                    mail_options: Sequence[str], report: DeliveryReport):
+        """发送一批收件人，失败时重连或重试"""
+        error = ""
+        for attempt in range(self.max_retries):
+            self._throttle()
+            try:
+                reconnect = connection.smtp is None or connection.messages >= self.messages_per_connection
+                smtp = connection.get()
+                refused = smtp.sendmail(self.sender, batch, data, list(mail_options))
+                connection.messages += 1
+                with self._lock:
+                    report.batches += 1
+                    report.connections += int(reconnect)
+                    report.sent += len(batch) - len(refused)
+                    self._refuse(report, refused)
+                return
+            except smtplib.SMTPRecipientsRefused as e:
+                # 整批收件人都被拒绝，通常是地址问题，只有 4xx 的收件人之后再重试
+                with self._lock:
+                    self._refuse(report, e.recipients)
+                return
+            except RECONNECT_ERRORS as e:
+                # SMTPConnectError 也是 SMTPResponseException，要先于它处理
+                error = str(e) or type(e).__name__
+                logger.warning(f"SMTP连接异常，重新连接后重试（{attempt + 1}/{self.max_retries}）: {error}")
+                connection.close()
+            except smtplib.SMTPResponseException as e:
+                error = f"{e.smtp_code} {_reason(e.smtp_error)}"
+                if e.smtp_code >= 500:
+                    with self._lock:
+                        report.failed.update(dict.fromkeys(batch, error))
+                    return
+                logger.warning(f"SMTP临时错误，{attempt + 1}/{self.max_retries} 次重试: {error}")
+            except smtplib.SMTPException as e:
+                # 其余 SMTP 错误（如服务器不支持 AUTH）重试也不会成功
+                error = str(e) or type(e).__name__
+                with self._lock:
+                    report.failed.update(dict.fromkeys(batch, error))
+                return
+            except OSError as e:
+                # 其它网络错误（如域名解析失败、TLS 握手失败）不在本批内重连，记为失败，允许投递队列之后再试
+                error = str(e) or type(e).__name__
+                connection.close()
+                with self._lock:
+                    report.failed.update(dict.fromkeys(batch, error))
+                    report.retryable.extend(batch)
+                return
+            if attempt < self.max_retries - 1:
+                with self._lock:
+                    report.retries += 1
+                time.sleep(min(2 ** attempt, 30))
+        # 重试用尽的临时错误：记为失败，并允许之后（如投递队列）再次重试
+        with self._lock:
+            report.failed.update(dict.fromkeys(batch, error))
+            report.retryable.extend(batch)
+
+    @staticmethod
+    def _refuse(report: DeliveryReport, refused: Dict[str, tuple]):
+        """记录被拒绝的收件人，调用方持有锁"""
+        for address, (code, reason) in refused.items():
+            report.failed[address] = f"{code} {_reason(reason)}"
+            if code < 500:
+                report.retryable.append(address)
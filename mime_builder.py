@@ -0,0 +1,120 @@
+# mime_builder.py - 邮件构造：按内容选择最小的传输编码，并缓存编码结果
+import re
+import base64
+import logging
+import threading
+import uuid
+from email import quoprimime
+from email.header import Header
+from email.utils import formataddr, formatdate
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+EIGHT_BIT = '8bit'
+QUOTED_PRINTABLE = 'quoted-printable'
+BASE64 = 'base64'
+
+# SMTP 规定每行（不含 CRLF）最多 998 个字节
+MAX_LINE_BYTES = 998
+_LONG_LINE = re.compile(rb'[^\r\n]{%d,}' % (MAX_LINE_BYTES + 1))
+
+def _crlf(text: str) -> str:
+    return text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '\r\n')
+
+def eight_bit_safe(text: str) -> bool:
+    """是否可以不编码直接以 8bit 发送：没有 NUL 且每行不超过 998 字节"""
+    return '\0' not in text and not _LONG_LINE.search(text.encode('utf-8'))
+
+def encode_body(text: str, encoding: str) -> bytes:
+    """按指定传输编码把文本编码为字节（UTF-8，行尾 CRLF）
+
+    8bit 和 quoted-printable 按行处理：以换行结束的片段分别编码后拼接，与整体编码的结果相同。
+    """
+    if encoding == EIGHT_BIT:
+        return _crlf(text).encode('utf-8')
+    if encoding == QUOTED_PRINTABLE:
+        # body_encode 按字节处理，先把 UTF-8 字节逐个映射为字符
+        return quoprimime.body_encode(text.encode('utf-8').decode('latin-1'), eol='\r\n').encode('ascii')
+    if encoding == BASE64:
+        return base64.encodebytes(text.encode('utf-8')).replace(b'\n', b'\r\n')
+    raise ValueError(f"不支持的传输编码: {encoding}")
+
+def choose_encoding(text: str, allow_8bit: bool = False) -> Tuple[str, bytes]:
+    """选择编码后最小的传输编码，返回 (编码名称, 编码结果)
+
+    服务器支持 8BITMIME 且内容满足行长限制时 8bit 总是最小；
+    否则在 quoted-printable（ASCII 为主时较小）和 base64（中文为主时较小）中取较小者。
+    """
+    if allow_8bit and eight_bit_safe(text):
+        return EIGHT_BIT, encode_body(text, EIGHT_BIT)
+    qp = encode_body(text, QUOTED_PRINTABLE)
+    # base64 的长度可以直接算出，不必实际编码
+    raw = len(text.encode('utf-8'))
+    b64_size = (raw + 2) // 3 * 4
+    b64_size += (b64_size + 75) // 76 * 2
+    if len(qp) <= b64_size:
+        return QUOTED_PRINTABLE, qp
+    return BASE64, encode_body(text, BASE64)
+
+class MessageBuilder:
+    """multipart/alternative 邮件构造器
+
+    每个部分（纯文本、HTML）按内容选择最小的传输编码，编码结果按是否允许 8bit 缓存，
+    发给多批收件人时只有信头需要重新生成。
+    """
+
+    def __init__(self, sender: str, subject: str, parts: List[Tuple[str, str]], from_name: str = ""):
+        self.sender = sender
+        self.subject = subject
+        # [(子类型, 内容)]，如 [('plain', 纯文本), ('html', HTML)]
+        self.parts = parts
+        self.from_name = from_name
+        self._bodies: Dict[bool, List[Tuple[str, str, bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def encoded_parts(self, allow_8bit: bool = False) -> List[Tuple[str, str, bytes]]:
+        """[(子类型, 传输编码, 编码结果)]，首次调用时编码并缓存"""
+        with self._lock:
+            bodies = self._bodies.get(allow_8bit)
+            if bodies is None:
+                bodies = self._bodies[allow_8bit] = [
+                    (subtype, *choose_encoding(text, allow_8bit)) for subtype, text in self.parts
+                ]
+            return bodies
+
+    def build(self, to: str, allow_8bit: bool = False) -> bytes:
+        """生成完整邮件（CRLF 行尾），to 为 To 信头的内容"""
+        boundary = f"==============={uuid.uuid4().hex}=="
+        domain = self.sender.rpartition('@')[2] or 'localhost'
+        out = [
+            f"From: {formataddr((self.from_name, self.sender), 'utf-8')}\r\n"
+            f"To: {to}\r\n"
+            f"Subject: {Header(self.subject, 'utf-8').encode()}\r\n"
+            f"Date: {formatdate(localtime=True)}\r\n"
+            f"Message-ID: <{uuid.uuid4().hex}@{domain}>\r\n"
+            "MIME-Version: 1.0\r\n"
+            f"Content-Type: multipart/alternative; boundary=\"{boundary}\"\r\n".encode('ascii')
+        ]
+        for subtype, encoding, body in self.encoded_parts(allow_8bit):
+            # 分隔行前的 CRLF 属于分隔符，不属于上一部分的内容
+            out.append(f"\r\n--{boundary}\r\nContent-Type: text/{subtype}; charset=\"utf-8\"\r\n"
+                       f"Content-Transfer-Encoding: {encoding}\r\n\r\n".encode('ascii'))
+            out.append(body)
+        out.append(f"\r\n--{boundary}--\r\n".encode('ascii'))
+        return b''.join(out)
+
+    def size_report(self, allow_8bit: bool = False) -> Dict:
+        """各部分选用的编码和字节数，以及统一使用 base64 时的字节数"""
+        parts = []
+        for (subtype, text), (_, encoding, body) in zip(self.parts, self.encoded_parts(allow_8bit)):
+            raw = len(text.encode('utf-8'))
+            parts.append({
+                'subtype': subtype, 'encoding': encoding, 'raw_bytes': raw, 'bytes': len(body),
+                'base64_bytes': len(encode_body(text, BASE64)),
+            })
+        return {
+            'parts': parts,
+            'body_bytes': sum(part['bytes'] for part in parts),
+            'base64_body_bytes': sum(part['base64_bytes'] for part in parts),
+        }
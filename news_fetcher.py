@@ -1,95 +1,156 @@
 # news_fetcher.py - 新闻抓取模块
-import requests
+import time
+import asyncio
 import json
 import random
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+import functools
+import threading
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional, Tuple
 import logging
-from jsonpath_ng import parse
-from tenacity import retry, stop_after_attempt, wait_exponential
+
+from source_engine import SourceEngine
+from json_path import compile_json_path
+from news_item import NewsItem
+from instrumentation import get_recorder
+from circuit_breaker import get_circuit_breaker
+from deadline import DeadlineExceeded, budget, current_deadline, source_budget
+
+if TYPE_CHECKING:
+    import aiohttp
+    from html_parser import StreamingExtractor
 
 logger = logging.getLogger(__name__)
 
-class NewsFetcher:
+def _retry(func):
+    """请求失败时重试一次（tenacity），用于发出请求的协程；tenacity 在第一次调用时才导入
+
+    超出时间预算和任务被取消时不重试；等待重试会用完剩余预算时也不再重试。
+
+    aiohttp、http_client（requests）和 html_parser（lxml、cssselect）同样只在用到的方法中导入，
+    导入本模块时不加载网络和解析库。
+    """
+    retrying = None
+
+    def wrapped():
+        nonlocal retrying
+        if retrying is None:
+            from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+            wait = wait_exponential(multiplier=1, min=2, max=10)
+            retrying = retry(
+                stop=stop_after_attempt(2) | (lambda state: wait(state) >= current_deadline().remaining()),
+                wait=wait,
+                # asyncio.CancelledError 不是 Exception 的子类，取消的任务不会重试
+                retry=retry_if_exception(lambda e: isinstance(e, Exception) and not isinstance(e, DeadlineExceeded)),
+                reraise=True
+            )(func)
+        return retrying
+
+    @functools.wraps(func)
+    async def call(*args, **kwargs):
+        return await wrapped()(*args, **kwargs)
+    return call
+
+class NewsFetcherBase:
+    """新闻抓取器共用的部分：新闻源规则、响应解析、请求头和断路器记录
+
+    网络请求由 AsyncNewsFetcher 实现，NewsFetcher 是它的同步包装。
+    """
+
     def __init__(self, config):
         self.config = config
+        # 启动时预编译所有HTML新闻源的抓取规则
+        self.engine = SourceEngine(config)
+        # 流式抓取统计: 新闻源ID -> {'downloaded': 实际下载字节, 'needed': 凑够条数所需字节}
+        self.stream_stats: Dict[str, Dict[str, int]] = {}
     
-    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def fetch_news(self, source_config) -> List[str]:
-        """根据配置抓取新闻"""
-        try:
-            if source_config.api:
-                return self._fetch_api_news(source_config)
-            else:
-                return self._fetch_html_news(source_config)
-        except Exception as e:
-            logger.error(f"抓取 {source_config.name} 失败: {e}")
-            return [f"{source_config.name}: 抓取失败"]
+    def _record_health(self, key: str, ok: bool):
+        """记录新闻源的一次成功或失败"""
+        breaker = get_circuit_breaker()
+        if breaker is None:
+            return
+        if ok:
+            breaker.record_success(key)
+        else:
+            breaker.record_failure(key)
     
-    def _fetch_api_news(self, source_config) -> List[str]:
-        """抓取API类型的新闻"""
-        headers = self._get_headers()
-        response = requests.get(
-            source_config.url, 
-            headers=headers, 
-            timeout=source_config.timeout
-        )
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        news_list = []
+    def _parse_api_response(self, data, source_config) -> List[NewsItem]:
+        """按 json_path 提取API响应中的新闻"""
+        with get_recorder().stage('parse') as stage:
+            news_list = self._api_records(data, source_config)[:source_config.limit]
+            stage['items'] = len(news_list)
+            return news_list
+    
+    def _api_records(self, data, source_config) -> List[NewsItem]:
+        """API响应中的新闻
+
+        json_path 在加载配置时已编译（NewsSourceConfig.compiled_path），没有配置时整个响应应为新闻列表。
+        """
         if source_config.json_path:
-            try:
-                jsonpath_expr = parse(source_config.json_path)
-                matches = [match.value for match in jsonpath_expr.find(data)]
-                news_list = self._parse_api_data(matches, source_config.id)
-            except:
-                news_list = self._parse_api_data(data, source_config.id)
+            path = source_config.compiled_path or compile_json_path(source_config.json_path)
+            items = path.find(data)
+            if not items:
+                logger.warning(f"{source_config.name}: json_path {source_config.json_path} 没有匹配的数据")
         else:
-            news_list = self._parse_api_data(data, source_config.id)
-        
-        return news_list[:source_config.limit]
+            items = data
+        return self._parse_api_data(items, source_config)
     
-    def _fetch_html_news(self, source_config) -> List[str]:
-        """抓取HTML类型的新闻"""
-        headers = self._get_headers()
-        response = requests.get(
-            source_config.url, 
-            headers=headers, 
-            timeout=source_config.timeout
+    def _new_extractor(self, source_config, encoding: Optional[str]) -> 'StreamingExtractor':
+        from html_parser import StreamingExtractor
+        source = self.engine.compile(source_config)
+        return StreamingExtractor(
+            source.selectors,
+            source.limit,
+            accept=source.accept,
+            encoding=encoding
         )
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        items = soup.select(source_config.selector)
-        
-        news_list = []
-        count = 0
-        for item in items:
-            if count >= source_config.limit * 2:
-                break
-                
-            title = item.text.strip()
-            if title and len(title) > 3 and not title.startswith('http'):
-                count += 1
-                news_list.append(f"{count}. {title}")
-        
-        return news_list[:source_config.limit]
     
-    def _parse_api_data(self, data, source_id: str) -> List[str]:
-        """解析API数据"""
+    def _finish_stream(self, source_config, extractor: 'StreamingExtractor') -> List[NewsItem]:
+        titles = extractor.close()
+        # 流式响应的请求在拿到响应头时已记录，这里补上实际下载的字节数
+        get_recorder().add(bytes=extractor.bytes_downloaded)
+        self.stream_stats[source_config.id] = {
+            'downloaded': extractor.bytes_downloaded,
+            'needed': extractor.bytes_needed,
+        }
+        logger.info(f"{source_config.name} 流式抓取: 下载 {extractor.bytes_downloaded} 字节，"
+                    f"所需 {extractor.bytes_needed} 字节")
+        return self._html_items(titles, source_config)
+    
+    def _parse_html_response(self, text: str, source_config) -> List[NewsItem]:
+        """按新闻源的声明式规则提取HTML页面中的新闻"""
+        from html_parser import parse_html
+        source = self.engine.compile(source_config)
+        with get_recorder().stage('parse') as stage:
+            titles = source.extract(parse_html(text), source.limit)
+            stage['items'] = len(titles)
+        return self._html_items(titles, source_config)
+    
+    def _html_items(self, titles: List[str], source_config) -> List[NewsItem]:
+        """HTML页面中按顺序提取的标题；页面上没有热度，设置了 rank_decay 的热榜按名次计算"""
+        source = self.engine.compile(source_config)
+        fetched_at = time.time()
+        return [NewsItem(title=title, source=source_config.name, rank=i, hot=source.rank_hot(i - 1),
+                         category=source_config.category, fetched_at=fetched_at)
+                for i, title in enumerate(titles, 1)]
+    
+    def _parse_api_data(self, data, source_config) -> List[NewsItem]:
+        """解析API数据，序号为新闻在列表中的位置"""
         news_list = []
         
         if isinstance(data, list):
+            fetched_at = time.time()
             for i, item in enumerate(data, 1):
-                title = self._extract_title(item, source_id)
+                title = self._extract_title(item, source_config.id)
                 if title:
-                    hot_text = self._extract_hot(item, source_id)
-                    if hot_text:
-                        news_list.append(f"{i}. {title} {hot_text}")
-                    else:
-                        news_list.append(f"{i}. {title}")
+                    news_list.append(NewsItem(
+                        title=title,
+                        source=source_config.name,
+                        rank=i,
+                        hot=self._extract_hot(item, source_config.id),
+                        url=self._extract_url(item),
+                        category=source_config.category,
+                        fetched_at=fetched_at
+                    ))
         
         return news_list
     
@@ -108,30 +169,37 @@ class NewsFetcher:
             return item
         return ''
     
-    def _extract_hot(self, item, source_id: str) -> str:
-        """提取热度信息"""
+    def _extract_hot(self, item, source_id: str) -> int:
+        """提取热度值，没有时为 0"""
         if isinstance(item, dict):
             if source_id == 'weibo':
                 hot = item.get('num', 0)
-                if hot > 10000:
-                    return f"🔥{hot//10000}w"
-                elif hot > 0:
-                    return f"🔥{hot}"
             elif source_id == 'toutiao':
                 hot = item.get('HotValue', 0)
-                if hot > 10000:
-                    return f"🔥{hot//10000}w"
+            else:
+                return 0
+            try:
+                return int(hot or 0)
+            except (TypeError, ValueError):
+                return 0
+        return 0
+    
+    def _extract_url(self, item) -> str:
+        """提取新闻链接（知乎在 target 中），没有时为空"""
+        if isinstance(item, dict):
+            url = item.get('url') or (item.get('target') or {}).get('url', '')
+            return url if isinstance(url, str) else ''
         return ''
     
-    def _get_headers(self) -> Dict[str, str]:
-        """获取请求头"""
+    def _get_headers(self, source_config=None) -> Dict[str, str]:
+        """获取请求头（含新闻源声明的 Referer）"""
         user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0'
         ]
         
-        return {
+        headers = {
             'User-Agent': random.choice(user_agents),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
@@ -139,3 +207,214 @@ class NewsFetcher:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
+        if source_config is not None and source_config.referer:
+            headers['Referer'] = source_config.referer
+        return headers
+
+
+class AsyncNewsFetcher(NewsFetcherBase):
+    """基于 asyncio 的新闻抓取器
+
+    网络请求使用 aiohttp，所有新闻源在同一个事件循环中并发进行；
+    NewsFetcher 的同步接口也由它驱动。
+    """
+    
+    def __init__(self, config, session_factory: Optional[Callable[[], 'aiohttp.ClientSession']] = None):
+        super().__init__(config)
+        # 创建 aiohttp 会话的函数，默认按 max_workers、max_per_host 建立连接池（基准测试用它回放样本）
+        self.session_factory = session_factory
+        self._session: Optional['aiohttp.ClientSession'] = None
+    
+    async def fetch_all(self, sources) -> Dict[str, List[NewsItem]]:
+        """并发抓取多个新闻源，结果按传入顺序返回"""
+        import aiohttp
+        if self.session_factory is not None:
+            session = self.session_factory()
+        else:
+            settings = self.config.app_config
+            connector = aiohttp.TCPConnector(
+                limit=settings.max_workers,
+                limit_per_host=settings.max_per_host
+            )
+            session = aiohttp.ClientSession(connector=connector)
+        async with session:
+            self._session = session
+            try:
+                results = await asyncio.gather(
+                    *(self.fetch_news(source_config) for source_config in sources)
+                )
+            finally:
+                self._session = None
+        return {source_config.id: news for source_config, news in zip(sources, results)}
+    
+    async def fetch_news(self, source_config) -> List[NewsItem]:
+        """根据配置抓取新闻，超出新闻源时间预算时取消未完成的请求"""
+        recorder = get_recorder()
+        breaker = get_circuit_breaker()
+        key = f"source:{source_config.id}"
+        with recorder.source(source_config.id):
+            if breaker is not None and not breaker.allow(key):
+                logger.info(f"⛔ {source_config.name} 断路器打开，跳过")
+                recorder.add(skipped=1)
+                return []
+            try:
+                # 预算已按运行截止时间收紧，所有新闻源都会在截止时间前返回
+                with budget(source_budget(source_config.id)) as deadline:
+                    if source_config.api:
+                        fetch = self._fetch_api_news(source_config)
+                    else:
+                        fetch = self._fetch_html_news(source_config)
+                    news = await asyncio.wait_for(fetch, deadline.wait_timeout())
+                recorder.add(items=len(news))
+                self._record_health(key, bool(news))
+                return news
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                logger.warning(f"⏰ {source_config.name} 超出时间预算，已取消")
+                recorder.add(timeouts=1)
+                self._record_health(key, False)
+                return []
+            except Exception as e:
+                logger.error(f"抓取 {source_config.name} 失败: {e}")
+                recorder.add(errors=1)
+                self._record_health(key, False)
+                return []
+    
+    async def _fetch_api_news(self, source_config) -> List[NewsItem]:
+        """抓取API类型的新闻"""
+        body, charset = await self._request(source_config)
+        data = json.loads(body.decode(charset or 'utf-8', errors='replace'))
+        
+        return self._parse_api_response(data, source_config)
+    
+    async def _fetch_html_news(self, source_config) -> List[NewsItem]:
+        """抓取HTML类型的新闻"""
+        if source_config.stream:
+            return await self._fetch_html_stream(source_config)
+        
+        body, charset = await self._request(source_config)
+        text = body.decode(charset or 'utf-8', errors='replace')
+        
+        return self._parse_html_response(text, source_config)
+    
+    @_retry
+    async def _fetch_html_stream(self, source_config) -> List[NewsItem]:
+        """流式抓取HTML新闻，凑够条数后立即断开连接"""
+        if self._session is None:
+            raise RuntimeError("AsyncNewsFetcher 需要在 fetch_all 中使用")
+        
+        import aiohttp
+        from http_client import get_http_client
+        from html_parser import STREAM_CHUNK_SIZE, charset_from_headers
+        limiter = get_http_client().limiter
+        if limiter is not None and not await limiter.wait_async(source_config.url, current_deadline().remaining()):
+            raise DeadlineExceeded(f"等待限速会超出时间预算: {source_config.url}")
+        start = time.perf_counter()
+        async with self._session.get(
+            source_config.url,
+            headers=self._get_headers(source_config),
+            timeout=aiohttp.ClientTimeout(total=source_config.timeout)
+        ) as response:
+            elapsed = time.perf_counter() - start
+            get_recorder().record_request(source_config.url, ttfb=elapsed, total=elapsed, nbytes=0)
+            if limiter is not None:
+                limiter.observe(source_config.url, response.status, response.headers)
+            response.raise_for_status()
+            extractor = self._new_extractor(source_config, charset_from_headers(response.headers))
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                if extractor.feed(chunk):
+                    # 提前结束时放弃该连接，不再读取剩余内容
+                    response.close()
+                    break
+        
+        return self._finish_stream(source_config, extractor)
+    
+    @_retry
+    async def _request(self, source_config) -> Tuple[bytes, Optional[str]]:
+        """发送请求并返回 (响应体, 字符集)，与同步抓取共用磁盘HTTP缓存"""
+        if self._session is None:
+            raise RuntimeError("AsyncNewsFetcher 需要在 fetch_all 中使用")
+        
+        import aiohttp
+        from http_client import get_http_client
+        client = get_http_client()
+        cache = client.cache
+        entry = cache.lookup(source_config.url) if cache else None
+        headers = self._get_headers(source_config)
+        if cache:
+            headers.update(cache.conditional_headers(entry))
+        
+        recorder = get_recorder()
+        # 等待限速令牌时不占用连接，其他主机的请求照常进行
+        if client.limiter is not None and not await client.limiter.wait_async(
+                source_config.url, current_deadline().remaining()):
+            raise DeadlineExceeded(f"等待限速会超出时间预算: {source_config.url}")
+        start = time.perf_counter()
+        async with self._session.get(
+            source_config.url,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=source_config.timeout)
+        ) as response:
+            ttfb = time.perf_counter() - start
+            if client.limiter is not None:
+                client.limiter.observe(source_config.url, response.status, response.headers)
+            if response.status == 304 and entry is not None:
+                recorder.record_request(source_config.url, ttfb=ttfb, total=ttfb, nbytes=0, not_modified=True)
+                cache.refresh(source_config.url)
+                charset = None
+                if entry.content_type:
+                    from requests.utils import get_encoding_from_headers
+                    charset = get_encoding_from_headers(
+                        {'content-type': entry.content_type})
+                return entry.body, charset
+            
+            response.raise_for_status()
+            body = await response.read()
+            recorder.record_request(source_config.url, ttfb=ttfb, total=time.perf_counter() - start,
+                                    nbytes=len(body))
+            if cache:
+                cache.store(
+                    source_config.url,
+                    body,
+                    etag=response.headers.get('ETag', ''),
+                    last_modified=response.headers.get('Last-Modified', ''),
+                    content_type=response.headers.get('Content-Type', '')
+                )
+            return body, response.charset
+
+
+class NewsFetcher:
+    """新闻抓取器（同步接口）
+
+    请求由内部的 AsyncNewsFetcher 发出，这里只在新的事件循环中运行它，同步和异步抓取只有一套实现。
+    不能在已运行的事件循环中调用，协程中请直接使用 AsyncNewsFetcher。
+    """
+
+    def __init__(self, config, session_factory: Optional[Callable[[], 'aiohttp.ClientSession']] = None):
+        self.config = config
+        self.fetcher = AsyncNewsFetcher(config, session_factory)
+        # AsyncNewsFetcher 在抓取期间持有会话，多个线程同时调用时依次进行
+        self._lock = threading.Lock()
+    
+    @property
+    def stream_stats(self) -> Dict[str, Dict[str, int]]:
+        """流式抓取统计，见 NewsFetcherBase"""
+        return self.fetcher.stream_stats
+    
+    def fetch_news(self, source_config) -> List[NewsItem]:
+        """根据配置抓取一个新闻源，超出新闻源时间预算时不再发起请求
+
+        每次调用新建一个事件循环和会话，抓取多个新闻源时请用 fetch_all。
+        """
+        return self._run([source_config])[source_config.id]
+    
+    def fetch_all(self, sources) -> Dict[str, List[NewsItem]]:
+        """并发抓取多个新闻源（同步接口，内部由 AsyncNewsFetcher 驱动）"""
+        results = self._run(sources)
+        breaker = get_circuit_breaker()
+        if breaker is not None:
+            breaker.save()
+        return results
+    
+    def _run(self, sources) -> Dict[str, List[NewsItem]]:
+        with self._lock:
+            return asyncio.run(self.fetcher.fetch_all(sources))
@@ -0,0 +1,167 @@
+# news_history.py - 新闻历史记录（SQLite）
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from config import get_config
+from dedup import normalize_title
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news_items (
+    title_hash TEXT PRIMARY KEY,
+    title      TEXT NOT NULL,
+    source     TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL,
+    hot        INTEGER NOT NULL DEFAULT 0,
+    sent_at    REAL,
+    sent_hot   INTEGER,
+    sent_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_news_items_last_seen ON news_items(last_seen);
+"""
+
+_UPSERT_SEEN = """
+INSERT INTO news_items (title_hash, title, source, first_seen, last_seen, hot)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(title_hash) DO UPDATE SET
+    title = excluded.title,
+    source = excluded.source,
+    last_seen = excluded.last_seen,
+    hot = excluded.hot
+"""
+
+_UPSERT_SENT = """
+INSERT INTO news_items (title_hash, title, source, first_seen, last_seen, hot, sent_at, sent_hot, sent_count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT(title_hash) DO UPDATE SET
+    sent_at = excluded.sent_at,
+    sent_hot = excluded.sent_hot,
+    sent_count = news_items.sent_count + 1
+"""
+
+# SQLite 单条语句的参数个数有限，批量查询时分段
+_QUERY_BATCH = 500
+
+def title_hash(title: str) -> str:
+    """按归一化标题计算哈希，同一新闻换了来源前缀或标点也对应同一条记录"""
+    return hashlib.sha1(normalize_title(title).encode('utf-8')).hexdigest()
+
+class NewsHistory:
+    """抓取过和发送过的新闻历史
+
+    以标题哈希为主键（WITHOUT ROWID 表，主键即聚簇索引），
+    按哈希查找的代价与历史总行数基本无关；last_seen 上另建索引用于清理过期记录。
+    """
+
+    def __init__(self, path: str = ".cache/news_history.sqlite3", retention_days: int = 30):
+        self.path = path
+        self.retention_days = retention_days
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.prune()
+
+    def lookup(self, titles: Iterable[str]) -> Dict[str, Dict]:
+        """批量按标题查找历史记录，返回 {标题哈希: 记录}"""
+        hashes = list({title_hash(title) for title in titles})
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _QUERY_BATCH):
+                batch = hashes[start:start + _QUERY_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT title_hash, first_seen, last_seen, hot, sent_at, sent_hot, sent_count "
+                    f"FROM news_items WHERE title_hash IN ({placeholders})", batch)
+                for row in rows:
+                    found[row[0]] = {
+                        'first_seen': row[1], 'last_seen': row[2], 'hot': row[3],
+                        'sent_at': row[4], 'sent_hot': row[5], 'sent_count': row[6]
+                    }
+        return found
+
+    def diff(self, news_list: List[Dict], rising_ratio: float = 1.5) -> List[Dict]:
+        """只保留新出现或热度上升的新闻
+
+        从未发送过的新闻视为新新闻；发送过的新闻热度达到上次发送时的 rising_ratio 倍才再次保留。
+        """
+        if not news_list:
+            return []
+        history = self.lookup(news['title'] for news in news_list)
+        fresh = []
+        for news in news_list:
+            record = history.get(title_hash(news['title']))
+            if record is None or not record['sent_count']:
+                fresh.append(news)
+            elif news.get('hot', 0) >= (record['sent_hot'] or 0) * rising_ratio:
+                fresh.append(news)
+        return fresh
+
+    def record_seen(self, news_list: Iterable[Dict]):
+        """记录本次抓取到的新闻"""
+        now = time.time()
+        rows = [
+            (title_hash(news['title']), news['title'], news.get('source', ''), now, now, int(news.get('hot', 0)))
+            for news in news_list
+        ]
+        self._write(_UPSERT_SEEN, rows)
+
+    def mark_sent(self, news_list: Iterable[Dict]):
+        """记录已发送的新闻及发送时的热度"""
+        now = time.time()
+        rows = []
+        for news in news_list:
+            hot = int(news.get('hot', 0))
+            rows.append((title_hash(news['title']), news['title'], news.get('source', ''), now, now, hot, now, hot))
+        self._write(_UPSERT_SENT, rows)
+
+    def prune(self):
+        """删除超过保留天数未再出现的记录"""
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock, self._conn:
+            deleted = self._conn.execute("DELETE FROM news_items WHERE last_seen < ?", (cutoff,)).rowcount
+        if deleted:
+            logger.info(f"🗑️ 清理过期新闻历史 {deleted} 条")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM news_items").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, sql: str, rows: List[tuple]):
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+# 全局历史记录实例
+_news_history = None
+_news_history_lock = threading.Lock()
+
+def get_news_history() -> Optional[NewsHistory]:
+    """获取全局新闻历史，未启用时返回 None"""
+    global _news_history
+    settings = get_config().app_config
+    if not settings.history_enabled:
+        return None
+    if _news_history is None:
+        with _news_history_lock:
+            if _news_history is None:
+                _news_history = NewsHistory(settings.history_path, settings.history_retention_days)
+    return _news_history
@@ -0,0 +1,33 @@
+# news_item.py - 新闻条目：抓取、分类到渲染全程使用的结构化记录
+from typing import NamedTuple
+
+def format_hot(hot: int) -> str:
+    """热度的显示文本，如 12w、7000，没有热度时为空"""
+    if hot > 10000:
+        return f"{hot // 10000}w"
+    if hot > 0:
+        return str(hot)
+    return ""
+
+class NewsItem(NamedTuple):
+    """一条新闻
+
+    NewsFetcher 抓取时生成，NewsProcessor 只更新 category，EmailGenerator 渲染时才格式化为文本，
+    不再把序号和热度拼进字符串后又用正则拆出来。NamedTuple 没有实例字典，每条只占一个元组的内存。
+    """
+    title: str
+    source: str = ""         # 新闻源名称，如 "微博热搜"
+    rank: int = 0            # 在新闻源中的序号，从 1 开始
+    hot: int = 0             # 热度值，0 表示没有
+    url: str = ""            # 新闻链接，新闻源没有提供时为空
+    category: str = ""       # 分类，抓取时为新闻源的默认分类
+    fetched_at: float = 0.0  # 抓取时间（time.time()）
+
+    @property
+    def hot_text(self) -> str:
+        return format_hot(self.hot)
+
+    def __str__(self) -> str:
+        """日志和调试用的一行文本，如 "3. 标题 🔥12w"，与原来的格式相同"""
+        hot = self.hot_text
+        return f"{self.rank}. {self.title}" + (f" 🔥{hot}" if hot else "")
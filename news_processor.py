@@ -1,40 +1,46 @@
 # news_processor.py - 新闻处理模块
-import re
 from typing import List, Dict, Any
 import logging
 
+from keyword_classifier import KeywordClassifier
+from instrumentation import get_recorder
+from news_item import NewsItem
+
 logger = logging.getLogger(__name__)
 
 class NewsProcessor:
     def __init__(self, config):
         self.config = config
+        # 所有分类的关键词构建为一个自动机（热点为兜底分类，不参与匹配）
+        self.classifier = KeywordClassifier({
+            name: category.keywords
+            for name, category in config.categories.items()
+            if name != '热点'
+        }, case_sensitive=True)
     
-    def categorize_news(self, all_news: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    def categorize_news(self, all_news: Dict[str, Any]) -> Dict[str, List[NewsItem]]:
         """分类整理新闻"""
+        with get_recorder().stage('classify') as stage:
+            categorized = self._categorize(all_news)
+            stage['items'] = sum(len(items) for items in categorized.values())
+        return categorized
+    
+    def _categorize(self, all_news: Dict[str, Any]) -> Dict[str, List[NewsItem]]:
         categorized = {cat: [] for cat in self.config.get_all_categories()}
         
-        for source_id, data in all_news.items():
-            source_config = self.config.get_source(source_id)
-            base_category = data.get('category', '热点')
-            
+        for data in all_news.values():
             for news_item in data['news']:
-                if '抓取失败' in news_item:
-                    continue
-                    
-                clean_title = self._clean_title(news_item)
-                if not clean_title or len(clean_title) < 3:
+                # 标题在抓取时已清洗，序号和热度是单独的字段
+                if len(news_item.title) < 3:
                     continue
                 
                 # 确定最终分类
-                final_category = self._determine_category(clean_title, base_category)
+                final_category = self._determine_category(news_item.title, news_item.category or
+                                                          data.get('category', '热点'))
                 
                 # 添加到对应分类
                 if final_category in categorized:
-                    categorized[final_category].append({
-                        'source': data['name'],
-                        'title': clean_title,
-                        'original': news_item
-                    })
+                    categorized[final_category].append(news_item._replace(category=final_category))
         
         # 每个分类只保留前5条
         for category in categorized:
@@ -42,28 +48,13 @@ class NewsProcessor:
         
         return categorized
     
-    def _clean_title(self, title: str) -> str:
-        """清洗标题"""
-        # 移除序号和热度标签
-        clean = re.sub(r'^\d+\.\s*', '', title)
-        clean = re.sub(r'\s*🔥\d+\w*', '', clean)
-        clean = clean.strip()
-        return clean
-    
     def _determine_category(self, title: str, base_category: str) -> str:
         """确定新闻分类"""
         if base_category != '热点':
             return base_category
         
-        # 关键词匹配分类
-        for category_name, category_config in self.config.categories.items():
-            if category_name == '热点':
-                continue
-            
-            keywords = category_config.keywords
-            if keywords:
-                for keyword in keywords:
-                    if keyword in title:
-                        return category_name
+        # 关键词匹配分类，多个分类命中时取配置中靠前的
+        for category_name in self.classifier.match(title):
+            return category_name
         
         return '热点'
@@ -0,0 +1,147 @@
+# rate_limiter.py - 按主机限速（令牌桶）
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# 表示服务器过载或限流、需要按 Retry-After 退避的状态码
+BACKOFF_STATUS = (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头：秒数或 HTTP 日期，无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """令牌桶：平均每 interval 秒放行一个请求，最多允许 burst 个请求连发
+
+    reserve() 不阻塞，只预约令牌并返回需要等待的秒数；
+    并发的调用者依次排在后面，各自等待自己的时刻，互不占用锁。
+    """
+
+    def __init__(self, interval: float, burst: int = 1):
+        self.interval = interval
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        # 令牌已补充到的时刻；退避时推到退避结束，此前不再补充
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if now <= self._updated:
+            return
+        if self.interval > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+        else:
+            self._tokens = float(self.burst)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """预约一个令牌，返回需要等待的秒数
+
+        需要等待的时间不小于 max_wait 时不预约，返回 None，后面的请求不会排在这个用不上的名额之后。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            tokens = self._tokens - 1
+            # 最早在 _updated 放行（退避中即退避结束时），欠下的令牌按间隔依次补上
+            ready = self._updated + (-tokens * self.interval if tokens < 0 else 0.0)
+            wait = max(0.0, ready - now)
+            if max_wait is not None and wait > 0 and wait >= max_wait:
+                return None
+            self._tokens = tokens
+            return wait
+
+    def block(self, seconds: float):
+        """暂停放行 seconds 秒（如服务器返回 Retry-After）
+
+        退避期间不补充令牌：退避结束后只有退避前剩余的令牌可以连发，
+        排队的请求仍按间隔依次放行，不会一齐涌向刚恢复的服务器。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._updated = max(self._updated, now + seconds)
+
+class RateLimiter:
+    """按主机限速
+
+    每个主机一个令牌桶，默认间隔为 settings.request_delay，可在 host_delays 中按主机覆盖。
+    不同主机的等待互不影响，并发抓取时各主机的礼貌延迟相互重叠而不是累加。
+    """
+
+    def __init__(self, request_delay: float = 1.0, burst: int = 1,
+                 host_delays: Optional[Dict[str, float]] = None,
+                 max_backoff: float = 60.0):
+        self.request_delay = request_delay
+        self.burst = burst
+        self.host_delays = host_delays or {}
+        self.max_backoff = max_backoff
+        self.waited = 0.0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                interval = self.host_delays.get(host, self.request_delay)
+                bucket = self._buckets[host] = TokenBucket(interval, self.burst)
+            return bucket
+
+    def reserve(self, url: str, max_wait: Optional[float] = None) -> Optional[float]:
+        """预约一次对 url 所在主机的请求，返回需要等待的秒数；等待不小于 max_wait 时不预约，返回 None"""
+        wait = self._bucket(url).reserve(max_wait)
+        if wait:
+            with self._lock:
+                self.waited += wait
+        return wait
+
+    def wait(self, url: str) -> float:
+        """阻塞直到可以请求 url，返回等待的秒数"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url: str, max_wait: Optional[float] = None) -> bool:
+        """协程版本，等待期间不阻塞事件循环中的其他请求；等待不小于 max_wait 时不预约，返回 False"""
+        delay = self.reserve(url, max_wait)
+        if delay is None:
+            return False
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return True
+
+    def backoff(self, url: str, seconds: float):
+        """暂停对 url 所在主机的请求"""
+        seconds = min(max(0.0, seconds), self.max_backoff)
+        if seconds > 0:
+            logger.info(f"⏳ {urlparse(url).hostname} 暂停请求 {seconds:.1f} 秒")
+            self._bucket(url).block(seconds)
+
+    def observe(self, url: str, status: int, headers) -> bool:
+        """检查响应状态，429/503 时按 Retry-After（缺省为 request_delay 的两倍）退避，返回是否退避"""
+        if status not in BACKOFF_STATUS:
+            return False
+        retry_after = parse_retry_after(headers.get('Retry-After') if headers else None)
+        self.backoff(url, retry_after if retry_after is not None else max(1.0, self.request_delay * 2))
+        return True
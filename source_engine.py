@@ -0,0 +1,180 @@
+# source_engine.py - 声明式新闻源引擎
+import re
+import random
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from config import ConfigManager, NewsSourceConfig, get_config
+from news_item import format_hot
+
+if TYPE_CHECKING:
+    from html_parser import SelectorSet
+
+logger = logging.getLogger(__name__)
+
+# 标题中的热度加成关键词
+HOT_KEYWORDS = {
+    '习近平': 50, '主席': 30, '重磅': 25, '独家': 25,
+    '紧急': 20, '最新': 15, '重大': 20, '突破': 20
+}
+
+_WHITESPACE = re.compile(r'\s+')
+_AD_PATTERN = re.compile(r'\[广告\]|\(广告\)|【广告】|推广|ADVERTISEMENT', re.IGNORECASE)
+
+def calculate_hot_value(title, base_hot=100, source_weight=1.0):
+    """计算新闻热度值"""
+    hot = base_hot * source_weight
+
+    # 关键词热度加成
+    for keyword, value in HOT_KEYWORDS.items():
+        if keyword in title:
+            hot += value
+
+    # 标题长度优化
+    title_len = len(title)
+    if 15 <= title_len <= 35:
+        hot += 20
+    elif title_len > 50:
+        hot -= 10
+
+    # 随机波动
+    hot += random.randint(-5, 15)
+
+    return max(50, int(hot))
+
+def clean_news_title(title):
+    """清洗新闻标题"""
+    if not title:
+        return ""
+
+    # 移除多余空格和换行
+    title = _WHITESPACE.sub(' ', title).strip()
+
+    # 移除广告标识
+    return _AD_PATTERN.sub('', title)
+
+class CompiledSource:
+    """预编译的新闻源规则
+
+    选择器、标题长度范围、屏蔽词、必含词、请求头等在启动时计算一次，
+    逐条处理标题时只做简单的比较。
+    """
+
+    def __init__(self, config: NewsSourceConfig):
+        self.config = config
+        self.id = config.id
+        self.label = config.label or config.name
+        self.urls = tuple(config.urls) or (config.url,)
+        # lxml 只在编译新闻源规则时导入，只用到标题清洗、热度计算时不必加载
+        from html_parser import compile_selectors
+        self.selectors: 'SelectorSet' = compile_selectors(tuple(config.selectors) or (config.selector,))
+        self.min_len = config.min_title_len
+        self.max_len = config.max_title_len
+        self.stop_words = tuple(word.lower() for word in config.stop_words)
+        self.require_words = tuple(config.require_words)
+        self.base_hot = config.base_hot
+        self.weight = config.weight
+        self.rank_decay = config.rank_decay
+        self.show_hot = config.show_hot
+        self.limit = config.limit
+        self.collect_limit = config.collect_limit or config.limit * 2
+        self.headers = {'Referer': config.referer} if config.referer else {}
+        self.prefix = f"{self.label}: "
+
+    def accept(self, text: str) -> Optional[str]:
+        """清洗并过滤标题，不符合规则时返回 None"""
+        title = clean_news_title(text)
+        if not title or title.startswith('http'):
+            return None
+        if not self.min_len <= len(title) <= self.max_len:
+            return None
+        if self.stop_words:
+            lowered = title.lower()
+            if any(word in lowered for word in self.stop_words):
+                return None
+        if self.require_words and not any(word in title for word in self.require_words):
+            return None
+        return title
+
+    def extract(self, root, limit: Optional[int] = None) -> List[str]:
+        """从文档树中按顺序提取合格标题，凑够 limit 条即停止"""
+        limit = self.collect_limit if limit is None else limit
+        titles = []
+        if limit <= 0:
+            return titles
+        for text in self.selectors.iter_texts(root):
+            title = self.accept(text)
+            if title:
+                titles.append(title)
+                if len(titles) >= limit:
+                    break
+        return titles
+
+    def rank_hot(self, index: int) -> int:
+        """热榜第 index 名（从0开始）的热度，未设置 rank_decay 时为 0"""
+        if self.rank_decay <= 0:
+            return 0
+        return max(0, int((self.base_hot - index * self.rank_decay) * self.weight))
+
+    def rank(self, titles: List[str]) -> List[Dict]:
+        """去重、计算热度并按热度排序，返回前 limit 条
+
+        设置了 rank_decay 的热榜按名次计算热度；其它新闻源按标题关键词估算。
+        """
+        seen = set()
+        news_list = []
+        for title in titles:
+            core = title[:30]
+            if core in seen:
+                continue
+            seen.add(core)
+            if self.rank_decay > 0:
+                hot = self.rank_hot(len(news_list))
+            else:
+                hot = calculate_hot_value(title, self.base_hot, self.weight)
+            hot_text = format_hot(hot) if self.show_hot else ""
+            news_list.append({
+                'title': self.prefix + title + (f" 🔥{hot_text}" if hot_text else ""),
+                'hot': hot,
+                'source': self.label
+            })
+        news_list.sort(key=lambda x: x['hot'], reverse=True)
+        return news_list[:self.limit]
+
+class SourceEngine:
+    """新闻源引擎：启动时编译 config.yaml 中所有HTML新闻源的规则"""
+
+    def __init__(self, config: ConfigManager):
+        self.sources: Dict[str, CompiledSource] = {}
+        for source_id, source_config in config.news_sources.items():
+            if source_config.api:
+                continue
+            try:
+                self.sources[source_id] = CompiledSource(source_config)
+            except Exception as e:
+                logger.error(f"编译新闻源 {source_id} 规则失败: {e}")
+
+    def get(self, source_id: str) -> CompiledSource:
+        """获取编译后的新闻源，未配置时抛出 KeyError"""
+        return self.sources[source_id]
+
+    def compile(self, source_config: NewsSourceConfig) -> CompiledSource:
+        """获取新闻源的编译规则，未预编译的（如临时构造的配置）即时编译"""
+        source = self.sources.get(source_config.id)
+        if source is None or source.config is not source_config:
+            source = CompiledSource(source_config)
+        return source
+
+# 全局引擎实例
+_source_engine = None
+_source_engine_lock = threading.Lock()
+
+def get_source_engine() -> SourceEngine:
+    """获取全局新闻源引擎"""
+    global _source_engine
+    if _source_engine is None:
+        with _source_engine_lock:
+            if _source_engine is None:
+                _source_engine = SourceEngine(get_config())
+    return _source_engine
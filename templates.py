@@ -0,0 +1,120 @@
+# templates.py - 预编译的邮件模板
+import re
+import keyword
+from typing import Dict, Iterable, List, Tuple
+
+# {{ 名称 }} 占位符；{{ 名称|safe }} 表示值已是安全的HTML或数字，不转义
+_FIELD = re.compile(r'\{\{\s*(\w+)\s*(\|\s*safe\s*)?\}\}')
+
+class Markup(str):
+    """已经是HTML的文本，渲染时不再转义"""
+
+def escape(value) -> str:
+    """转义HTML特殊字符，Markup 原样返回"""
+    cls = value.__class__
+    if cls is Markup or cls is int:
+        return value if cls is Markup else str(value)
+    text = value if cls is str else str(value)
+    # 绝大多数新闻标题不含特殊字符，先检查再替换
+    if '&' in text or '<' in text or '>' in text:
+        text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return text
+
+def join(fragments: Iterable[str]) -> Markup:
+    """拼接已渲染的HTML片段，结果作为 Markup 传给外层模板"""
+    return Markup(''.join(fragments))
+
+class Template:
+    """编译一次、渲染多次的模板
+
+    构造时把源文本拆分为常量片段和 {{ 名称 }} 占位符，并生成一个以占位符为关键字参数的
+    Python 函数（函数体是一个 f-string），渲染时一次性构建整个字符串，不再逐段拼接或重复解析。
+    autoescape 为 True 时占位符的值按HTML转义（Markup 除外）。
+
+    partial() 把一部分占位符固定为常量，重新编译出只剩其余占位符的模板：
+    所有收件人共用的部分只渲染一次，每个收件人只需填入少量个性化字段。
+    """
+
+    def __init__(self, source: str, autoescape: bool = False):
+        # 模板源文本，供 lean_html 编译精简版模板；partial() 生成的模板没有源文本
+        self.source = source
+        parts = _FIELD.split(source)
+        self._setup(parts[0::3], list(zip(parts[1::3], map(bool, parts[2::3]))), autoescape)
+
+    def _setup(self, literals: List[str], names: List[Tuple[str, bool]], autoescape: bool):
+        self.autoescape = autoescape
+        self._literals = literals
+        # [(占位符名称, 是否标记为 safe)]
+        self._names = names
+        self._render = self._compile()
+        # row_fields -> 按行循环渲染的函数，首次使用时编译
+        self._each = {}
+
+    @property
+    def fields(self) -> List[str]:
+        """尚未填入的占位符名称"""
+        return list(dict.fromkeys(name for name, _ in self._names))
+
+    def _compile(self, row_fields=None):
+        """生成渲染函数；row_fields 不为空时生成按行循环渲染的版本（见 render_each）"""
+        for name in self.fields:
+            if not name.isidentifier() or keyword.iskeyword(name) or name.startswith('_'):
+                raise ValueError(f"模板占位符名称无效: {name}")
+        row_fields = tuple(row_fields or ())
+        shared = [name for name in self.fields if name not in row_fields]
+        pieces = [_literal(self._literals[0])]
+        for (name, safe), literal in zip(self._names, self._literals[1:]):
+            # 共用字段在循环外转义一次，每行的字段在循环内转义
+            escaped = self.autoescape and not safe and (name in row_fields or not row_fields)
+            pieces.append(f"f'{{_e({name})}}'" if escaped else f"f'{{{name}}}'")
+            pieces.append(_literal(literal))
+        body = ' '.join(pieces)
+        params = ''.join(f"{name}, " for name in shared)
+        if row_fields:
+            lines = [f"def render(_rows, *, {params}_e=_escape, **_unused):"]
+            if self.autoescape:
+                unsafe = {name for name, safe in self._names if not safe}
+                lines.extend(f"    {name} = _e({name})" for name in shared if name in unsafe)
+            targets = ', '.join(row_fields) + (',' if len(row_fields) == 1 else '')
+            lines.append(f"    return ''.join([{body} for {targets} in _rows])")
+        else:
+            lines = [f"def render(*, {params}_e=_escape, **_unused):", f"    return ({body})"]
+        namespace = {'_escape': escape}
+        exec(compile('\n'.join(lines) + '\n', '<template>', 'exec'), namespace)
+        return namespace['render']
+
+    def render_into(self, out: List[str], context: Dict):
+        """把渲染结果追加到 out，供外层模板或循环复用同一个列表"""
+        out.append(self._render(**context))
+
+    def render(self, **context) -> str:
+        return self._render(**context)
+
+    def render_each(self, row_fields: Tuple[str, ...], rows: Iterable[tuple], **shared) -> Markup:
+        """按行重复渲染模板并拼接，循环在编译出的函数内完成
+
+        rows 的每一项是与 row_fields 对应的元组，其余占位符由 shared 给出，对所有行相同。
+        """
+        render = self._each.get(row_fields)
+        if render is None:
+            render = self._each[row_fields] = self._compile(row_fields)
+        return Markup(render(rows, **shared))
+
+    def partial(self, **context) -> 'Template':
+        """固定部分占位符，返回只剩其余占位符的新模板"""
+        value = escape if self.autoescape else str
+        literals, names = [self._literals[0]], []
+        for (name, safe), literal in zip(self._names, self._literals[1:]):
+            if name in context:
+                literals[-1] += (str(context[name]) if safe else value(context[name])) + literal
+            else:
+                names.append((name, safe))
+                literals.append(literal)
+        template = Template.__new__(Template)
+        template.source = None
+        template._setup(literals, names, self.autoescape)
+        return template
+
+def _literal(text: str) -> str:
+    """常量片段写成 f-string 字面量：花括号加倍，其余交给 repr 转义"""
+    return 'f' + repr(text.replace('{', '{{').replace('}', '}}'))